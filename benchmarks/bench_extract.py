@@ -0,0 +1,59 @@
+"""Compare minidom and ElementTree text extraction over the Genesis sample.
+
+Run from the project root:
+
+    python benchmarks/bench_extract.py [repeats]
+"""
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+from citable_corpus import TEIDivAbReader
+from citable_corpus.editionbuilders import extract_text, extract_element_text, extract_texts, qualified_names
+
+datafile = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "septuagint_latin_genesis.xml")
+baseurn = "urn:cts:compnov:bible.genesis.sept_latin:"
+
+
+def timed(label, fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best * 1000:9.1f} ms")
+    return best, result
+
+
+def main(repeats=5):
+    with open(datafile, encoding="utf-8") as f:
+        corpus = TEIDivAbReader.corpus(f.read(), baseurn)
+    fragments = [p.text for p in corpus.passages]
+    print(f"{len(fragments)} passages, best of {repeats}")
+
+    omitlists = [['expan'], ['abbr']]
+    omitsets = [qualified_names(o) for o in omitlists]
+
+    def legacy_one():
+        return [extract_text(minidom.parseString(x).documentElement, [], omitlists[0]) for x in fragments]
+
+    def etree_one():
+        return [extract_element_text(ET.fromstring(x), omitsets[0]) for x in fragments]
+
+    def legacy_two():
+        return [[extract_text(minidom.parseString(x).documentElement, [], o) for o in omitlists] for x in fragments]
+
+    def etree_two():
+        return [extract_texts(ET.fromstring(x), omitlists) for x in fragments]
+
+    t1, r1 = timed("minidom, one edition", legacy_one, repeats)
+    t2, r2 = timed("ElementTree, one edition", etree_one, repeats)
+    t3, r3 = timed("minidom, two editions (two parses)", legacy_two, repeats)
+    t4, r4 = timed("ElementTree, two editions (one parse)", etree_two, repeats)
+    assert r1 == r2 and r3 == r4, "extractors disagree"
+    print(f"speedup: {t1 / t2:.1f}x for one edition, {t3 / t4:.1f}x for two")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,38 @@
+"""Time edition building on a process pool with 1, 2, 4 and 8 workers.
+
+The corpus is a synthetic TEI document in the style of the Genesis sample,
+whose passages are all different, so that the extraction cache does not
+answer for the workers.  The cache is also cleared before every run, since
+forked workers inherit the parent's.  Run from the project root:
+
+    python benchmarks/bench_parallel_editions.py [passages]
+"""
+import os
+import sys
+import tempfile
+import time
+from citable_corpus import TEIDivAbReader, build_editions
+from citable_corpus.benchmark import synthetic_tei, tei_urnbase
+from citable_corpus.editionbuilders import clear_extraction_cache
+
+
+def main(passages=25000):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        teifile = os.path.join(tmpdir, "synthetic.xml")
+        synthetic_tei(teifile, passages)
+        with open(teifile, encoding="utf-8") as f:
+            corpus = TEIDivAbReader.corpus(f.read(), tei_urnbase)
+    print(f"{len(corpus)} passages, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for workers in [1, 2, 4, 8]:
+        clear_extraction_cache()
+        start = time.perf_counter()
+        build_editions(corpus, workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers} worker(s): {elapsed:7.2f} s  {len(corpus) / elapsed:9.0f} passages/s  speedup {baseline / elapsed:4.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 25000)
@@ -0,0 +1,66 @@
+"""Load-test the CTS-style server on localhost with concurrent keep-alive clients.
+
+A synthetic corpus is served in-process on a free port.  Each client keeps one
+connection open and sends GetPassage requests for references drawn from a
+fixed pool, so later requests are answered from the response cache.  Run from
+the project root:
+
+    python benchmarks/bench_server.py [passages] [clients] [requests per client]
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+from citable_corpus import CitableCorpus
+from citable_corpus.benchmark import cex_refs, cex_urnbase, synthetic_cex
+from citable_corpus.server import CorpusServer
+
+
+async def client(host, port, targets, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for target in targets:
+            start = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            await writer.drain()
+            length = 0
+            while (line := await reader.readline()) != b"\r\n":
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def load(corpus, refs, clients, requests):
+    rng = random.Random(0)
+    latencies = []
+    async with CorpusServer({"synthetic": corpus}) as server:
+        jobs = [[f"/cts?request=GetPassage&urn={quote(rng.choice(refs))}" for _ in range(requests)] for _ in range(clients)]
+        start = time.perf_counter()
+        await asyncio.gather(*(client(*server.address, targets, latencies) for targets in jobs))
+        elapsed = time.perf_counter() - start
+        metrics = server.metrics()
+    latencies.sort()
+    print(f"{clients} clients x {requests} requests: {len(latencies) / elapsed:9.0f} requests/s")
+    print(f"latency median {statistics.median(latencies) * 1000:.2f} ms, 99th percentile {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    print(f"cache hit rate {metrics['cache']['hit_rate']:.1%}, {metrics['lookups']} lookups in {metrics['lookup_seconds']:.2f} s")
+
+
+def main(passages=10000, clients=50, requests=200):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cexfile = os.path.join(tmpdir, "synthetic.cex")
+        synthetic_cex(cexfile, passages)
+        corpus = CitableCorpus.from_cex_file(cexfile)
+    refs = [cex_urnbase + ref for ref in cex_refs(passages)]
+    random.Random(1).shuffle(refs)
+    asyncio.run(load(corpus, refs[:500], clients, requests))
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
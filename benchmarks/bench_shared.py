@@ -0,0 +1,43 @@
+"""Compare sending a corpus to worker processes by pickling it and by sharing it.
+
+Each of the workers receives the corpus once and counts its passages.  A
+pickled corpus is serialized in the parent and rebuilt in every worker; a
+SharedCorpus is sent as its name and read from one block of shared memory.
+Run from the project root:
+
+    python benchmarks/bench_shared.py [passages] [workers]
+"""
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from citable_corpus import CitableCorpus
+from citable_corpus.benchmark import synthetic_cex
+
+
+def main(passages=100000, workers=4):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cexfile = os.path.join(tmpdir, "synthetic.cex")
+        synthetic_cex(cexfile, passages)
+        corpus = CitableCorpus.from_cex_file(cexfile)
+    print(f"{passages} passages, {workers} workers, {os.cpu_count()} CPUs")
+    with ProcessPoolExecutor(workers) as pool:
+        # Start the workers before timing.
+        list(pool.map(len, [[]] * workers))
+        start = time.perf_counter()
+        list(pool.map(len, [corpus] * workers))
+        elapsed = time.perf_counter() - start
+        print(f"pickled corpus: {len(pickle.dumps(corpus)) / 2**20:8.1f} MiB per worker, {elapsed:7.3f} s")
+
+        start = time.perf_counter()
+        with corpus.share() as shared:
+            published = time.perf_counter() - start
+            list(pool.map(len, [shared] * workers))
+            elapsed = time.perf_counter() - start
+        print(f"shared corpus:  {len(pickle.dumps(shared)):8d} bytes per worker, {elapsed:7.3f} s ({published:.3f} s to publish)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,57 @@
+"""Time thread-parallel retrieval, search and edition building with 1, 2, 4 and 8 threads.
+
+Run the script under a standard build and a free-threaded build of Python
+(e.g. `python3.14` and `python3.14t`) to compare how they scale: with the GIL,
+only index lookups, which SQLite runs without holding it, can gain from more
+threads.  Run from the project root:
+
+    python benchmarks/bench_threads.py [passages] [queries]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from citable_corpus import CexIndex, CitableCorpus, TEIDivAbReader, build_editions
+from citable_corpus.benchmark import cex_refs, cex_urnbase, synthetic_cex, synthetic_tei, tei_urnbase
+from citable_corpus.editionbuilders import clear_extraction_cache
+from citable_corpus.parallel import gil_enabled
+from urn_citation import CtsUrn
+
+
+def scale(label, items, fn, setup=None):
+    baseline = None
+    for workers in [1, 2, 4, 8]:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn(workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{label:<24} {workers} thread(s): {elapsed:7.3f} s  {items / elapsed:9.0f} items/s  speedup {baseline / elapsed:4.1f}x")
+
+
+def main(passages=20000, queries=400):
+    gil = "enabled" if gil_enabled() else "disabled"
+    print(f"Python {sys.version.split()[0]}, GIL {gil}, {os.cpu_count()} CPUs, {passages} passages")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cexfile = os.path.join(tmpdir, "synthetic.cex")
+        teifile = os.path.join(tmpdir, "synthetic.xml")
+        synthetic_cex(cexfile, passages)
+        synthetic_tei(teifile, passages // 4)
+        corpus = CitableCorpus.from_cex_file(cexfile)
+        refs = cex_refs(passages)
+        chosen = random.Random(0).sample(refs, min(queries, len(refs)))
+        urns = [CtsUrn.from_string(cex_urnbase + r) for r in chosen]
+
+        scale("CitableCorpus.retrieve", len(urns), lambda w: corpus.retrieve_many(urns, workers=w))
+        scale("CitableCorpus.search", len(corpus), lambda w: corpus.search(r"\bdeus\b.*\bterra\b", workers=w))
+        with CexIndex.build(cexfile, os.path.join(tmpdir, "synthetic.idx")) as index:
+            scale("CexIndex.retrieve", len(urns), lambda w: index.retrieve_many([cex_urnbase + r for r in chosen], workers=w))
+        with open(teifile, encoding="utf-8") as f:
+            xmlcorpus = TEIDivAbReader.corpus(f.read(), tei_urnbase)
+        scale("build_editions", len(xmlcorpus), lambda w: build_editions(xmlcorpus, workers=w, threads=True), clear_extraction_cache)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -1,6 +1,6 @@
-def main():
-    print("Hello from citable-corpus!")
+import sys
+from citable_corpus.cli import main
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -163,28 +163,16 @@ def _(mo, passages):
 
 
 @app.cell
-def _(corp):
-    reff = [psg.urn.passage for psg in corp.passages]
-    return (reff,)
-
-
-@app.cell
-def _(reff):
-    chapter_reff = [ref.split(".")[0] for ref in reff]
-    return (chapter_reff,)
-
-
-@app.cell
-def _(chapter_reff):
-    chapters = list(dict.fromkeys(chapter_reff))
+def _(corp, urnroot):
+    chapters = [u.passage for u in corp.children(urnroot)]
     return (chapters,)
 
 
 @app.cell
-def _(chapterchoice, reff):
+def _(chapterchoice, corp, urnroot):
     passages = []
     if chapterchoice.value:
-        passages = [psg for psg in reff if psg.startswith(chapterchoice.value + ".") ]
+        passages = [u.passage for u in corp.children(urnroot.set_passage(chapterchoice.value))]
     return (passages,)
 
 
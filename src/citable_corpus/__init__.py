@@ -1,19 +1,61 @@
-from importlib.metadata import version, PackageNotFoundError
+from importlib import import_module
 
-try:
-    __version__ = version("citable_corpus") # 'name' of package from pyproject.toml
-except PackageNotFoundError:
-    # Package is not installed (e.g., running from a local script)
-    __version__ = "unknown"
+# Exports are imported from their submodules on first use, so that `import citable_corpus`
+# does not pay for pydantic, the CEX parser or the XML libraries until they are needed.
+_exports = {
+    "CitablePassage": "passage",
+    "CitableCorpus": "corpus",
+    "TEIDivAbReader": "markupreader",
+    **{name: "editionbuilders" for name in ["extract_text", "extract_texts", "build_editions", "build_editions_from_tei",
+                                            "TEIDiplomatic", "TEINormalized", "EditionRules", "RuleEditionBuilder", "LazyEdition",
+                                            "extraction_cache_info", "set_extraction_cache_size", "clear_extraction_cache"]},
+    **{name: "pipeline" for name in ["read_tei", "read_cex", "edition_stage", "editions_stage", "write_cex", "tei_to_cex", "tei_files_to_cex"]},
+    "IngestionCache": "cache",
+    "WorkRewriter": "urns", "rewrite_works": "urns",
+    "Instrumentation": "instrument", "instrumented": "instrument",
+    "CexIndex": "cexindex", "StaleIndexError": "cexindex",
+    "CorpusServer": "server",
+    "aiter_cex": "aio",
+    "gil_enabled": "parallel",
+    "SharedCorpus": "shared",
+    "CorpusView": "view",
+    "ingest_tei_files": "ingest", "IngestionResult": "ingest", "IngestionError": "ingest",
+}
 
 
-from .passage import CitablePassage
-from .corpus import CitableCorpus
-from .markupreader import TEIDivAbReader
-from .editionbuilders import extract_text, TEIDiplomatic, TEINormalized
+def _version():
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return version("citable_corpus") # 'name' of package from pyproject.toml
+    except PackageNotFoundError:
+        # Package is not installed (e.g., running from a local script)
+        return "unknown"
+
+
+def __getattr__(name):
+    if name == "__version__":
+        value = _version()
+    elif name in _exports:
+        value = getattr(import_module(f".{_exports[name]}", __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
 
 __all__ = ["CitablePassage", 
            "CitableCorpus",
            "TEIDivAbReader", 
-           "extract_text", "TEIDiplomatic", "TEINormalized"]
\ No newline at end of file
+           "extract_text", "extract_texts", "build_editions", "build_editions_from_tei", "TEIDiplomatic", "TEINormalized",
+           "EditionRules", "RuleEditionBuilder", "LazyEdition",
+           "ingest_tei_files", "IngestionResult", "IngestionError",
+           "read_tei", "read_cex", "edition_stage", "editions_stage", "write_cex", "tei_to_cex", "tei_files_to_cex",
+           "IngestionCache",
+           "WorkRewriter", "rewrite_works",
+           "Instrumentation", "instrumented",
+           "CexIndex", "StaleIndexError", "CorpusServer", "aiter_cex", "gil_enabled", "SharedCorpus", "CorpusView",
+           "extraction_cache_info", "set_extraction_cache_size", "clear_extraction_cache"]
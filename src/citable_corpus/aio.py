@@ -0,0 +1,120 @@
+"""asyncio support: non-blocking downloads and streams of passages.
+
+CEX sources are downloaded with `urllib` on worker threads (`asyncio.to_thread`),
+so an event loop keeps serving other tasks while data arrives, and passages are
+parsed in batches on an executor.  Downloads honour the proxy environment
+variables as `urllib` does, time out after `default_timeout` seconds without
+data, and refuse redirects from https to http.
+
+    async for passage in aiter_cex("https://example.org/corpus.cex"):
+        ...
+"""
+import asyncio
+from concurrent.futures import Executor
+from typing import AsyncIterator, List
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+from .passage import CitablePassage
+
+default_timeout = 60.0
+
+
+class _RedirectHandler(HTTPRedirectHandler):
+    "Follow redirects as urllib does, except from https to another scheme."
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urlsplit(req.full_url).scheme == "https" and urlsplit(newurl).scheme != "https":
+            raise HTTPError(newurl, code, "refusing to follow a redirect from https to http", headers, fp)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _open(url: str, timeout: float):
+    if urlsplit(url).scheme not in ("http", "https"):
+        raise ValueError(f"Only http and https URLs are supported: {url}")
+    return build_opener(_RedirectHandler).open(Request(url, headers={"User-Agent": "citable_corpus"}), timeout=timeout)
+
+
+async def iter_url(url: str, chunk_size: int = 1 << 16, timeout: float = None) -> AsyncIterator[bytes]:
+    """Download `url` without blocking the event loop, yielding the body in chunks as it arrives.
+
+    The download runs on `urllib` in worker threads, so redirects, proxies and
+    errors are handled as by `from_cex_url`.
+
+    Args:
+        url (str): http or https URL.
+        chunk_size (int): Largest number of bytes yielded at a time. Default is 64 KiB.
+        timeout (float): Seconds to wait for the connection or for data. Default is `default_timeout`.
+
+    Raises:
+        HTTPError: If the server answers with an error status, or redirects from https to http.
+        ValueError: If the URL is not http or https.
+    """
+    response = await asyncio.to_thread(_open, url, default_timeout if timeout is None else timeout)
+    try:
+        while data := await asyncio.to_thread(response.read, chunk_size):
+            yield data
+    finally:
+        response.close()
+
+
+async def fetch_url(url: str, timeout: float = None) -> bytes:
+    "Download the whole body of `url` without blocking the event loop, as `iter_url` does."
+    return b"".join([chunk async for chunk in iter_url(url, timeout=timeout)])
+
+
+async def _file_lines(f: str, executor: Executor) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    src = await loop.run_in_executor(executor, open, f, "r", -1, "utf-8")
+    try:
+        while lines := await loop.run_in_executor(executor, src.readlines, 1 << 16):
+            for line in lines:
+                yield line
+    finally:
+        src.close()
+
+
+async def _url_lines(url: str) -> AsyncIterator[str]:
+    pending = b""
+    async for chunk in iter_url(url):
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if pending:
+        yield pending.decode("utf-8")
+
+
+async def aiter_cex(source: str, delimiter: str = "|", batch: int = 1000, executor: Executor = None) -> AsyncIterator[CitablePassage]:
+    """Stream the passages of the `ctsdata` blocks of a CEX file or http(s) URL.
+
+    Lines are read without blocking the event loop, and parsed into passages
+    `batch` lines at a time on `executor`, so memory use is bounded by the batch
+    size rather than the size of the source.
+
+    Args:
+        source (str): Path of a CEX file, or an http or https URL.
+        delimiter (str): The delimiter separating the urn and text. Default is '|'.
+        batch (int): Number of lines parsed at a time. Default is 1000.
+        executor (Executor): Executor for reading files and parsing. Default is the event loop's.
+
+    Yields:
+        CitablePassage: Each passage, in order.
+    """
+    from .corpus import passages_from_lines
+    loop = asyncio.get_running_loop()
+    lines = _url_lines(source) if source.startswith(("http://", "https://")) else _file_lines(source, executor)
+    label = None
+    pending: List[str] = []
+    async for line in lines:
+        line = line.rstrip("\r\n")
+        if line.startswith("#!"):
+            label = line[2:]
+        elif label == "ctsdata" and line and not line.startswith("//"):
+            pending.append(line)
+            if len(pending) >= batch:
+                for p in await loop.run_in_executor(executor, passages_from_lines, pending, delimiter):
+                    yield p
+                pending = []
+    if pending:
+        for p in await loop.run_in_executor(executor, passages_from_lines, pending, delimiter):
+            yield p
@@ -0,0 +1,557 @@
+"""Benchmarks of the core operations on synthetic corpora of 10k, 100k or 1M passages.
+
+Synthetic corpora are modelled on the test data: a CEX corpus of short Latin
+passages cited by fable and section like `hyginus.cex`, and a TEI document of
+`div`/`ab` passages with `choice` and `persName` markup like the Genesis sample.
+Each operation is timed and reported with its throughput and the peak resident
+memory of the process so far.  That peak only ever grows, so it belongs to the
+largest operation run up to that point, not necessarily to the one reported;
+use `--tracemalloc` for the memory of each operation.  Run from the command line:
+
+    python -m citable_corpus.benchmark --sizes 10k,100k,1m --json results.json
+
+Each operation is repeated (`--repeats`) and summarized by its median time with
+a bootstrap confidence interval.  A run can be saved as a named baseline and
+later runs compared against it; the comparison exits with status 1 when a
+tracked operation is slower than the baseline by more than a threshold and
+the two confidence intervals do not overlap:
+
+    python -m citable_corpus.benchmark --save-baseline v0.3
+    python -m citable_corpus.benchmark --compare v0.3 --threshold 0.1
+
+With `--tracemalloc`, each operation is run once more under `tracemalloc` to
+record the peak memory it allocates, and the memory retained by each corpus it
+returns, as measured by `CitableCorpus.memory_usage`.  Tracing slows Python
+down, so these runs are not timed.
+
+With `--imports`, the suite instead measures how long a fresh interpreter
+spends importing the package and some of its exports, using `python -X importtime`.
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+from pydantic import BaseModel
+from urn_citation import CtsUrn
+from .corpus import CitableCorpus
+from .markupreader import TEIDivAbReader
+from .editionbuilders import TEINormalized, build_editions, clear_extraction_cache
+from .parallel import gil_enabled
+from .navigation import CitationIndex
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+
+sizes = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+default_sizes = ["10k", "100k"]
+default_baseline_dir = ".benchmarks"
+
+cex_urnbase = "urn:cts:latinLit:stoa1263.stoa001.hc:"
+tei_urnbase = "urn:cts:compnov:bible.genesis.sept_latin:"
+sections_per_fable = 12
+abs_per_div = 31
+
+vocabulary = """et in est ex deus terra caelum mare aqua filius filia rex regina
+    uxor pater mater frater soror dixit fecit vocauit vidit erat sunt cum ad
+    quod quae qui eius ipse super inter sub lux nox dies aether chaos oceanus
+    iuppiter iuno neptunus saturnus apollo minerva venus mercurius hercules
+    iason medea theseus ariadne ulixes achilles troia argo uellus aureum
+    bellum ignis uentus mons flumen insula urbs templum oraculum sacrificium
+    responsum postquam itaque autem enim quoque tamen primum deinde semper""".split()
+persons = ["Iuppiter", "Iuno", "Neptunus", "Hercules", "Iason", "Medea", "Theseus", "Adam", "Noe", "Abraham"]
+import_statements = {
+    "import citable_corpus": "import citable_corpus",
+    "import CitableCorpus": "from citable_corpus import CitableCorpus",
+    "import TEIDivAbReader": "from citable_corpus import TEIDivAbReader",
+    "import build_editions": "from citable_corpus import build_editions",
+}
+abbreviations = [("q", "quae"), ("sm", "secundum"), ("ds", "deus"), ("dns", "dominus"), ("ei", "eius"), ("Ca.", "Capitulum")]
+
+
+class BenchmarkResult(BaseModel):
+    """Timing of one operation on one synthetic corpus.
+
+    Attributes:
+        operation (str): Name of the operation, e.g. `CitableCorpus.retrieve`.
+        size (int): Number of passages in the synthetic corpus.
+        items (int): Number of items processed: passages, or queries for retrieval.
+        seconds (float): Median elapsed wall-clock time over all repeats.
+        throughput (float): Items per second at the median time.
+        process_peak_rss (int): Peak resident memory in bytes of the whole process up to the end of the operation,
+            or None where unavailable.  It includes every earlier operation, so it is not this operation's own peak.
+        samples (List[float]): Elapsed time of each repeat.
+        ci_low (float): Lower bound of the confidence interval of the median time.
+        ci_high (float): Upper bound of the confidence interval of the median time.
+        peak_alloc (int): Peak memory allocated by one run in bytes, traced with `tracemalloc`, or None if not traced.
+        retained (int): Memory in bytes of the corpus the operation returns, or None if not traced or not a corpus.
+    """
+    operation: str
+    size: int
+    items: int
+    seconds: float
+    throughput: float
+    process_peak_rss: Optional[int] = None
+    samples: List[float] = []
+    ci_low: Optional[float] = None
+    ci_high: Optional[float] = None
+    peak_alloc: Optional[int] = None
+    retained: Optional[int] = None
+
+
+class BenchmarkReport(BaseModel):
+    """Results of a benchmark run, with a description of the environment it ran in.
+
+    Attributes:
+        created (str): ISO 8601 time the run finished.
+        environment (dict): Python version, implementation, platform and library version.
+        results (List[BenchmarkResult]): One result per operation and corpus size.
+    """
+    created: str
+    environment: dict
+    results: List[BenchmarkResult]
+
+    def to_json(self, f: str):
+        "Write the report to a JSON file."
+        with open(f, 'w', encoding='utf-8') as out:
+            out.write(self.model_dump_json(indent=2))
+
+    @classmethod
+    def from_json(cls, f: str) -> BenchmarkReport:
+        "Read a report from a JSON file."
+        with open(f, 'r', encoding='utf-8') as src:
+            return cls.model_validate(json.load(src))
+
+
+def parse_size(s: str) -> int:
+    "Number of passages for a size name such as `100k` or `1m`, or a plain number."
+    s = s.strip().lower()
+    if s in sizes:
+        return sizes[s]
+    return int(s.replace("_", ""))
+
+
+def process_peak_rss():
+    "Peak resident memory of this process since it started, in bytes, or None if the platform cannot report it."
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _words(rng, lo, hi):
+    return " ".join(rng.choice(vocabulary) for _ in range(rng.randint(lo, hi)))
+
+
+def cex_refs(n: int) -> List[str]:
+    "Passage references of a synthetic CEX corpus of `n` passages: sections `1` to `sections_per_fable` of successive fables."
+    return [f"{i // sections_per_fable + 1}.{i % sections_per_fable + 1}" for i in range(n)]
+
+
+def synthetic_cex(f: str, n: int, seed: int = 0):
+    "Write a synthetic CEX corpus of `n` passages to file `f`, in the style of `hyginus.cex`."
+    rng = random.Random(seed)
+    with open(f, 'w', encoding='utf-8') as out:
+        out.write("#!ctsdata\n")
+        for ref in cex_refs(n):
+            out.write(f"{cex_urnbase}{ref}|{_words(rng, 4, 40).capitalize()}.\n")
+
+
+def _tei_ab(rng):
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        parts.append(_words(rng, 2, 10))
+        roll = rng.random()
+        if roll < 0.5:
+            abbr, expan = rng.choice(abbreviations)
+            parts.append(f"<choice><abbr>{abbr}</abbr><expan>{expan}</expan></choice>")
+        elif roll < 0.8:
+            parts.append(f"<persName>{rng.choice(persons)}</persName>")
+    return " ".join(parts)
+
+
+def synthetic_tei(f: str, n: int, seed: int = 0):
+    "Write a synthetic TEI document of `n` `ab` passages to file `f`, in the style of the Genesis sample."
+    rng = random.Random(seed)
+    with open(f, 'w', encoding='utf-8') as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n<TEI xmlns="http://www.tei-c.org/ns/1.0">\n  <text>\n    <body>\n')
+        for start in range(0, n, abs_per_div):
+            out.write(f'        <div n="{start // abs_per_div + 1}">\n')
+            for i in range(1, min(abs_per_div, n - start) + 1):
+                out.write(f'          <ab n="{i}">\n            {_tei_ab(rng)}\n          </ab>\n')
+            out.write('        </div>\n')
+        out.write('    </body>\n  </text>\n</TEI>\n')
+
+
+def median_ci(samples: List[float], confidence: float = 0.95, resamples: int = 1000, seed: int = 0):
+    """Bootstrap confidence interval of the median of `samples`.
+
+    Returns:
+        Tuple[float, float]: Lower and upper bounds; both equal the sample for a single sample.
+    """
+    if len(samples) < 2:
+        return samples[0], samples[0]
+    rng = random.Random(seed)
+    medians = sorted(statistics.median(rng.choices(samples, k=len(samples))) for _ in range(resamples))
+    tail = (1 - confidence) / 2
+    return medians[int(tail * resamples)], medians[min(resamples - 1, int((1 - tail) * resamples))]
+
+
+def traced(fn, setup = None):
+    """Call `fn` once under `tracemalloc`, calling `setup` first (untraced).
+
+    Returns:
+        Tuple: The value returned by `fn` and the peak memory it allocated in bytes.
+    """
+    if setup is not None:
+        setup()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    try:
+        value = fn()
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return value, peak
+
+
+def measure(operation: str, size: int, items: int, fn, repeats: int = 1, setup = None, trace: bool = False):
+    """Time `repeats` calls of `fn`, calling `setup` (untimed) before each one.  With
+    `trace`, make one further, untimed call under `tracemalloc` to record memory.
+
+    Returns:
+        Tuple: The value returned by the last call of `fn` and a BenchmarkResult.
+    """
+    samples = []
+    for _ in range(max(1, repeats)):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        value = fn()
+        samples.append(time.perf_counter() - start)
+    rss = process_peak_rss()
+    peak = retained = None
+    if trace:
+        del value
+        value, peak = traced(fn, setup)
+        if isinstance(value, CitableCorpus):
+            retained = value.memory_usage()["total"]
+    return value, summarize(operation, size, items, samples, process_peak_rss=rss, peak_alloc=peak, retained=retained)
+
+
+def summarize(operation: str, size: int, items: int, samples: List[float], **extra) -> BenchmarkResult:
+    "Summarize timings of repeated runs of an operation by their median and its confidence interval. `extra` sets further fields of the result."
+    seconds = statistics.median(samples)
+    lo, hi = median_ci(samples)
+    throughput = items / seconds if seconds > 0 else float("inf")
+    return BenchmarkResult(operation=operation, size=size, items=items, seconds=seconds, throughput=throughput,
+                           samples=samples, ci_low=lo, ci_high=hi, **extra)
+
+
+def _importtime_entries(statement: str):
+    "Run `statement` in a fresh interpreter with `-X importtime` and yield (module, cumulative microseconds) for each top-level import."
+    env = dict(os.environ)
+    # Import this copy of the package, installed or not
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join([root] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], env=env, capture_output=True, text=True, check=True)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented beyond the single space after the separator
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            yield name.strip(), int(cumulative)
+
+
+_startup_modules: Set[str] = set()
+
+
+def import_time(statement: str) -> float:
+    """Seconds a fresh interpreter spends importing modules to run `statement`, as
+    reported by `python -X importtime`.  Modules the interpreter imports at startup
+    are not counted."""
+    if not _startup_modules:
+        _startup_modules.update(name for name, _ in _importtime_entries("pass"))
+    return sum(us for name, us in _importtime_entries(statement) if name not in _startup_modules) / 1e6
+
+
+def run_imports(repeats: int = 5, verbose: bool = True) -> BenchmarkReport:
+    """Measure the import time of the package and some of its exports, each in `repeats` fresh interpreters.
+
+    Returns:
+        BenchmarkReport: One result per entry of `import_statements`.
+    """
+    results = []
+    for operation, statement in import_statements.items():
+        r = summarize(operation, 0, 1, [import_time(statement) for _ in range(max(1, repeats))])
+        if verbose:
+            print(format_result(r), flush=True)
+        results.append(r)
+    return BenchmarkReport(created=datetime.now(timezone.utc).isoformat(), environment=environment(), results=results)
+
+
+def query_refs(n: int, queries: int):
+    "Single-passage and range references spread evenly through a synthetic CEX corpus of `n` passages."
+    refs = cex_refs(n)
+    step = max(1, n // queries)
+    singles = [CtsUrn.from_string(cex_urnbase + refs[i]) for i in range(0, n, step)][:queries]
+    ranges = [CtsUrn.from_string(f"{cex_urnbase}{refs[i]}-{refs[min(i + 9, n - 1)]}") for i in range(0, n, step)][:queries]
+    return singles, ranges
+
+
+def run_size(n: int, workdir: str, queries: int = 20, seed: int = 0, repeats: int = 1, trace: bool = False) -> List[BenchmarkResult]:
+    """Benchmark every operation on synthetic corpora of `n` passages written to `workdir`.
+
+    Args:
+        n (int): Number of passages.
+        workdir (str): Directory for the synthetic CEX and TEI files.
+        queries (int): Number of retrieval queries of each kind. Default is 20.
+        seed (int): Seed for generating text. Default is 0.
+        repeats (int): Number of times to time each operation. Default is 1.
+        trace (bool): Also record memory with `tracemalloc`. Default is False.
+
+    Returns:
+        List[BenchmarkResult]: One result per operation.
+    """
+    results = []
+    cexfile = os.path.join(workdir, f"synthetic_{n}.cex")
+    teifile = os.path.join(workdir, f"synthetic_{n}.xml")
+    synthetic_cex(cexfile, n, seed)
+    synthetic_tei(teifile, n, seed)
+    singles, ranges = query_refs(n, queries)
+
+    corpus, r = measure("CitableCorpus.from_cex_file", n, n, lambda: CitableCorpus.from_cex_file(cexfile), repeats, trace=trace)
+    results.append(r)
+    _, r = measure("CitableCorpus.retrieve", n, len(singles), lambda: [corpus.retrieve(u) for u in singles], repeats, trace=trace)
+    results.append(r)
+    _, r = measure("CitableCorpus.retrieve_range", n, len(ranges), lambda: [corpus.retrieve_range(u) for u in ranges], repeats, trace=trace)
+    results.append(r)
+    _, r = measure("CitableCorpus.view", n, len(ranges), lambda: [corpus.view(u) for u in ranges], repeats, trace=trace)
+    results.append(r)
+    _, r = measure("CitationIndex", n, n, lambda: CitationIndex(corpus.passages), repeats, trace=trace)
+    results.append(r)
+    _, r = measure("CitableCorpus.next", n, len(singles), lambda: [corpus.next(u) for u in singles], repeats, corpus._citations, trace)
+    results.append(r)
+
+    def warm_cache():
+        corpus.enable_cache()
+        for u in singles:
+            corpus.retrieve(u)
+    _, r = measure("CitableCorpus.retrieve cached", n, len(singles), lambda: [corpus.retrieve(u) for u in singles], repeats, warm_cache, trace)
+    results.append(r)
+    corpus.disable_cache()
+    _, r = measure("CitableCorpus.to_cex", n, n, corpus.to_cex, repeats, trace=trace)
+    results.append(r)
+    pickled, r = measure("pickle.dumps CitableCorpus", n, n, lambda: pickle.dumps(corpus, pickle.HIGHEST_PROTOCOL), repeats, trace=trace)
+    results.append(r)
+    _, r = measure("pickle.loads CitableCorpus", n, n, lambda: pickle.loads(pickled), repeats, trace=trace)
+    results.append(r)
+    js, r = measure("CitableCorpus.to_json", n, n, corpus.to_json, repeats, trace=trace)
+    results.append(r)
+    _, r = measure("CitableCorpus.from_json", n, n, lambda: CitableCorpus.from_json(js), repeats, trace=trace)
+    results.append(r)
+    _, r = measure("CitableCorpus.from_json trusted", n, n, lambda: CitableCorpus.from_json(js, trusted=True), repeats, trace=trace)
+    results.append(r)
+    del pickled, js
+    del corpus
+
+    def read_tei():
+        with open(teifile, 'r', encoding='utf-8') as f:
+            return TEIDivAbReader.corpus(f.read(), tei_urnbase)
+    xmlcorpus, r = measure("TEIDivAbReader.corpus", n, n, read_tei, repeats, trace=trace)
+    results.append(r)
+    _, r = measure("TEINormalized.edition", n, n, lambda: TEINormalized.edition(xmlcorpus), repeats, clear_extraction_cache, trace)
+    results.append(r)
+    _, r = measure("build_editions", n, n, lambda: build_editions(xmlcorpus), repeats, clear_extraction_cache, trace)
+    results.append(r)
+    return results
+
+
+def environment() -> dict:
+    "Describe the interpreter and platform a benchmark runs on."
+    from . import __version__
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "gil": gil_enabled(),
+        "citable_corpus": __version__,
+    }
+
+
+def run(passage_counts: List[int], queries: int = 20, seed: int = 0, repeats: int = 1, trace: bool = False, verbose: bool = True) -> BenchmarkReport:
+    """Run the benchmark suite on synthetic corpora of each size in turn.
+
+    Args:
+        passage_counts (List[int]): Corpus sizes in passages.
+        queries (int): Number of retrieval queries of each kind. Default is 20.
+        seed (int): Seed for generating text. Default is 0.
+        repeats (int): Number of times to time each operation. Default is 1.
+        trace (bool): Also record memory with `tracemalloc`. Default is False.
+        verbose (bool): Print each result as it is measured. Default is True.
+
+    Returns:
+        BenchmarkReport: All results.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in passage_counts:
+            for r in run_size(n, workdir, queries, seed, repeats, trace):
+                if verbose:
+                    print(format_result(r), flush=True)
+                results.append(r)
+    return BenchmarkReport(created=datetime.now(timezone.utc).isoformat(), environment=environment(), results=results)
+
+
+def format_result(r: BenchmarkResult) -> str:
+    "Format a result as one line of a table."
+    rss = f"{r.process_peak_rss / 2**20:9.1f} MiB" if r.process_peak_rss is not None else "        n/a"
+    spread = f"{r.ci_low:.4f}-{r.ci_high:.4f}" if r.ci_low is not None else ""
+    line = f"{r.operation:<30} {r.size:>9} {r.seconds:10.4f} s {r.throughput:14.1f} /s {rss}  {spread}"
+    if r.peak_alloc is not None:
+        line += f"  peak alloc {r.peak_alloc / 2**20:.1f} MiB"
+    if r.retained is not None:
+        line += f", retained {r.retained / 2**20:.1f} MiB"
+    return line
+
+
+class Comparison(BaseModel):
+    """Comparison of one operation between a baseline and a new run.
+
+    Attributes:
+        operation (str): Name of the operation.
+        size (int): Number of passages in the synthetic corpus.
+        baseline (BenchmarkResult): Result in the baseline.
+        current (BenchmarkResult): Result in the new run.
+        ratio (float): Median time of the new run divided by median time of the baseline.
+        regressed (bool): True if the operation is tracked, slower than the threshold allows,
+            and its confidence interval lies wholly above the baseline's.
+    """
+    operation: str
+    size: int
+    baseline: BenchmarkResult
+    current: BenchmarkResult
+    ratio: float
+    regressed: bool
+
+
+def baseline_path(name: str, directory: str = default_baseline_dir) -> str:
+    "Path of the JSON file for baseline `name`; a name that is already a path to a file is returned as is."
+    if os.path.isfile(name):
+        return name
+    return os.path.join(directory, f"{name}.json")
+
+
+def save_baseline(report: BenchmarkReport, name: str, directory: str = default_baseline_dir) -> str:
+    "Save a report as baseline `name` in `directory`, creating the directory if needed, and return the file's path."
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.json")
+    report.to_json(path)
+    return path
+
+
+def load_baseline(name: str, directory: str = default_baseline_dir) -> BenchmarkReport:
+    "Load baseline `name` from `directory`, or from the JSON file `name`."
+    return BenchmarkReport.from_json(baseline_path(name, directory))
+
+
+def compare(baseline: BenchmarkReport, current: BenchmarkReport, threshold: float = 0.1, operations: List[str] = None) -> List[Comparison]:
+    """Compare a run with a baseline, operation by operation and size by size.
+
+    An operation regresses when its median time exceeds the baseline's by more than
+    `threshold`, and its confidence interval lies wholly above the baseline's, so
+    that noise within the spread of repeated runs is not reported.  Operations or
+    sizes missing from either run are skipped.
+
+    Args:
+        baseline (BenchmarkReport): The reference run.
+        current (BenchmarkReport): The new run.
+        threshold (float): Tolerated slowdown as a fraction, e.g. 0.1 for 10%. Default is 0.1.
+        operations (List[str]): Names of tracked operations. Default is every operation.
+
+    Returns:
+        List[Comparison]: One comparison per operation and size present in both runs.
+    """
+    before: Dict[tuple, BenchmarkResult] = {(r.operation, r.size): r for r in baseline.results}
+    comparisons = []
+    for r in current.results:
+        b = before.get((r.operation, r.size))
+        if b is None:
+            continue
+        ratio = r.seconds / b.seconds if b.seconds > 0 else float("inf")
+        separated = r.ci_low is None or b.ci_high is None or r.ci_low > b.ci_high
+        tracked = operations is None or r.operation in operations
+        regressed = tracked and ratio > 1 + threshold and separated
+        comparisons.append(Comparison(operation=r.operation, size=r.size, baseline=b, current=r, ratio=ratio, regressed=regressed))
+    return comparisons
+
+
+def format_comparison(c: Comparison) -> str:
+    "Format a comparison as one line of a table."
+    flag = "REGRESSION" if c.regressed else ""
+    return f"{c.operation:<30} {c.size:>9} {c.baseline.seconds:10.4f} s {c.current.seconds:10.4f} s {c.ratio:7.2f}x  {flag}"
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m citable_corpus.benchmark", description="Benchmark citable_corpus on synthetic corpora.")
+    parser.add_argument("--sizes", default=",".join(default_sizes), help="Comma-separated corpus sizes: 10k, 100k, 1m or a number of passages. Default: %(default)s")
+    parser.add_argument("--queries", type=int, default=20, help="Retrieval queries of each kind per corpus. Default: %(default)s")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generating synthetic text. Default: %(default)s")
+    parser.add_argument("--repeats", type=int, default=3, help="Times to run each operation; the median is reported. Default: %(default)s")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also run each operation under tracemalloc to record peak allocation and retained memory")
+    parser.add_argument("--imports", action="store_true", help="Measure import times with -X importtime instead of corpus operations")
+    parser.add_argument("--json", metavar="FILE", help="Write results to FILE as JSON")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Save results as baseline NAME")
+    parser.add_argument("--compare", metavar="NAME", help="Compare results with baseline NAME (or a JSON file) and exit with status 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Tolerated slowdown as a fraction of the baseline time. Default: %(default)s")
+    parser.add_argument("--track", help="Comma-separated operations checked for regressions. Default: all")
+    parser.add_argument("--baseline-dir", default=default_baseline_dir, help="Directory of saved baselines. Default: %(default)s")
+    args = parser.parse_args(argv)
+
+    counts = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    baseline = load_baseline(args.compare, args.baseline_dir) if args.compare else None
+    print(f"{'operation':<30} {'passages':>9} {'median':>12} {'throughput':>17} {'process peak':>13}  {'95% CI':>13}")
+    if args.imports:
+        report = run_imports(args.repeats)
+    else:
+        report = run(counts, args.queries, args.seed, args.repeats, args.tracemalloc)
+    if args.json:
+        report.to_json(args.json)
+    if args.save_baseline:
+        print(f"Saved baseline {args.save_baseline} to {save_baseline(report, args.save_baseline, args.baseline_dir)}")
+    if baseline is None:
+        return 0
+
+    tracked = [op.strip() for op in args.track.split(",")] if args.track else None
+    comparisons = compare(baseline, report, args.threshold, tracked)
+    print(f"\n{'operation':<30} {'passages':>9} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for c in comparisons:
+        print(format_comparison(c))
+    regressions = [c for c in comparisons if c.regressed]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%} against baseline {args.compare}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
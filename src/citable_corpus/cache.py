@@ -0,0 +1,180 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from typing import Callable, List, Optional, Union
+from .corpus import CitableCorpus
+from .passage import CitablePassage
+from .markupreader import TEIDivAbReader
+
+CACHE_FORMAT = 3
+
+
+class IngestionCache:
+    """An on-disk cache of passages read from TEI and CEX source files.
+
+    Entries are keyed by a hash of the source file's content together with the
+    reader and its configuration (for example, the base URN given to
+    `TEIDivAbReader`), so an edited file or a changed configuration is always
+    re-read.  Each entry is a pickled CitableCorpus, whose columnar pickle
+    restores the passages without re-parsing or re-validating URNs.  Entries
+    that cannot be read (removed meanwhile, truncated, or written by another
+    version) are misses, and are deleted.
+
+    Attributes:
+        directory (str): Directory holding the cache entries.
+        max_bytes (int): Evict least recently used entries once the cache exceeds this size. None for no limit.
+        max_age (float): Evict entries not used for this many seconds. None for no limit.
+    """
+
+    suffix = ".pkl"
+
+    def __init__(self, directory: str, max_bytes: int = None, max_age: float = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return f"IngestionCache({self.directory!r}, max_bytes={self.max_bytes}, max_age={self.max_age})"
+
+    @staticmethod
+    def key(content: bytes, reader: str, **config) -> str:
+        """Compute the cache key for a source's content read with a given reader configuration.
+
+        Args:
+            content (bytes): Raw content of the source file.
+            reader (str): Name of the reader.
+            **config: Reader settings that affect the resulting passages.
+
+        Returns:
+            str: Hex digest identifying the cache entry.
+        """
+        h = hashlib.sha256()
+        h.update(f"{CACHE_FORMAT}|{reader}|{sorted(config.items())!r}|".encode("utf-8"))
+        h.update(content)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _load(self, key: str) -> Optional[CitableCorpus]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                corpus = pickle.load(f)
+            if not isinstance(corpus, CitableCorpus):
+                raise ValueError(f"Cache entry {key} does not hold a corpus")
+            # Touch the entry so that eviction is least-recently-used.
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError, TypeError, ValueError):
+            self._remove(path)
+            return None
+        return corpus
+
+    def get(self, key: str) -> Optional[List[CitablePassage]]:
+        """Look up the passages stored for a key, or None on a miss."""
+        corpus = self._load(key)
+        return None if corpus is None else corpus.passages
+
+    def put(self, key: str, passages: Union[CitableCorpus, List[CitablePassage]]):
+        """Store a corpus, or a list of passages, for a key, replacing any existing entry."""
+        corpus = passages if isinstance(passages, CitableCorpus) else CitableCorpus(passages=list(passages))
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(corpus, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def entries(self) -> List[os.DirEntry]:
+        "List cache entries, oldest first by last use."
+        with os.scandir(self.directory) as it:
+            found = [e for e in it if e.is_file() and e.name.endswith(self.suffix)]
+        return sorted(found, key=lambda e: e.stat().st_mtime)
+
+    def size(self) -> int:
+        "Total size of the cache entries in bytes."
+        return sum(e.stat().st_size for e in self.entries())
+
+    def evict(self) -> int:
+        """Remove entries older than `max_age`, then least recently used entries until the cache fits in `max_bytes`.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        removed = 0
+        entries = self.entries()
+        if self.max_age is not None:
+            cutoff = time.time() - self.max_age
+            expired = [e for e in entries if e.stat().st_mtime < cutoff]
+            for e in expired:
+                removed += self._remove(e.path)
+            entries = entries[len(expired):]
+        if self.max_bytes is not None:
+            total = sum(e.stat().st_size for e in entries)
+            for e in entries:
+                if total <= self.max_bytes:
+                    break
+                total -= e.stat().st_size
+                removed += self._remove(e.path)
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.unlink(path)
+            return 1
+        except OSError:
+            return 0
+
+    def clear(self):
+        "Remove every entry from the cache."
+        for e in self.entries():
+            self._remove(e.path)
+
+    def tei_passages(self, path: str, baseurn: str) -> List[CitablePassage]:
+        """Read passages from a TEI file with `TEIDivAbReader`, using the cache when the file is unchanged.
+
+        Args:
+            path (str): Path of the TEI file.
+            baseurn (str): Base URN for passages in the file.
+
+        Returns:
+            List[CitablePassage]: The passages of the file.
+        """
+        return self._read(path, "TEIDivAbReader", lambda s: TEIDivAbReader.corpus(s, baseurn), baseurn=baseurn).passages
+
+    def cex_passages(self, path: str, delimiter: str = "|") -> List[CitablePassage]:
+        """Read passages from a CEX file, using the cache when the file is unchanged.
+
+        Args:
+            path (str): Path of the CEX file.
+            delimiter (str): The delimiter separating the urn and text. Default is '|'.
+
+        Returns:
+            List[CitablePassage]: The passages of the file.
+        """
+        return self._read(path, "ctsdata", lambda s: CitableCorpus.from_cex(s, delimiter), delimiter=delimiter).passages
+
+    def _read(self, path: str, reader: str, parse: Callable[[str], CitableCorpus], **config) -> CitableCorpus:
+        # The file is read once: the bytes that are hashed for the key are the bytes parsed on a miss.
+        with open(path, "rb") as f:
+            content = f.read()
+        k = self.key(content, reader, **config)
+        corpus = self._load(k)
+        if corpus is None:
+            corpus = parse(content.decode("utf-8"))
+            self.put(k, corpus)
+        return corpus
+
+    def corpus_from_tei_file(self, path: str, baseurn: str) -> CitableCorpus:
+        "Create a CitableCorpus from a TEI file, reading through the cache."
+        return self._read(path, "TEIDivAbReader", lambda s: TEIDivAbReader.corpus(s, baseurn), baseurn=baseurn)
+
+    def corpus_from_cex_file(self, path: str, delimiter: str = "|") -> CitableCorpus:
+        "Create a CitableCorpus from a CEX file, reading through the cache."
+        return self._read(path, "ctsdata", lambda s: CitableCorpus.from_cex(s, delimiter), delimiter=delimiter)
@@ -0,0 +1,270 @@
+"""A persistent index of the passages in a CEX file, for looking passages up without loading the corpus.
+
+The index is an SQLite database recording, for each passage of the file's
+`ctsdata` blocks, the components of its URN and the byte offset and length of
+its line in the CEX file.  Lookups read only the matching lines, and use only
+the standard library, so they start quickly: nothing here imports pydantic or
+`urn_citation`.  URN references are resolved as `CitableCorpus.retrieve`
+resolves them.  Optionally, the index also records the words of each
+passage for text search.
+
+An index can be shared between threads: each thread queries it through a
+connection of its own, and SQLite releases the GIL while it searches.
+"""
+import itertools
+import os
+import re
+import sqlite3
+import threading
+from typing import Iterator, List, Optional, Tuple
+from .parallel import map_chunks
+
+INDEX_FORMAT = 1
+
+_schema = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE passages (
+    ordinal INTEGER PRIMARY KEY,
+    urn TEXT NOT NULL,
+    text_group TEXT,
+    work TEXT,
+    version TEXT,
+    exemplar TEXT,
+    ref TEXT,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX passages_ref ON passages (ref);
+CREATE INDEX passages_work ON passages (work);
+"""
+
+_text_schema = """
+CREATE TABLE words (word TEXT NOT NULL, ordinal INTEGER NOT NULL);
+CREATE INDEX words_word ON words (word, ordinal);
+"""
+
+_word = re.compile(r"\w+")
+
+
+class StaleIndexError(Exception):
+    "The CEX file has changed since its index was built."
+
+
+def split_urn(urn: str) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]:
+    """Split a CTS URN string into its text group, work, version, exemplar and passage, without validating it.
+
+    Missing components are None.
+
+    Raises:
+        ValueError: If the string does not have the five colon-separated parts of a CTS URN.
+    """
+    parts = urn.split(":")
+    if len(parts) != 5 or parts[0] != "urn" or parts[1] != "cts":
+        raise ValueError(f"Not a CTS URN: {urn}")
+    work = parts[3].split(".") + [None] * 4
+    passage = parts[4] or None
+    return work[0] or None, work[1], work[2], work[3], passage
+
+
+def iter_cex_lines(f: str, delimiter: str = "|") -> Iterator[Tuple[str, str, int, int]]:
+    "Yield (URN string, text, byte offset, byte length) for each passage line in the `ctsdata` blocks of CEX file `f`."
+    sep = delimiter.encode("utf-8")
+    label = None
+    offset = 0
+    with open(f, "rb") as src:
+        for raw in src:
+            line = raw.rstrip(b"\r\n")
+            if line.startswith(b"#!"):
+                label = line[2:].strip()
+            elif label == b"ctsdata" and line.strip() and not line.startswith(b"//"):
+                urn, found, text = line.partition(sep)
+                if found:
+                    yield urn.decode("utf-8").strip(), text.decode("utf-8").strip(), offset, len(line)
+            offset += len(raw)
+
+
+def _words(text: str):
+    return {w.lower() for w in _word.findall(text)}
+
+
+def _fingerprint(f: str) -> dict:
+    st = os.stat(f)
+    return {"size": str(st.st_size), "mtime_ns": str(st.st_mtime_ns)}
+
+
+class CexIndex:
+    """A persistent index of a CEX file, opened read-only.
+
+    Attributes:
+        path (str): Path of the index file.
+        source (str): Path of the indexed CEX file.
+        delimiter (str): Delimiter between the URN and text of a passage.
+        has_text (bool): Whether the index records words for text search.
+    """
+
+    def __init__(self, path: str, check: bool = True):
+        """Open the index at `path`.  With `check`, raise StaleIndexError if the CEX file has changed since it was indexed."""
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if int(meta.get("format", 0)) != INDEX_FORMAT:
+            raise ValueError(f"{path} is not an index in format {INDEX_FORMAT}; rebuild it")
+        self.source = meta["source"]
+        self.delimiter = meta["delimiter"]
+        self.has_text = meta.get("text") == "1"
+        if check and _fingerprint(self.source) != {"size": meta["size"], "mtime_ns": meta["mtime_ns"]}:
+            raise StaleIndexError(f"{self.source} has changed since it was indexed in {path}")
+
+    @classmethod
+    def build(cls, cexfile: str, path: str, text: bool = False, delimiter: str = "|", batch: int = 10000) -> CexIndex:
+        """Index the passages of a CEX file, replacing any existing index at `path`.
+
+        Args:
+            cexfile (str): Path of the CEX file.
+            path (str): Path of the index file to write.
+            text (bool): Also record the words of each passage for `search`. Default is False.
+            delimiter (str): The delimiter separating the urn and text. Default is '|'.
+            batch (int): Number of passages inserted at a time. Default is 10000.
+
+        Returns:
+            CexIndex: The new index.
+        """
+        tmp = f"{path}.tmp{os.getpid()}"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        db = sqlite3.connect(tmp)
+        try:
+            db.executescript(_schema + (_text_schema if text else ""))
+            meta = {"format": str(INDEX_FORMAT), "source": os.path.abspath(cexfile), "delimiter": delimiter,
+                    "text": "1" if text else "0", **_fingerprint(cexfile)}
+            db.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+            passages = enumerate(iter_cex_lines(cexfile, delimiter))
+            while chunk := list(itertools.islice(passages, batch)):
+                db.executemany("INSERT INTO passages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               ((i, urn, *split_urn(urn), offset, length) for i, (urn, _, offset, length) in chunk))
+                if text:
+                    db.executemany("INSERT INTO words VALUES (?, ?)", ((w, i) for i, (_, t, _, _) in chunk for w in _words(t)))
+            db.commit()
+        finally:
+            db.close()
+        os.replace(tmp, path)
+        return cls(path)
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # The calling thread's connection: an SQLite connection serves one thread at a time.
+        db = getattr(self._local, "db", None)
+        if db is None:
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError(f"Cannot operate on closed index {self.path}")
+                # Not bound to the thread, so that `close` can close it from any thread.
+                db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+                self._connections.append(db)
+            self._local.db = db
+        return db
+
+    def close(self):
+        "Close the connections of every thread that has used the index."
+        with self._lock:
+            self._closed = True
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT count(*) FROM passages").fetchone()[0]
+
+    def works(self) -> List[str]:
+        "Work-level URN strings (ending in a colon) of the works in the index, in order of their first passage."
+        rows = self._db.execute("SELECT urn FROM passages WHERE ordinal IN "
+                                "(SELECT min(ordinal) FROM passages GROUP BY text_group, work, version, exemplar) ORDER BY ordinal")
+        return [urn.rpartition(":")[0] + ":" for (urn,) in rows]
+
+    def _first_containing(self, fields, passage: str) -> Optional[int]:
+        # Like CitableCorpus.retrieve_range: the first passage whose URN contains `passage`,
+        # so the passage itself or one of its ancestors.
+        pieces = passage.split(".")
+        prefixes = [".".join(pieces[:i]) for i in range(1, len(pieces) + 1)]
+        clauses = " AND ".join(f"({c} IS NULL OR {c} = ?)" for c in ("text_group", "work", "version", "exemplar"))
+        marks = ", ".join("?" * len(prefixes))
+        row = self._db.execute(f"SELECT min(ordinal) FROM passages WHERE ref IN ({marks}) AND {clauses}", (*prefixes, *fields)).fetchone()
+        return row[0]
+
+    def ordinals(self, urn: str) -> List[int]:
+        """Positions in the corpus of the passages matching a CTS URN reference, as `CitableCorpus.retrieve_indices` finds them.
+
+        Args:
+            urn (str): A CTS URN: a passage, a containing passage, a range, or a work (ending in a colon).
+
+        Returns:
+            List[int]: Positions of matching passages, in corpus order.
+        """
+        text_group, work, version, exemplar, passage = split_urn(urn)
+        if passage is None:
+            return [r[0] for r in self._db.execute("SELECT ordinal FROM passages WHERE work IS ? ORDER BY ordinal", (work,))]
+        fields = (text_group, work, version, exemplar)
+        pieces = passage.split("-")
+        if len(pieces) == 2:
+            begin = self._first_containing(fields, pieces[0])
+            end = self._first_containing(fields, pieces[1])
+            if begin is None or end is None:
+                return []
+            return list(range(begin, end + 1))
+        clauses = " AND ".join(f"{c} = ?" for c, v in zip(("text_group", "work", "version", "exemplar"), fields) if v is not None)
+        values = [v for v in fields if v is not None]
+        # A passage contains itself and every passage whose reference extends it after a period.
+        query = f"SELECT ordinal FROM passages WHERE (ref = ? OR (ref > ? AND ref < ?)) {'AND ' + clauses if clauses else ''} ORDER BY ordinal"
+        return [r[0] for r in self._db.execute(query, (passage, passage + ".", passage + "/", *values))]
+
+    def lines(self, ordinals: List[int]) -> List[str]:
+        "The CEX lines of the passages at the given positions, with whitespace around the URN and text stripped as `CitablePassage.from_delimited` strips it."
+        if not ordinals:
+            return []
+        spans = {}
+        for start in range(0, len(ordinals), 500):
+            chunk = ordinals[start:start + 500]
+            marks = ", ".join("?" * len(chunk))
+            spans.update((o, (off, n)) for o, off, n in self._db.execute(f"SELECT ordinal, offset, length FROM passages WHERE ordinal IN ({marks})", chunk))
+        result = []
+        with open(self.source, "rb") as src:
+            for o in ordinals:
+                offset, length = spans[o]
+                src.seek(offset)
+                urn, _, text = src.read(length).decode("utf-8").partition(self.delimiter)
+                result.append(f"{urn.strip()}{self.delimiter}{text.strip()}")
+        return result
+
+    def retrieve(self, urn: str) -> List[str]:
+        "The CEX lines of the passages matching a CTS URN reference, in corpus order."
+        return self.lines(self.ordinals(urn))
+
+    def retrieve_many(self, urns: List[str], workers: int = 1) -> List[List[str]]:
+        "The CEX lines of the passages matching each of several CTS URN references, looked up on a pool of `workers` threads."
+        return map_chunks(lambda chunk: [self.retrieve(u) for u in chunk], list(urns), workers)
+
+    def search(self, words: List[str]) -> List[int]:
+        """Positions of the passages containing every one of `words`, ignoring case.
+
+        Raises:
+            ValueError: If the index was built without text.
+        """
+        if not self.has_text:
+            raise ValueError(f"{self.path} was built without a text index")
+        wanted = sorted({w.lower() for w in words})
+        if not wanted:
+            return []
+        query = " INTERSECT ".join("SELECT ordinal FROM words WHERE word = ?" for _ in wanted)
+        return sorted(r[0] for r in self._db.execute(query, wanted))
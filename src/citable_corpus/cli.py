@@ -0,0 +1,163 @@
+"""The `citable-corpus` command.
+
+    citable-corpus convert genesis.xml --urn urn:cts:compnov:bible.genesis.sept_latin: \\
+        --xml genesis.cex --edition normalized=genesis_norm.cex
+    citable-corpus index genesis_norm.cex -o genesis_norm.idx --text
+    citable-corpus query genesis_norm.idx urn:cts:compnov:bible.genesis.sept_latin.normalized:1.1-1.3
+    citable-corpus bench --sizes 10k
+    citable-corpus serve --index genesis=genesis_norm.idx --port 8080
+
+Each subcommand imports only what it needs, so `query`, which reads a persisted
+`CexIndex`, starts without loading pydantic or any corpus.
+"""
+import argparse
+import os
+import sys
+from typing import List
+
+
+def _source(arg: str, baseurn: str):
+    # A source is PATH, using --urn, or PATH=URN.
+    path, found, urn = arg.partition("=")
+    if found:
+        return path, urn
+    if baseurn is None:
+        raise SystemExit(f"citable-corpus convert: no base URN for {arg}; give --urn or PATH=URN")
+    return path, baseurn
+
+
+def _outputs(editions: List[str]) -> dict:
+    from .editionbuilders import standard_editions
+    outputs = {}
+    for arg in editions:
+        name, found, path = arg.partition("=")
+        if not found or name not in standard_editions:
+            raise SystemExit(f"citable-corpus convert: edition must be NAME=FILE with NAME one of {', '.join(standard_editions)}: {arg}")
+        outputs[name] = path
+    return outputs
+
+
+def convert(args) -> int:
+    "Stream TEI files to CEX files of XML passages and of editions."
+    sources = [_source(s, args.urn) for s in args.sources]
+    outputs = _outputs(args.edition)
+    if not outputs and not args.xml:
+        raise SystemExit("citable-corpus convert: nothing to write; give --xml and/or --edition")
+    from .pipeline import tei_files_to_cex
+    count = tei_files_to_cex(sources, outputs, args.xml, args.delimiter, args.workers)
+    print(f"{count} passages from {len(sources)} file(s)", file=sys.stderr)
+    return 0
+
+
+def index(args) -> int:
+    "Build a persistent index of a CEX file."
+    from .cexindex import CexIndex
+    with CexIndex.build(args.cexfile, args.output, text=args.text, delimiter=args.delimiter) as idx:
+        print(f"Indexed {len(idx)} passages of {args.cexfile} in {args.output}", file=sys.stderr)
+    return 0
+
+
+def query(args) -> int:
+    "Print the passages matching URN references or words, using a persistent index."
+    from .cexindex import CexIndex, StaleIndexError
+    try:
+        idx = CexIndex(args.index)
+    except (StaleIndexError, ValueError, FileNotFoundError) as e:
+        print(f"citable-corpus query: {e}", file=sys.stderr)
+        return 2
+    with idx:
+        try:
+            if args.search:
+                ordinals = idx.search(args.search.split())
+                if args.urns:
+                    wanted = {o for u in args.urns for o in idx.ordinals(u)}
+                    ordinals = [o for o in ordinals if o in wanted]
+                lines = idx.lines(ordinals)
+            else:
+                lines = [line for u in args.urns for line in idx.retrieve(u)]
+        except ValueError as e:
+            print(f"citable-corpus query: {e}", file=sys.stderr)
+            return 2
+        out = sys.stdout
+        for line in lines:
+            if args.format == "cex":
+                out.write(line + "\n")
+            else:
+                urn, _, text = line.partition(idx.delimiter)
+                out.write((urn if args.format == "urn" else text) + "\n")
+    return 0 if lines else 1
+
+
+def bench(args) -> int:
+    "Run the benchmark suite."
+    from .benchmark import main as benchmark_main
+    return benchmark_main(args.extra + args.options)
+
+
+def serve(args) -> int:
+    "Serve corpora over HTTP with a CTS-style API."
+    from .server import main as server_main
+    return server_main(args.extra + args.options)
+
+
+def parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="citable-corpus", description="Convert, index and query corpora of citable texts.")
+    commands = p.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    c = commands.add_parser("convert", help="convert TEI files to CEX", description=convert.__doc__)
+    c.add_argument("sources", nargs="+", metavar="SOURCE", help="TEI file, as PATH (with --urn) or PATH=URN")
+    c.add_argument("--urn", help="base URN for sources given without one")
+    c.add_argument("--xml", metavar="FILE", help="write the XML passages to FILE")
+    c.add_argument("--edition", action="append", default=[], metavar="NAME=FILE", help="write edition NAME (diplomatic or normalized) to FILE; may be repeated")
+    c.add_argument("--workers", type=int, default=1, help="worker processes for several sources. Default: %(default)s")
+    c.add_argument("--delimiter", default="|", help="CEX delimiter. Default: %(default)s")
+    c.set_defaults(run=convert)
+
+    i = commands.add_parser("index", help="index a CEX file for querying", description=index.__doc__)
+    i.add_argument("cexfile", metavar="CEX")
+    i.add_argument("-o", "--output", required=True, metavar="INDEX", help="index file to write")
+    i.add_argument("--text", action="store_true", help="also index words for --search")
+    i.add_argument("--delimiter", default="|", help="CEX delimiter. Default: %(default)s")
+    i.set_defaults(run=index)
+
+    q = commands.add_parser("query", help="look up passages in an indexed CEX file", description=query.__doc__)
+    q.add_argument("index", metavar="INDEX")
+    q.add_argument("urns", nargs="*", metavar="URN", help="passage, containing passage, range or work URN")
+    q.add_argument("--search", metavar="WORDS", help="passages containing all of WORDS; with URNs, only within them")
+    q.add_argument("--format", choices=["cex", "text", "urn"], default="cex", help="output CEX lines, texts or URNs. Default: %(default)s")
+    q.set_defaults(run=query)
+
+    b = commands.add_parser("bench", help="run the benchmark suite", description=bench.__doc__, add_help=False)
+    b.add_argument("options", nargs=argparse.REMAINDER, help="options for python -m citable_corpus.benchmark")
+    b.set_defaults(run=bench)
+
+    s = commands.add_parser("serve", help="serve corpora over HTTP", description=serve.__doc__, add_help=False)
+    s.add_argument("options", nargs=argparse.REMAINDER, help="options for python -m citable_corpus.server")
+    s.set_defaults(run=serve)
+    return p
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the `citable-corpus` command with `argv` (default: the command line), returning its exit status.
+
+    `query` exits with status 1 when nothing matches and 2 on a missing, stale or unsuitable index.
+    """
+    p = parser()
+    # Options after `bench` and `serve` belong to the modules they run, which parse them themselves.
+    args, extra = p.parse_known_args(argv)
+    if extra and args.command not in ("bench", "serve"):
+        p.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.extra = extra
+    if args.command == "query" and not args.urns and not args.search:
+        print("citable-corpus query: give URNs and/or --search", file=sys.stderr)
+        return 2
+    try:
+        return args.run(args)
+    except BrokenPipeError:
+        # The reader of a pipeline, such as `head`, stopped early; discard what is left to flush.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
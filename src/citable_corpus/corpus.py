@@ -1,18 +1,177 @@
+import gc
 import itertools
-import requests
-from pydantic import BaseModel
+from array import array
+from contextlib import contextmanager
+import re
+import sys
+from pydantic import BaseModel, field_validator
 from urn_citation import CtsUrn
-from .passage import CitablePassage
-from typing import List
-from cite_exchange import *
+from .passage import CitablePassage, unchecked_passage
+from .urns import WorkRewriter, passage_copier, with_passage, work_key
+from .lru import LRUCache
+from .navigation import CitationIndex
+from . import instrument
+from .parallel import map_chunks
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Only for annotations: the methods using these import them when they run.
+    from concurrent.futures import Executor
+    from .shared import SharedCorpus
+    from .view import CorpusView
+
+def passages_from_lines(lines: List[str], delimiter: str = "|") -> List[CitablePassage]:
+    """Create a CitablePassage from each line of delimited text.
+
+    When instrumentation is on, URN parsing (`urn.parse`) and passage validation
+    (`passage.validate`) are timed as separate stages.
+    """
+    if instrument.collector() is None:
+        return [CitablePassage.from_delimited(line, delimiter) for line in lines]
+    pairs = [line.split(delimiter, 1) for line in lines]
+    with instrument.stage("urn.parse", len(pairs)):
+        urns = [CtsUrn.from_string(u.strip()) for u, _ in pairs]
+    with instrument.stage("passage.validate", len(pairs)):
+        return [CitablePassage(urn=urn, text=t.strip()) for urn, (_, t) in zip(urns, pairs)]
+
+
+def _sizeof(obj, seen: set) -> int:
+    "Size of `obj` alone, or 0 if it is None or has already been counted in `seen`."
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    return sys.getsizeof(obj)
+
+
+def _deep_sizeof(obj, seen: set) -> int:
+    "Size of `obj` and of the containers, attributes and strings it refers to, counting each object once."
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if o is None or id(o) in seen:
+            continue
+        total += _sizeof(o, seen)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif hasattr(o, "__dict__") and not isinstance(o, type):
+            stack.append(o.__dict__)
+    return total
+
+
+def _columns(passages: List[CitablePassage]) -> Tuple[List[CtsUrn], List[int], List[Optional[str]], List[str]]:
+    "The passages as columns: the distinct work-level URNs, the number of each passage's work among them, each passage's reference, and the texts."
+    numbers = {}
+    works = []
+    work_numbers = []
+    for p in passages:
+        key = work_key(p.urn)
+        k = numbers.get(key)
+        if k is None:
+            k = numbers[key] = len(works)
+            works.append(with_passage(p.urn, None))
+        work_numbers.append(k)
+    return works, work_numbers, [p.urn.passage for p in passages], [p.text for p in passages]
+
+
+@contextmanager
+def _gc_paused():
+    # Bulk loads allocate many objects but no reference cycles, and the collections
+    # those allocations would trigger take as long as the loading itself.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _unpickle_corpus(works: List[CtsUrn], work_numbers: array, refs: str, texts: List[str], cache: Optional[LRUCache]) -> CitableCorpus:
+    copiers = [passage_copier(w) for w in works]
+    with _gc_paused():
+        passages = [unchecked_passage(copiers[k](r or None), t) for k, r, t in zip(work_numbers, refs.split("\n"), texts)]
+    corpus = CitableCorpus.model_construct(passages=_PassageList(passages))
+    corpus._result_cache = cache
+    return corpus
+
+
+class _PassageList(list):
+    """The list of passages of a corpus.  It behaves as a list, but every modification
+    replaces its `revision` token, so that cached retrieval results can tell they are stale."""
+    __slots__ = ("revision",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.revision = object()
+
+
+def _modifies(method):
+    def modify(self, *args, **kwargs):
+        # Replaced after the change, so results computed by a concurrent reader
+        # from the old passages are cached under the old token and never served.
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.revision = object()
+    modify.__name__ = method.__name__
+    modify.__doc__ = method.__doc__
+    return modify
+
+for _name in ["__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse"]:
+    setattr(_PassageList, _name, _modifies(getattr(list, _name)))
+
 
 class CitableCorpus(BaseModel):
     """A corpus of citable passages of text.
     
+    Reading a corpus (retrieval, search, export) is safe from several threads at
+    once, on free-threaded builds of Python as with the GIL.  Changing its passages
+    while other threads read them needs synchronization by the caller.
+    
     Attributes:
         passages (List[CitablePassage]): the corpus of passages.
     """
     passages: List[CitablePassage]
+    _result_cache: Optional[LRUCache] = None
+    _citation_index: Optional[CitationIndex] = None
+
+    @field_validator("passages")
+    @classmethod
+    def _track_changes(cls, passages):
+        return _PassageList(passages)
+
+    def __setattr__(self, name, value):
+        if name == "passages" and not isinstance(value, _PassageList):
+            value = _PassageList(value)
+        super().__setattr__(name, value)
+
+    def __eq__(self, other) -> bool:
+        # Corpora with the same fields are equal whether or not they cache results or
+        # have indexed their citations, so the private attributes are not compared.
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.__dict__ == other.__dict__ and self.__pydantic_extra__ == other.__pydantic_extra__
+
+    def __reduce__(self):
+        # Pickled as columns (see `_columns`) rather than passage by passage through
+        # pydantic, which is several times slower and larger.  The result cache, if
+        # any, is restored empty.  Columns hold only URNs and texts, so subclasses of
+        # the corpus or of its passages are pickled by pydantic instead.
+        if type(self) is not CitableCorpus or any(type(p) is not CitablePassage for p in self.passages):
+            return super().__reduce__()
+        works, numbers, refs, texts = _columns(self.passages)
+        return (_unpickle_corpus, (works, array("I", numbers), "\n".join(r or "" for r in refs), texts, self._result_cache))
+
+    def __getstate__(self):
+        # The citation index holds functions, which cannot be pickled; it is rebuilt on first use.
+        state = super().__getstate__()
+        if state["__pydantic_private__"]:
+            state["__pydantic_private__"] = {**state["__pydantic_private__"], "_citation_index": None}
+        return state
 
     def __len__(self) -> int:
         """Get the number of passages in the corpus.
@@ -45,11 +204,9 @@ class CitableCorpus(BaseModel):
         Returns:
             CitableCorpus: The created CitableCorpus object.
         """
-        passages = []
-        for line in s.strip().splitlines():
-            passage = CitablePassage.from_delimited(line, delimiter)
-            passages.append(passage)
-        return cls(passages=passages)
+        passages = passages_from_lines(s.strip().splitlines(), delimiter)
+        with instrument.stage("corpus.validate", len(passages)):
+            return cls(passages=passages)
     
     @classmethod
     def from_cex_file(cls, f: str, delimiter: str = "|") -> CitableCorpus:
@@ -62,11 +219,15 @@ class CitableCorpus(BaseModel):
         Returns:
             CitableCorpus: The created CitableCorpus object.
         """
-        textblocks = CexBlock.from_file(f, "ctsdata")
-        datablocks = [b.data for b in textblocks]
-        datalines = list(itertools.chain.from_iterable(datablocks))
-        passages = [CitablePassage.from_delimited(line, delimiter) for line in datalines]
-        return cls(passages=passages)
+        from cite_exchange import CexBlock
+        with instrument.stage("cex.read") as st:
+            textblocks = CexBlock.from_file(f, "ctsdata")
+            datablocks = [b.data for b in textblocks]
+            datalines = list(itertools.chain.from_iterable(datablocks))
+            st.items = len(datalines)
+        passages = passages_from_lines(datalines, delimiter)
+        with instrument.stage("corpus.validate", len(passages)):
+            return cls(passages=passages)
 
     @classmethod
     def from_cex_url(cls, url: str, delimiter: str = "|") -> CitableCorpus:
@@ -79,11 +240,62 @@ class CitableCorpus(BaseModel):
         Returns:
             CitableCorpus: The created CitableCorpus object.
         """
-        textblocks = CexBlock.from_url(url, "ctsdata")
-        datablocks = [b.data for b in textblocks]
-        datalines = list(itertools.chain.from_iterable(datablocks))
-        passages = [CitablePassage.from_delimited(line, delimiter) for line in datalines]
-        return cls(passages=passages)
+        from cite_exchange import CexBlock
+        with instrument.stage("cex.read") as st:
+            textblocks = CexBlock.from_url(url, "ctsdata")
+            datablocks = [b.data for b in textblocks]
+            datalines = list(itertools.chain.from_iterable(datablocks))
+            st.items = len(datalines)
+        passages = passages_from_lines(datalines, delimiter)
+        with instrument.stage("corpus.validate", len(passages)):
+            return cls(passages=passages)
+
+    @classmethod
+    def from_cex(cls, s: str, delimiter: str = "|") -> CitableCorpus:
+        """Create a CitableCorpus from the `ctsdata` blocks of a CEX-formatted string.
+        
+        Args:
+            s (str): CEX data.
+            delimiter (str): The delimiter separating the urn and text. Default is '|'.
+        
+        Returns:
+            CitableCorpus: The created CitableCorpus object.
+        """
+        from cite_exchange import CexBlock
+        with instrument.stage("cex.read") as st:
+            textblocks = CexBlock.from_text(s, "ctsdata")
+            datablocks = [b.data for b in textblocks]
+            datalines = list(itertools.chain.from_iterable(datablocks))
+            st.items = len(datalines)
+        passages = passages_from_lines(datalines, delimiter)
+        with instrument.stage("corpus.validate", len(passages)):
+            return cls(passages=passages)
+
+    @classmethod
+    async def afrom_cex_url(cls, url: str, delimiter: str = "|", executor: Executor = None) -> CitableCorpus:
+        """Like `from_cex_url`, but downloading on a worker thread without blocking the event loop, and parsing on `executor`.
+        
+        Args:
+            url (str): http or https URL to retrieve data from.
+            delimiter (str): The delimiter separating the urn and text. Default is '|'.
+            executor (Executor): Executor for parsing. Default is the event loop's.
+        
+        Returns:
+            CitableCorpus: The created CitableCorpus object.
+        
+        Raises:
+            urllib.error.HTTPError: If the server does not answer with the data.
+        """
+        import asyncio
+        from .aio import fetch_url
+        data = await fetch_url(url)
+        return await asyncio.get_running_loop().run_in_executor(executor, cls.from_cex, data.decode("utf-8"), delimiter)
+
+    @classmethod
+    async def afrom_cex_file(cls, f: str, delimiter: str = "|", executor: Executor = None) -> CitableCorpus:
+        "Like `from_cex_file`, but reading and parsing on `executor` (default: the event loop's) without blocking the event loop."
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(executor, cls.from_cex_file, f, delimiter)
 
     def to_cex(self, delimiter: str = "|", include_label = True) -> str:
         """Convert the CitableCorpus to a CEX-formatted string.
@@ -95,33 +307,283 @@ class CitableCorpus(BaseModel):
         Returns:
             str: The CEX-formatted string.
         """
-        data_lines = [f"{p.urn}{delimiter}{p.text}" for p in self.passages]
-        cex_block = CexBlock(label="ctsdata", data=data_lines)
-        if include_label:
-            return cex_block.to_cex()
+        from cite_exchange import CexBlock
+        with instrument.stage("cex.write", len(self.passages)):
+            data_lines = [f"{p.urn}{delimiter}{p.text}" for p in self.passages]
+            cex_block = CexBlock(label="ctsdata", data=data_lines)
+            if include_label:
+                return cex_block.to_cex()
+            else:
+                return "\n".join(data_lines)
+
+    def to_json(self) -> str:
+        """Serialize the corpus as compact JSON, several times faster than pydantic's `model_dump_json`.
+        
+        The JSON object lists the distinct work-level URNs of the corpus (`works`) and,
+        for each passage, the position of its work in that list (`work`), its passage
+        reference (`refs`) and its text (`texts`).
+        
+        Returns:
+            str: The JSON string, read back with `from_json`.
+        """
+        import json
+        with instrument.stage("json.write", len(self.passages)):
+            works, numbers, refs, texts = _columns(self.passages)
+            return json.dumps({"works": [str(w) for w in works], "work": numbers, "refs": refs, "texts": texts},
+                              ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, s: str, trusted: bool = False) -> CitableCorpus:
+        """Create a CitableCorpus from JSON written by `to_json`.
+        
+        Every URN is validated, as when reading CEX.  JSON this program wrote
+        itself (or otherwise trusts) can be read with `trusted=True`: each work-level
+        URN is then validated once, and a passage reference is checked in full only if
+        it holds characters a plain reference cannot (a range, a subreference, or a
+        colon), so loading costs a fraction of validating every passage.
+        
+        Args:
+            s (str): The JSON string (or bytes).
+            trusted (bool): Skip validating plain passage references. Default is False.
+        
+        Returns:
+            CitableCorpus: The created CitableCorpus object.
+        
+        Raises:
+            ValueError: If `s` is not a corpus written by `to_json`, or holds an invalid URN.
+        """
+        import json
+        with instrument.stage("json.read") as st, _gc_paused():
+            data = json.loads(s)
+            try:
+                workstrings, numbers, refs, texts = data["works"], data["work"], data["refs"], data["texts"]
+                works = [CtsUrn.from_string(w) for w in workstrings]
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"Not a corpus written by to_json: {e!r}") from e
+            if not len(numbers) == len(refs) == len(texts) or any(w.passage is not None for w in works):
+                raise ValueError("Not a corpus written by to_json: columns of different lengths, or works with passages")
+            copiers = [passage_copier(w) for w in works]
+            passages = []
+            for k, r, t in zip(numbers, refs, texts):
+                if type(k) is not int or not 0 <= k < len(works) or type(t) is not str:
+                    raise ValueError(f"Not a corpus written by to_json: bad work number {k!r} or text {t!r}")
+                if r is None:
+                    urn = copiers[k](None)
+                elif trusted and type(r) is str and r and ".." not in r and not any(c in r for c in "-@:"):
+                    urn = copiers[k](r)
+                elif type(r) is str:
+                    urn = CtsUrn.from_string(workstrings[k] + r)
+                else:
+                    raise ValueError(f"Not a corpus written by to_json: bad passage reference {r!r}")
+                passages.append(unchecked_passage(urn, t))
+            st.items = len(passages)
+            return cls.model_construct(passages=_PassageList(passages))
+
+    def memory_usage(self, deep: bool = True) -> Dict[str, int]:
+        """Estimate the memory used by the corpus in bytes, broken down by component.
+        
+        Each object is counted once, however many passages refer to it.
+        
+        Args:
+            deep (bool): Also count the strings the passages refer to (texts and URN components) and the contents of indexes. Default is True.
+        
+        Returns:
+            Dict[str, int]: Bytes used by `urns` (CtsUrn objects, with their component strings if `deep`), `text` (passage texts, if `deep`), `passages` (CitablePassage objects), `containers` (the corpus and its list of passages) and `indexes` (caches and indexes the corpus holds), with their `total`.
+        """
+        seen = set()
+
+        def model_size(m):
+            return _sizeof(m, seen) + _sizeof(m.__dict__, seen) + _sizeof(m.__pydantic_fields_set__, seen)
+
+        usage = {"urns": 0, "text": 0, "passages": 0, "containers": 0, "indexes": 0}
+        usage["containers"] = model_size(self) + _sizeof(self.passages, seen)
+        for p in self.passages:
+            usage["passages"] += model_size(p)
+            usage["urns"] += model_size(p.urn)
+            if deep:
+                usage["text"] += _sizeof(p.text, seen)
+                usage["urns"] += sum(_sizeof(v, seen) for v in p.urn.__dict__.values())
+        private = self.__pydantic_private__ or {}
+        if deep:
+            usage["indexes"] = sum(_deep_sizeof(v, seen) for v in private.values())
         else:
-            return "\n".join(data_lines)
+            usage["indexes"] = sum(_sizeof(v, seen) for v in private.values())
+        usage["total"] = sum(usage.values())
+        return usage
 
-    def retrieve_range(self, ref: CtsUrn) -> List[CitablePassage]:
-        """Retrieve passages from the corpus matching a given CtsUrn range reference.
+    def rewrite_works(self, rewrite: Callable[[CtsUrn], CtsUrn]) -> CitableCorpus:
+        """Create a new corpus by applying a work-level rewrite to the URN of every passage.
+        
+        The rewrite is computed once for each distinct work in the corpus, not once per passage.
         
         Args:
-            ref (CtsUrn): The CtsUrn range reference to search for.
+            rewrite (Callable[[CtsUrn], CtsUrn]): Function rewriting a work-level CtsUrn, e.g. `lambda u: u.set_version("v2")`.
+        
+        Returns:
+            CitableCorpus: A corpus with the same texts and rewritten URNs.
         """
-        if ref.is_range() == False:
-            raise ValueError("retrieve_range: provided CtsUrn is not a range.")
+        rewriter = WorkRewriter(rewrite)
+        return CitableCorpus(passages = [CitablePassage(urn = rewriter(p.urn), text = p.text) for p in self.passages])
+
+    def set_version(self, version: str) -> CitableCorpus:
+        """Create a new corpus with the version of every passage's URN set to `version`.
+        
+        Args:
+            version (str): The version identifier.
         
+        Returns:
+            CitableCorpus: A corpus with the same texts and rewritten URNs.
+        """
+        return self.rewrite_works(lambda u: u.set_version(version))
+
+    def set_exemplar(self, exemplar: str) -> CitableCorpus:
+        """Create a new corpus with the exemplar of every passage's URN set to `exemplar`.
+        
+        Args:
+            exemplar (str): The exemplar identifier.
+        
+        Returns:
+            CitableCorpus: A corpus with the same texts and rewritten URNs.
+        
+        Raises:
+            ValueError: If a passage's URN has no version.
+        """
+        return self.rewrite_works(lambda u: u.set_exemplar(exemplar))
+
+    def share(self, name: Optional[str] = None) -> SharedCorpus:
+        """Publish the URNs and texts of the corpus in shared memory, for other processes to read without copying.
+        
+        Args:
+            name (str): Name for the shared memory block. Default is a unique name chosen by the system.
+        
+        Returns:
+            SharedCorpus: The published corpus. Close it (or use it in a `with` block) to free the memory.
+        """
+        from .shared import SharedCorpus
+        return SharedCorpus.publish(self, name)
+
+    def enable_cache(self, maxsize: int = 1024, max_passages: Optional[int] = None) -> LRUCache:
+        """Cache the results of `retrieve`, `retrieve_range` and their `_indices` variants, keyed by URN string.
+        
+        The cache evicts the least recently used results, and empties itself when
+        passages are added, removed or replaced, in place or by assigning a new list
+        to `passages`.  It is safe to share between threads.  Enabling the cache again
+        replaces it with an empty one.
+        
+        Args:
+            maxsize (int): Largest number of results kept. Default is 1024.
+            max_passages (int): Largest total number of passages in the results kept, or None for no limit. Default is None.
+        
+        Returns:
+            LRUCache: The new cache.
+        """
+        self._result_cache = LRUCache(maxsize, max_passages)
+        return self._result_cache
+
+    def disable_cache(self):
+        "Stop caching retrieval results, discarding the cache."
+        self._result_cache = None
+
+    def clear_cache(self):
+        "Discard cached retrieval results, keeping the cache statistics."
+        if self._result_cache is not None:
+            self._result_cache.clear()
+
+    def cache_info(self) -> Optional[dict]:
+        "Statistics of the result cache (size, limits, hits, misses, evictions, invalidations and hit rate), or None if it is disabled."
+        return self._result_cache.stats() if self._result_cache is not None else None
+
+    def _tracked_passages(self) -> _PassageList:
+        # The passage list, whose revision token tells when it changes.
+        passages = self.passages
+        if not isinstance(passages, _PassageList):
+            # Set without validation, e.g. by model_construct.
+            passages = self.passages = _PassageList(passages)
+        return passages
+
+    def _cached_results(self, ref: CtsUrn) -> Optional[Tuple[Tuple[int, ...], Tuple[CitablePassage, ...]]]:
+        # Positions and passages matching `ref`, from the result cache; None if caching is off.
+        cache = self._result_cache
+        if cache is None:
+            return None
+        passages = self._tracked_passages()
+        revision = passages.revision
+        key = str(ref)
+        found = cache.get(key, revision)
+        if found is None:
+            indices = tuple(self._find_range(ref) if ref.is_range() else self._find(ref))
+            found = (indices, tuple(passages[i] for i in indices))
+            cache.put(key, found, revision, len(indices))
+        return found
+
+    def _find_range(self, ref: CtsUrn) -> range:
         begin_urn = ref.set_passage(ref.range_begin())
         end_urn = ref.set_passage(ref.range_end())
 
-        begin_list = [p for p in self.passages if p.urn.contains(begin_urn)]
-        end_list = [p for p in self.passages if p.urn.contains(end_urn)]
-        if not begin_list or not end_list:
-            return []
+        begin_index = next((i for i, p in enumerate(self.passages) if p.urn.contains(begin_urn)), None)
+        end_index = next((i for i, p in enumerate(self.passages) if p.urn.contains(end_urn)), None)
+        if begin_index is None or end_index is None:
+            return range(0)
         else:
-            begin_index = self.passages.index(begin_list[0])
-            end_index = self.passages.index(end_list[0])
-            return self.passages[begin_index:end_index + 1]
+            return range(begin_index, end_index + 1)
+
+    def _find(self, ref: CtsUrn) -> List[int]:
+        # Handle work-level URNs (passage is None when URN ends with ':')
+        if ref.passage is None:
+            return [i for i, p in enumerate(self.passages) if p.urn.work == ref.work]
+        else:
+            return [i for i, p in enumerate(self.passages) if ref.contains(p.urn)]
+
+    def retrieve_range_indices(self, ref: CtsUrn) -> range:
+        """Find the positions in the corpus of passages matching a given CtsUrn range reference.
+        
+        Args:
+            ref (CtsUrn): The CtsUrn range reference to search for.
+        
+        Returns:
+            range: Indexes into `passages` of the matching passages; empty if either end of the range is not found.
+        """
+        if ref.is_range() == False:
+            raise ValueError("retrieve_range: provided CtsUrn is not a range.")
+        found = self._cached_results(ref)
+        if found is None:
+            return self._find_range(ref)
+        indices = found[0]
+        return range(indices[0], indices[-1] + 1) if indices else range(0)
+
+    def retrieve_indices(self, ref: CtsUrn) -> List[int]:
+        """Find the positions in the corpus of passages matching a given CtsUrn reference.
+        
+        Args:
+            ref (CtsUrn): The CtsUrn reference to search for.
+        
+        Returns:
+            List[int]: Indexes into `passages` of the matching passages, in corpus order.
+        """
+        found = self._cached_results(ref)
+        if found is not None:
+            return list(found[0])
+        if ref.is_range():
+            return list(self._find_range(ref))
+        return self._find(ref)
+
+    def retrieve_range(self, ref: CtsUrn) -> List[CitablePassage]:
+        """Retrieve passages from the corpus matching a given CtsUrn range reference.
+        
+        Args:
+            ref (CtsUrn): The CtsUrn range reference to search for.
+        """
+        with instrument.stage("corpus.retrieve") as st:
+            if ref.is_range() == False:
+                raise ValueError("retrieve_range: provided CtsUrn is not a range.")
+            found = self._cached_results(ref)
+            if found is None:
+                span = self._find_range(ref)
+                result = self.passages[span.start:span.stop]
+            else:
+                result = list(found[1])
+            st.items = len(result)
+            return result
 
     def retrieve(self, ref: CtsUrn) -> List[CitablePassage]:
         """Retrieve passages from the corpus matching a given CtsUrn reference.
@@ -131,13 +593,167 @@ class CitableCorpus(BaseModel):
             Returns:
                 List[CitablePassage]: List of matching CitablePassage objects.
         """
-        if ref.is_range():
-            return self.retrieve_range(ref)
-        else:
-            # Handle work-level URNs (passage is None when URN ends with ':')
-            if ref.passage is None:
-                matches = [p for p in self.passages if p.urn.work == ref.work]
+        with instrument.stage("corpus.retrieve") as st:
+            cached = self._cached_results(ref)
+            if cached is None:
+                found = [self.passages[i] for i in self.retrieve_indices(ref)]
             else:
-                matches = [p for p in self.passages if ref.contains(p.urn)]
-            return matches
+                found = list(cached[1])
+            st.items = len(found)
+            return found
+
+    def retrieve_many(self, refs: Iterable[CtsUrn], workers: int = 1) -> List[List[CitablePassage]]:
+        """Retrieve the passages matching each of several references, on a pool of `workers` threads.
+        
+        Retrieval only reads the corpus, so threads share it (and its result cache)
+        without copying.  On free-threaded Python they scan it in parallel; with the
+        GIL, more than one worker gains nothing.
+        
+        Args:
+            refs (Iterable[CtsUrn]): The CtsUrn references to search for.
+            workers (int): Number of threads. Default is 1.
+        
+        Returns:
+            List[List[CitablePassage]]: The passages matching each reference, in the order of `refs`.
+        """
+        return map_chunks(lambda chunk: [self.retrieve(r) for r in chunk], list(refs), workers)
+
+    def search_indices(self, pattern: str, flags: int = 0, workers: int = 1) -> List[int]:
+        """Find the positions in the corpus of passages whose text matches a regular expression.
         
+        Args:
+            pattern (str): A regular expression, found anywhere in the text (as by `re.search`).
+            flags (int): Flags for `re.compile`, e.g. `re.IGNORECASE`. Default is 0.
+            workers (int): Number of threads scanning parts of the corpus. Default is 1.
+        
+        Returns:
+            List[int]: Indexes into `passages` of the matching passages, in corpus order.
+        """
+        found = re.compile(pattern, flags).search
+        passages = self.passages
+        with instrument.stage("corpus.search", len(passages)):
+            return map_chunks(lambda span: [i for i in span if found(passages[i].text)], range(len(passages)), workers)
+
+    def search(self, pattern: str, flags: int = 0, workers: int = 1) -> List[CitablePassage]:
+        """Retrieve the passages whose text matches a regular expression. See `search_indices`.
+        
+        Returns:
+            List[CitablePassage]: The matching passages, in corpus order.
+        """
+        passages = self.passages
+        return [passages[i] for i in self.search_indices(pattern, flags, workers)]
+
+    def view(self, ref: Optional[CtsUrn] = None) -> CorpusView:
+        """A view of the passages matching a reference (default: all passages), which selects them by position instead of copying them into a list.
+        
+        Views can be retrieved from, filtered, sliced and exported in turn, each
+        step making a new view of this corpus; see `CorpusView`.
+        
+        Args:
+            ref (CtsUrn): The CtsUrn reference to search for, or None for the whole corpus.
+        
+        Returns:
+            CorpusView: The matching passages, in corpus order.
+        """
+        from .view import CorpusView
+        if ref is None:
+            return CorpusView(self)
+        if ref.is_range():
+            return CorpusView(self, self.retrieve_range_indices(ref))
+        return CorpusView(self, self.retrieve_indices(ref))
+
+    def _citations(self) -> CitationIndex:
+        # The citation index of the current passages, rebuilt after they change.
+        passages = self._tracked_passages()
+        index = self._citation_index
+        if index is None or index.revision is not passages.revision:
+            index = self._citation_index = CitationIndex(passages)
+        return index
+
+    def next(self, ref: CtsUrn) -> Optional[CtsUrn]:
+        """The reference after `ref` at the same citation level of its work: the next passage after a passage, the next section after a section.
+        
+        Navigation uses an index of the citation hierarchy, built on first use and
+        again after the passages change, so each step takes constant time.
+        
+        Args:
+            ref (CtsUrn): A passage or containing passage cited in the corpus. A URN without version or exemplar refers to the first work citing it.
+        
+        Returns:
+            CtsUrn: The next reference, or None if `ref` is the last of its level.
+        
+        Raises:
+            KeyError: If the corpus does not cite `ref`.
+            ValueError: If `ref` is a range.
+        """
+        return self._citations().next(ref)
+
+    def prev(self, ref: CtsUrn) -> Optional[CtsUrn]:
+        """The reference before `ref` at the same citation level of its work, or None if it is the first. See `next`."""
+        return self._citations().prev(ref)
+
+    def parent(self, ref: CtsUrn) -> Optional[CtsUrn]:
+        """The reference containing `ref` ("pr" for "pr.3"), the work-level URN for a top-level reference, or None for a work. See `next`."""
+        return self._citations().parent(ref)
+
+    def children(self, ref: CtsUrn) -> List[CtsUrn]:
+        """The references one level below `ref`, in corpus order; for a work-level URN, its top-level references. See `next`."""
+        return self._citations().children(ref)
+
+    def siblings(self, ref: CtsUrn) -> List[CtsUrn]:
+        """The other references with the same parent as `ref`, in corpus order. See `next`."""
+        return self._citations().siblings(ref)
+
+    def context(self, ref: CtsUrn, before: int = 1, after: int = 1) -> List[CitablePassage]:
+        """The passages of `ref` with up to `before` passages of the same work preceding them and `after` following them.
+        
+        Args:
+            ref (CtsUrn): A passage or containing passage cited in the corpus.
+            before (int): Number of passages before. Default is 1.
+            after (int): Number of passages after. Default is 1.
+        
+        Returns:
+            List[CitablePassage]: The passages, in corpus order.
+        
+        Raises:
+            KeyError: If the corpus does not cite `ref`.
+            ValueError: If `ref` is a range, or `before` or `after` is negative.
+        """
+        passages = self.passages
+        return [passages[i] for i in self._citations().context(ref, before, after)]
+
+    async def aretrieve(self, ref: CtsUrn, executor: Executor = None) -> List[CitablePassage]:
+        """Like `retrieve`, but scanning the corpus on `executor` (default: the event loop's) so the event loop is not blocked.
+        
+        Args:
+            ref (CtsUrn): The CtsUrn reference to search for.
+            executor (Executor): Executor to run the retrieval on.
+        """
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(executor, self.retrieve, ref)
+
+    async def aretrieve_many(self, refs: Iterable[CtsUrn], executor: Executor = None) -> List[List[CitablePassage]]:
+        """Retrieve the passages matching each of several references in a single job on `executor` (default: the event loop's).
+        
+        Args:
+            refs (Iterable[CtsUrn]): The CtsUrn references to search for.
+            executor (Executor): Executor to run the retrievals on.
+        
+        Returns:
+            List[List[CitablePassage]]: The passages matching each reference, in the order of `refs`.
+        """
+        import asyncio
+        refs = list(refs)
+        return await asyncio.get_running_loop().run_in_executor(executor, lambda: [self.retrieve(r) for r in refs])
+
+    async def aiter(self, batch: int = 1000) -> AsyncIterator[CitablePassage]:
+        """Iterate over the passages asynchronously, yielding to the event loop after every `batch` passages.
+        
+        Args:
+            batch (int): Passages yielded between pauses. Default is 1000.
+        """
+        import asyncio
+        for start in range(0, len(self.passages), batch):
+            for p in self.passages[start:start + batch]:
+                yield p
+            await asyncio.sleep(0)
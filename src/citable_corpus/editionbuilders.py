@@ -1,7 +1,12 @@
 from abc import ABC, abstractmethod
-from xml.dom import minidom
+from functools import lru_cache
+import xml.etree.ElementTree as ET
+from typing import List
+from urn_citation import CtsUrn
 from .corpus import CitableCorpus, CitablePassage
-from .markupreader import MarkupReader
+from .markupreader import MarkupReader, TEIDivAbReader, ab_line
+from .urns import WorkRewriter
+from . import instrument
 
 class EditionBuilder(ABC):
     @abstractmethod
@@ -17,6 +22,10 @@ def set_edition_exemplar(urn, exemplar):
     versioned = urn if urn.version is not None else urn.set_version("v1")
     return versioned.set_exemplar(exemplar)
 
+def edition_rewriter(exemplar):
+    "Get a WorkRewriter applying `set_edition_exemplar` with `exemplar`, computing the new work hierarchy once per distinct work."
+    return WorkRewriter(lambda urn: set_edition_exemplar(urn, exemplar))
+
 def tidy_ws(text):
     "Clean up whitespace in a string by reducing each sequence of whitespace characters to a single space, and stripping leading/trailing whitespace."
     # .split() splits on any whitespace and removes empty segments
@@ -34,41 +43,455 @@ def extract_text(node, cumulation, omitlist):
             extract_text(kid, cumulation, omitlist)
     return "".join(cumulation)
 
-class TEIDiplomatic(EditionBuilder):
+def qualified_names(names):
+    "Compile a list of element names into a set of ElementTree tags. Plain local names match elements both in the TEI namespace and in no namespace; names already in `{namespace}local` form are kept as they are."
+    tags = set()
+    for n in names:
+        if n.startswith("{"):
+            tags.add(n)
+        else:
+            tags.add(n)
+            tags.add(f"{{{teins}}}{n}")
+    return frozenset(tags)
 
-    def edition(xmlcorpus: CitableCorpus):
-        "Compose a citable diplomatic edition by extracting text from the XML of each passage in the corpus, omitting specified elements."
+def extract_element_text(elem, omitset):
+    "Extract text from an ElementTree element, omitting contents of elements whose tag is in `omitset` (see `qualified_names`). The tree is walked iteratively, so deep nesting cannot exceed the recursion limit."
+    parts = [elem.text] if elem.text else []
+    # Each stack entry is an iterator over an element's children, and the tail text to emit when it is exhausted.
+    stack = [(iter(elem), None)]
+    while stack:
+        kids, tail = stack[-1]
+        for kid in kids:
+            if kid.tag in omitset or not isinstance(kid.tag, str):
+                # Omitted elements, comments and processing instructions contribute only their tail.
+                if kid.tail:
+                    parts.append(kid.tail)
+            else:
+                if kid.text:
+                    parts.append(kid.text)
+                stack.append((iter(kid), kid.tail))
+                break
+        else:
+            stack.pop()
+            if tail:
+                parts.append(tail)
+    return "".join(parts)
+
+def extract_texts(elem, omitlists):
+    "Extract text for several editions in a single walk of an ElementTree element. `omitlists` has one list of element names to omit per edition, plain or namespace-qualified (see `qualified_names`); the result is a list with the text of each edition in the same order. A minidom node is walked with `extract_text`, as before."
+    if hasattr(elem, "childNodes"):
+        return [extract_text(elem, [], omitlist) for omitlist in omitlists]
+    return _extract_texts(elem, [qualified_names(o) for o in omitlists])
+
+def _extract_texts(elem, omitsets):
+    # `extract_texts` for sets of tags already compiled by `qualified_names`.
+    cumulations = [[] for _ in omitsets]
+    everyone = range(len(omitsets))
+    if elem.text:
+        for c in cumulations:
+            c.append(elem.text)
+    # Each stack entry is an iterator over an element's children, the tail text to emit when
+    # it is exhausted, the editions that include the element, and the editions that include its tail.
+    stack = [(iter(elem), None, everyone, ())]
+    while stack:
+        kids, tail, active, tailactive = stack[-1]
+        for kid in kids:
+            included = [i for i in active if kid.tag not in omitsets[i]] if isinstance(kid.tag, str) else ()
+            if included:
+                if kid.text:
+                    for i in included:
+                        cumulations[i].append(kid.text)
+                stack.append((iter(kid), kid.tail, included, active))
+                break
+            elif kid.tail:
+                for i in active:
+                    cumulations[i].append(kid.tail)
+        else:
+            stack.pop()
+            if tail:
+                for i in tailactive:
+                    cumulations[i].append(tail)
+    return ["".join(c) for c in cumulations]
+
+# Actions an edition rule can apply to an element.  Elements without a rule are kept: their text and children are walked.
+OMIT = "omit"        # drop the element and its contents
+TEXT = "text"        # keep all text inside the element, ignoring rules for its descendants
+REPLACE = "replace"  # replace the element and its contents with a fixed string
+CHOOSE = "choose"    # keep only the child element ranked highest in a preference list (e.g. inside `choice`)
+KEEP = "keep"        # walk the element normally, overriding nothing
+actions = (OMIT, TEXT, REPLACE, CHOOSE, KEEP)
+
+class EditionRules:
+    """A compiled set of rules for deriving a plain-text edition from XML.
+
+    Rules map element names to actions: `"omit"`, `"text"`, `"keep"`,
+    `("replace", string)` or `("choose", [name, ...])`.  Element names follow
+    `qualified_names`.  The rules are compiled once into a dispatch table keyed by
+    ElementTree tag, so applying them costs one dictionary lookup per element.
+    With `tidy`, whitespace in the result is normalized with `tidy_ws`.
+
+    Rule sets are immutable and hashable, so they can key caches and be sent to worker processes.
+    """
+
+    def __init__(self, rules: dict = None, tidy: bool = False):
+        table = {}
+        key = []
+        for name, rule in (rules or {}).items():
+            action, arg = (rule, None) if isinstance(rule, str) else rule
+            if action not in actions:
+                raise ValueError(f"EditionRules: unknown action {action!r} for element {name!r}.")
+            if action == CHOOSE:
+                # The preference order is part of the rule; the table maps each tag to its rank.
+                names = tuple(arg)
+                key.append((name, action, names))
+                arg = {}
+                for rank, n in enumerate(names):
+                    for tag in qualified_names([n]):
+                        arg.setdefault(tag, rank)
+            else:
+                key.append((name, action, arg))
+            if action != KEEP:
+                for tag in qualified_names([name]):
+                    table[tag] = (action, arg)
+        self.table = table
+        self.tidy = tidy
+        self._key = (tuple(sorted(key)), tidy)
+        omits = [tag for tag, (action, _) in table.items() if action == OMIT]
+        # Rule sets that only omit elements can use the faster omit-set extractors.
+        self.omitset = frozenset(omits) if len(omits) == len(table) else None
+
+    @classmethod
+    def from_omitlist(cls, omitlist, tidy: bool = False) -> "EditionRules":
+        "Create rules omitting each element named in `omitlist`."
+        return cls({name: OMIT for name in omitlist}, tidy)
+
+    def __eq__(self, other):
+        return isinstance(other, EditionRules) and self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __repr__(self):
+        return f"EditionRules({dict((n, a if arg is None else (a, arg)) for n, a, arg in self._key[0])!r}, tidy={self.tidy})"
+
+    def __getstate__(self):
+        return self._key
+
+    def __setstate__(self, key):
+        rules, tidy = key
+        self.__init__({n: a if arg is None else (a, arg) for n, a, arg in rules}, tidy)
+
+    def extract(self, elem) -> str:
+        "Apply the rules to an ElementTree element and return the text of the edition."
+        return apply_rules(elem, [self])[0]
+
+def as_rules(rules) -> EditionRules:
+    "Accept either EditionRules or a plain omit list (or set of tags), and return EditionRules."
+    return rules if isinstance(rules, EditionRules) else EditionRules.from_omitlist(rules)
+
+def _chosen_children(elem, included, tables):
+    # Map each edition with a `choose` rule for `elem` to the child it keeps: the
+    # child of best rank in the preference list, the first one of that rank if several.
+    chosen = {}
+    for i in included:
+        act = tables[i].get(elem.tag)
+        if act is not None and act[0] == CHOOSE:
+            ranks = act[1]
+            best = None
+            for kid in elem:
+                rank = ranks.get(kid.tag)
+                if rank is not None and (best is None or rank < best):
+                    chosen[i] = kid
+                    best = rank
+                    if rank == 0:
+                        break
+    return chosen
+
+def apply_rules(elem, rulesets):
+    "Apply several rule sets to an ElementTree element in a single walk, returning the text of each edition in the same order. Rules apply to the element's descendants; the element itself is the passage container."
+    tables = [r.table for r in rulesets]
+    cumulations = [[] for _ in rulesets]
+    everyone = range(len(rulesets))
+    if elem.text:
+        for c in cumulations:
+            c.append(elem.text)
+    # Stack entries: children iterator, tail to emit when exhausted, editions including the element,
+    # editions including its tail, and the child each `choose` rule keeps.
+    stack = [(iter(elem), None, everyone, (), _chosen_children(elem, everyone, tables))]
+    while stack:
+        kids, tail, active, tailactive, chosen = stack[-1]
+        for kid in kids:
+            included = []
+            tag = kid.tag
+            if isinstance(tag, str):
+                for i in active:
+                    if i in chosen and chosen[i] is not kid:
+                        continue
+                    act = tables[i].get(tag)
+                    if act is None or act[0] == CHOOSE:
+                        included.append(i)
+                    elif act[0] == REPLACE:
+                        cumulations[i].append(act[1])
+                    elif act[0] == TEXT:
+                        cumulations[i].append("".join(kid.itertext()))
+            if included:
+                if kid.text:
+                    for i in included:
+                        cumulations[i].append(kid.text)
+                stack.append((iter(kid), kid.tail, included, active, _chosen_children(kid, included, tables)))
+                break
+            elif kid.tail:
+                for i in active:
+                    cumulations[i].append(kid.tail)
+        else:
+            stack.pop()
+            if tail:
+                for i in tailactive:
+                    cumulations[i].append(tail)
+    texts = ["".join(c) for c in cumulations]
+    return [tidy_ws(t) if r.tidy else t for r, t in zip(rulesets, texts)]
+
+diplomatic_rules = EditionRules({"expan": OMIT})
+normalized_rules = EditionRules({"abbr": OMIT})
+
+# Rule sets for the standard editions, keyed by exemplar name.
+standard_editions = {
+    "diplomatic": diplomatic_rules,
+    "normalized": normalized_rules,
+}
+
+# Corpora with fewer passages than this are always built serially: below it, starting a process pool costs more than it saves.
+parallel_threshold = 2000
+
+def extract_element_texts(elem, rulesets):
+    "Extract the text of each edition in `rulesets` from an ElementTree element, returned as a tuple. Rule sets that only omit elements use the faster omit-set extractors."
+    if instrument.collector() is not None:
+        with instrument.stage("text.extract", 1):
+            return _extract_element_texts(elem, rulesets)
+    return _extract_element_texts(elem, rulesets)
+
+def _extract_element_texts(elem, rulesets):
+    omitsets = [r.omitset for r in rulesets]
+    if None in omitsets:
+        return tuple(apply_rules(elem, rulesets))
+    if len(omitsets) == 1:
+        texts = [extract_element_text(elem, omitsets[0])]
+    else:
+        texts = _extract_texts(elem, omitsets)
+    return tuple(tidy_ws(t) if r.tidy else t for r, t in zip(rulesets, texts))
+
+def extract_fragment(fragment, rulesets):
+    "Parse an XML fragment and extract the text of each edition in `rulesets`, returned as a tuple."
+    if instrument.collector() is None:
+        return extract_element_texts(ET.fromstring(fragment), rulesets)
+    with instrument.stage("xml.parse", 1):
+        elem = ET.fromstring(fragment)
+    return extract_element_texts(elem, rulesets)
+
+# Identical fragments (formulae, titles, repeated abbreviations) are common, so extraction is
+# memoized on the fragment and rule sets.  Each worker process has its own cache; threads share one.
+default_extraction_cache_size = 4096
+_cached_extract_fragment = lru_cache(maxsize=default_extraction_cache_size)(extract_fragment)
+
+def set_extraction_cache_size(maxsize):
+    "Resize the LRU cache of extracted edition texts, discarding its contents and statistics. A size of 0 disables caching; None makes the cache unbounded."
+    global _cached_extract_fragment
+    _cached_extract_fragment = lru_cache(maxsize=maxsize)(extract_fragment)
+
+def extraction_cache_info():
+    "Hit and miss statistics for the cache of extracted edition texts in this process, as a `functools` CacheInfo tuple of hits, misses, maxsize and currsize."
+    return _cached_extract_fragment.cache_info()
+
+def clear_extraction_cache():
+    "Empty the cache of extracted edition texts and reset its statistics."
+    _cached_extract_fragment.cache_clear()
 
-        omitlist = ['expan'] 
+def extract_fragment_cached(fragment, rulesets):
+    "Like `extract_fragment`, but going through the extraction cache. `rulesets` must be a tuple of EditionRules."
+    return _cached_extract_fragment(fragment, rulesets)
+
+def extract_fragments(fragments, rulesets):
+    "Extract the text of each edition from each of a list of XML fragments, going through the extraction cache. `rulesets` holds EditionRules or omit lists. Returns one tuple of edition texts per fragment. This is the unit of work for parallel edition building."
+    rulesets = tuple(as_rules(r) for r in rulesets)
+    cached = _cached_extract_fragment
+    return [cached(x, rulesets) for x in fragments]
+
+def _parallel_extract(fragments, rulesets, workers, threads=False):
+    from .parallel import map_chunks
+    return map_chunks(extract_fragments, fragments, workers, rulesets, processes=not threads)
+
+def build_editions(xmlcorpus: CitableCorpus, editions = None, workers: int = None, threads: bool = False):
+    "Compose several citable editions from an XML corpus, parsing each passage only once. `editions` maps an exemplar name to its EditionRules or omit list (default: diplomatic and normalized); the result maps each exemplar name to a CitableCorpus. With `workers` greater than 1, corpora of at least `parallel_threshold` passages are extracted in chunks on a process pool, or with `threads` on a thread pool sharing one extraction cache (faster on free-threaded Python, where threads run in parallel)."
+    if editions is None:
+        editions = standard_editions
+    names = list(editions)
+    rulesets = tuple(as_rules(editions[n]) for n in names)
+    plist = xmlcorpus.passages
+    fragments = [p.text for p in plist]
+    with instrument.stage("edition.extract", len(fragments)):
+        if workers is not None and workers > 1 and len(fragments) >= parallel_threshold:
+            texts = _parallel_extract(fragments, rulesets, workers, threads)
+        else:
+            texts = extract_fragments(fragments, rulesets)
+    with instrument.stage("edition.passages", len(fragments) * len(names)):
+        psgs = {n: [] for n in names}
+        rewriters = [edition_rewriter(n) for n in names]
+        for p, extracted in zip(plist, texts):
+            for n, rewrite, t in zip(names, rewriters, extracted):
+                psgs[n].append(CitablePassage(urn = rewrite(p.urn), text = t))
+        return {n: CitableCorpus(passages = psgs[n]) for n in names}
+
+def build_editions_from_tei(source, baseurn: str, editions = None, include_xml: bool = False):
+    "Compose citable editions straight from a TEI document, extracting text from the elements `TEIDivAbReader` parses instead of serializing and re-parsing each passage. `source` is a file name or file object; `editions` is as for `build_editions`. With `include_xml`, the result also holds the corpus of XML passages under the key `\"xml\"`."
+    if editions is None:
+        editions = standard_editions
+    names = list(editions)
+    rulesets = tuple(as_rules(editions[n]) for n in names)
+    psgs = {n: [] for n in names}
+    rewriters = [edition_rewriter(n) for n in names]
+    xmlpsgs = []
+    for urnstring, ab in TEIDivAbReader.iterelements(source, baseurn):
+        urn = CtsUrn.from_string(urnstring)
+        if include_xml:
+            xmlpsgs.append(CitablePassage.from_delimited(ab_line(urnstring, ab), delimiter="|"))
+        for n, rewrite, t in zip(names, rewriters, extract_element_texts(ab, rulesets)):
+            psgs[n].append(CitablePassage(urn = rewrite(urn), text = t))
+    results = {n: CitableCorpus(passages = psgs[n]) for n in names}
+    if include_xml:
+        results["xml"] = CitableCorpus(passages = xmlpsgs)
+    return results
+
+class LazyEdition:
+    """An edition of an XML corpus computed passage by passage, on demand.
+
+    The view shares the XML corpus and its retrieval, so creating it costs nothing.
+    Retrieving edition URNs (with the view's exemplar) transforms only the matching
+    source passages, and each transformed passage is kept for later requests.
+
+    Attributes:
+        xmlcorpus (CitableCorpus): The corpus of XML passages.
+        exemplar (str): Exemplar identifier for URNs of the edition.
+        rules (EditionRules): The rules defining the edition.
+    """
+
+    def __init__(self, xmlcorpus: CitableCorpus, exemplar: str, rules):
+        self.xmlcorpus = xmlcorpus
+        self.exemplar = exemplar
+        self.rules = as_rules(rules)
+        self._rulesets = (self.rules,)
+        self._urns = {}
+        self._rewrite = edition_rewriter(exemplar)
+        self._passages = {}
+
+    def __len__(self) -> int:
+        return len(self.xmlcorpus.passages)
+
+    def __str__(self):
+        return f"Lazy {self.exemplar} edition of {len(self)} passages ({len(self._passages)} computed)."
+
+    def urn(self, i: int) -> CtsUrn:
+        "Get the edition URN of the source passage at position `i`, without transforming its text."
+        u = self._urns.get(i)
+        if u is None:
+            # setdefault keeps the first result when threads race to compute one.
+            u = self._urns.setdefault(i, self._rewrite(self.xmlcorpus.passages[i].urn))
+        return u
+
+    def passage(self, i: int) -> CitablePassage:
+        "Get the edition of the source passage at position `i`, transforming it on first use."
+        psg = self._passages.get(i)
+        if psg is None:
+            text = _cached_extract_fragment(self.xmlcorpus.passages[i].text, self._rulesets)[0]
+            psg = self._passages.setdefault(i, CitablePassage(urn = self.urn(i), text = text))
+        return psg
+
+    def __iter__(self):
+        return (self.passage(i) for i in range(len(self)))
+
+    def _find(self, urn: CtsUrn):
+        # First position whose edition URN contains `urn`, as in CitableCorpus.retrieve_range.
+        # The passage test runs on the source URN, which the edition leaves unchanged.
+        for i, p in enumerate(self.xmlcorpus.passages):
+            if p.urn.passage_contains(urn) and self.urn(i).work_contains(urn):
+                return i
+        return None
+
+    def _source_indices(self, ref: CtsUrn) -> List[int]:
+        if ref.is_range():
+            begin_index = self._find(ref.set_passage(ref.range_begin()))
+            end_index = self._find(ref.set_passage(ref.range_end()))
+            if begin_index is None or end_index is None:
+                return []
+            return list(range(begin_index, end_index + 1))
+        # Source passages lack the edition's version and exemplar, so search with them dropped,
+        # then keep passages whose edition URN belongs to the requested work.
+        relaxed = ref.drop_version() if ref.work is not None else ref
+        candidates = self.xmlcorpus.retrieve_indices(relaxed)
+        return [i for i in candidates if ref.work_contains(self.urn(i))]
+
+    def retrieve(self, ref: CtsUrn) -> List[CitablePassage]:
+        """Retrieve edition passages matching a CtsUrn reference, transforming only those passages.
+        
+        Args:
+            ref (CtsUrn): The CtsUrn reference to search for, including range references.
+        
+        Returns:
+            List[CitablePassage]: List of matching passages of the edition.
+        """
+        return [self.passage(i) for i in self._source_indices(ref)]
+
+    def retrieve_range(self, ref: CtsUrn) -> List[CitablePassage]:
+        """Retrieve edition passages matching a CtsUrn range reference.
         
-        plist = xmlcorpus.passages
-        psgs = []
-        for p in plist:
-            extracted = extract_text(minidom.parseString(p.text).documentElement, [],  omitlist )
+        Args:
+            ref (CtsUrn): The CtsUrn range reference to search for.
+        """
+        if ref.is_range() == False:
+            raise ValueError("retrieve_range: provided CtsUrn is not a range.")
+        return self.retrieve(ref)
+
+    def corpus(self) -> CitableCorpus:
+        "Transform every remaining passage and return the full edition as a CitableCorpus."
+        return CitableCorpus(passages = list(self))
+
+class RuleEditionBuilder(EditionBuilder):
+    """An edition builder applying a set of EditionRules to every passage.
+
+    Attributes:
+        exemplar (str): Exemplar identifier for URNs of the edition.
+        rules (EditionRules): The rules defining the edition.
+    """
 
-            # What's up?
-            #tidy = tidy_ws(' '.join(extracted))
+    def __init__(self, exemplar: str, rules):
+        self.exemplar = exemplar
+        self.rules = as_rules(rules)
 
-            psgs.append(CitablePassage(urn = p.urn,text = extracted )) 
+    def edition(self, xmlcorpus: CitableCorpus, workers: int = None, threads: bool = False) -> CitableCorpus:
+        "Compose a citable edition by applying the builder's rules to the XML of each passage in the corpus. See `build_editions` for `workers` and `threads`."
+        return build_editions(xmlcorpus, {self.exemplar: self.rules}, workers, threads)[self.exemplar]
 
-        fullurls = [CitablePassage(urn = set_edition_exemplar(p.urn, "diplomatic"), text =p.text) for p in psgs]
-        return CitableCorpus(passages = fullurls)
+    def lazy_edition(self, xmlcorpus: CitableCorpus) -> LazyEdition:
+        "Create a view of the edition that transforms passages only when they are retrieved."
+        return LazyEdition(xmlcorpus, self.exemplar, self.rules)
+
+class TEIDiplomatic(EditionBuilder):
+    rules = diplomatic_rules
+
+    def edition(xmlcorpus: CitableCorpus, workers: int = None, threads: bool = False):
+        "Compose a citable diplomatic edition by extracting text from the XML of each passage in the corpus, omitting specified elements. See `build_editions` for `workers` and `threads`."
+        return RuleEditionBuilder("diplomatic", diplomatic_rules).edition(xmlcorpus, workers, threads)
+
+    def lazy_edition(xmlcorpus: CitableCorpus) -> LazyEdition:
+        "Create a view of the diplomatic edition that transforms passages only when they are retrieved."
+        return LazyEdition(xmlcorpus, "diplomatic", diplomatic_rules)
     
 class TEINormalized(EditionBuilder):
     "Compose a citable normalized edition by extracting text from the XML of each passage in the corpus, omitting specified elements."
-    def edition(xmlcorpus: CitableCorpus):
-        omitlist = ['abbr'] 
-        
-        plist = xmlcorpus.passages
-        psgs = []
-        for p in plist:
-            extracted = extract_text(minidom.parseString(p.text).documentElement, [],  omitlist )
-
-            # What's up?
-            #tidy = tidy_ws(' '.join(extracted))
+    rules = normalized_rules
 
-            psgs.append(CitablePassage(urn = p.urn,text = extracted )) 
+    def edition(xmlcorpus: CitableCorpus, workers: int = None, threads: bool = False):
+        return RuleEditionBuilder("normalized", normalized_rules).edition(xmlcorpus, workers, threads)
 
-        fullurls = [CitablePassage(urn = set_edition_exemplar(p.urn, "normalized"), text =p.text) for p in psgs] 
-        return CitableCorpus(passages = fullurls)     
-    
\ No newline at end of file
+    def lazy_edition(xmlcorpus: CitableCorpus) -> LazyEdition:
+        "Create a view of the normalized edition that transforms passages only when they are retrieved."
+        return LazyEdition(xmlcorpus, "normalized", normalized_rules)
@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, List, Tuple
+from pydantic import BaseModel
+from .corpus import CitableCorpus
+from .passage import CitablePassage
+from .markupreader import TEIDivAbReader
+from .cache import IngestionCache
+
+
+class IngestionError(BaseModel):
+    """A source file that could not be ingested.
+
+    Attributes:
+        path (str): Path of the source file.
+        baseurn (str): Base URN the file was to be read with.
+        message (str): Description of the failure.
+    """
+    path: str
+    baseurn: str
+    message: str
+
+    def __str__(self):
+        return f"{self.path}: {self.message}"
+
+
+class IngestionResult(BaseModel):
+    """The outcome of a bulk ingestion.
+
+    Attributes:
+        corpus (CitableCorpus): Passages from all successfully read files, in input order.
+        errors (List[IngestionError]): One entry for each file that could not be read.
+        elapsed (float): Wall-clock time of the whole batch in seconds.
+    """
+    corpus: CitableCorpus
+    errors: List[IngestionError]
+    elapsed: float
+
+    def ok(self) -> bool:
+        """True if every file in the batch was read successfully."""
+        return not self.errors
+
+
+def read_tei_file(path: str, baseurn: str, cache: IngestionCache = None) -> List[CitablePassage]:
+    "Read a single TEI file with `TEIDivAbReader` and return its passages, going through `cache` if one is given."
+    if cache is not None:
+        return cache.tei_passages(path, baseurn)
+    with open(path, 'r', encoding='utf-8') as xmlfile:
+        src = xmlfile.read()
+    return TEIDivAbReader.corpus(src, baseurn).passages
+
+
+def _report(verbose: bool, msg: str):
+    if verbose:
+        print(msg, file=sys.stderr, flush=True)
+
+
+def ingest_tei_files(sources: Iterable[Tuple[str, str]], workers: int = None, verbose: bool = True, cache: IngestionCache = None) -> IngestionResult:
+    """Read many TEI files into a single CitableCorpus, parsing them on a process pool.
+
+    Passages are merged in the order of `sources`, regardless of the order in which
+    files finish parsing.  A `set` of sources has no order of its own, so it is
+    sorted by path and base URN first.  A file that fails to read or parse is
+    recorded in the result's `errors` and does not abort the batch.
+
+    Args:
+        sources (Iterable[Tuple[str, str]]): Pairs of (file path, base URN).
+        workers (int): Number of worker processes. Default is the number of CPUs;
+            1 reads every file in the calling process.
+        verbose (bool): Print progress and timing to stderr. Default is True.
+        cache (IngestionCache): Optional ingestion cache. Unchanged files are read
+            from the cache, and the cache is evicted to its limits after the batch.
+
+    Returns:
+        IngestionResult: The merged corpus, per-file errors and elapsed time.
+    """
+    if isinstance(sources, (set, frozenset)):
+        sources = sorted(sources)
+    sources = list(sources)
+    total = len(sources)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, total)) if total else 1
+
+    start = time.perf_counter()
+    results = [None] * total
+    errors = {}
+
+    def record(i, psgs, err):
+        path, baseurn = sources[i]
+        if err is None:
+            results[i] = psgs
+            _report(verbose, f"[{done}/{total}] {path}: {len(psgs)} passages")
+        else:
+            errors[i] = IngestionError(path=path, baseurn=baseurn, message=f"{type(err).__name__}: {err}")
+            _report(verbose, f"[{done}/{total}] {path}: FAILED ({errors[i].message})")
+
+    done = 0
+    if workers == 1:
+        for i, (path, baseurn) in enumerate(sources):
+            done += 1
+            try:
+                record(i, read_tei_file(path, baseurn, cache), None)
+            except Exception as err:
+                record(i, None, err)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(read_tei_file, path, baseurn, cache): i for i, (path, baseurn) in enumerate(sources)}
+            for fut in as_completed(futures):
+                done += 1
+                err = fut.exception()
+                record(futures[fut], None if err else fut.result(), err)
+
+    if cache is not None:
+        cache.evict()
+    passages = [p for psgs in results if psgs is not None for p in psgs]
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else float("inf")
+    _report(verbose, f"Ingested {total - len(errors)} of {total} files ({len(passages)} passages) in {elapsed:.2f}s with {workers} worker(s), {rate:.1f} files/s")
+
+    return IngestionResult(
+        corpus=CitableCorpus(passages=passages),
+        errors=[errors[i] for i in sorted(errors)],
+        elapsed=elapsed)
@@ -0,0 +1,199 @@
+"""Collect wall time, call counts and item counts for the stages of loading and building corpora.
+
+Instrumentation is off by default, and then each instrumented call costs a
+single check.  Turn it on for a block of code with `instrumented`:
+
+    with instrumented() as stats:
+        corpus = CitableCorpus.from_cex_file("hyginus.cex")
+    print(stats.to_json())
+
+Stages nest: the time of `xml.iterparse`, for example, includes nothing of the
+consumer's work, but `edition.extract` includes the `xml.parse` and
+`text.extract` stages of every passage it extracts.
+
+The active collection is held in a context variable, so a block records only
+the work of its own thread (or asyncio task), together with the pool threads
+that `parallel.map_chunks` runs on its behalf.  Work done in other processes,
+such as parallel edition building, is not recorded.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    import logging
+
+# logging.INFO; logging and json are imported only when totals are exported.
+INFO = 20
+
+
+class StageStats:
+    """Totals for one stage.
+
+    Attributes:
+        calls (int): Number of times the stage ran.
+        items (int): Number of items (passages, lines, elements) it processed.
+        seconds (float): Total wall-clock time.
+    """
+    __slots__ = ("calls", "items", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.items = 0
+        self.seconds = 0.0
+
+    def to_dict(self) -> dict:
+        return {"calls": self.calls, "items": self.items, "seconds": self.seconds}
+
+
+class Instrumentation:
+    """A thread-safe collection of StageStats, keyed by stage name.
+
+    Attributes:
+        stages (Dict[str, StageStats]): Totals for each stage seen so far.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float = 0.0, items: int = 0, calls: int = 1):
+        "Add a run of stage `name` to its totals."
+        with self._lock:
+            st = self.stages.get(name)
+            if st is None:
+                st = self.stages[name] = StageStats()
+            st.calls += calls
+            st.items += items
+            st.seconds += seconds
+
+    def reset(self):
+        "Discard all totals."
+        with self._lock:
+            self.stages.clear()
+
+    def to_dict(self) -> Dict[str, dict]:
+        "Totals as a dictionary mapping each stage name to its calls, items and seconds."
+        with self._lock:
+            return {name: st.to_dict() for name, st in self.stages.items()}
+
+    def to_json(self, indent: int = 2) -> str:
+        "Totals as a JSON object, as in `to_dict`."
+        import json
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def log(self, log: logging.Logger = None, level: int = INFO):
+        "Emit one record per stage to `log` (default: this module's logger), with the totals in the record's `stage`, `calls`, `items` and `seconds` attributes."
+        import logging
+        log = log or logging.getLogger(__name__)
+        for name, st in self.to_dict().items():
+            log.log(level, "%s: %d calls, %d items, %.6f s", name, st["calls"], st["items"], st["seconds"],
+                    extra={"stage": name, **st})
+
+
+_collector: contextvars.ContextVar[Optional[Instrumentation]] = contextvars.ContextVar("citable_corpus_instrumentation", default=None)
+
+
+def collector() -> Optional[Instrumentation]:
+    "The active Instrumentation of the current context, or None when instrumentation is off."
+    return _collector.get()
+
+
+@contextmanager
+def instrumented(stats: Instrumentation = None, log: logging.Logger = None, level: int = INFO):
+    """Collect stage totals while the block runs, restoring the previous state afterwards.
+
+    Args:
+        stats (Instrumentation): Collection to add to. Default is a new, empty one.
+        log (logging.Logger): If given, the totals are logged to it when the block exits.
+        level (int): Logging level for `log`. Default is INFO.
+
+    Yields:
+        Instrumentation: The active collection.
+    """
+    active = stats if stats is not None else Instrumentation()
+    token = _collector.set(active)
+    try:
+        yield active
+    finally:
+        _collector.reset(token)
+        if log is not None:
+            active.log(log, level)
+
+
+class _Stage:
+    __slots__ = ("stats", "name", "items", "start")
+
+    def __init__(self, stats, name, items):
+        self.stats = stats
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(self.name, time.perf_counter() - self.start, self.items)
+        return False
+
+
+class _NullStage:
+    __slots__ = ("items",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_stage = _NullStage()
+
+
+def stage(name: str, items: int = 0):
+    """Context manager timing one run of stage `name`.  Set `items` on the object it
+    yields to record how many items the run processed.  Does nothing when
+    instrumentation is off."""
+    stats = _collector.get()
+    if stats is None:
+        return _null_stage
+    return _Stage(stats, name, items)
+
+
+def count(name: str, items: int = 1):
+    "Record `items` processed by stage `name`, without timing it."
+    stats = _collector.get()
+    if stats is not None:
+        stats.record(name, 0.0, items)
+
+
+def timed_iter(name: str, iterable: Iterable) -> Iterator:
+    """Time the production of each item of `iterable` as stage `name`, excluding the
+    consumer's time between items.  When instrumentation is off, `iterable` is
+    returned unchanged."""
+    stats = _collector.get()
+    if stats is None:
+        return iterable
+    return _timed_iter(stats, name, iterable)
+
+
+def _timed_iter(stats, name, iterable):
+    it = iter(iterable)
+    seconds = 0.0
+    items = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                seconds += time.perf_counter() - start
+                return
+            seconds += time.perf_counter() - start
+            items += 1
+            yield item
+    finally:
+        stats.record(name, seconds, items)
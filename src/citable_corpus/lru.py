@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """A thread-safe cache evicting the least recently used entries, with hit and miss statistics.
+
+    Entries are bounded in number by `maxsize` and, optionally, in total weight by
+    `maxweight` (e.g. the number of passages held by cached results).  A cache can
+    follow the revision of the data its entries were computed from: `get` and
+    `put` take a revision token, and the cache empties itself whenever it sees a
+    token other than the current one (compared by identity).
+
+    Attributes:
+        maxsize (int): Largest number of entries kept; 0 disables caching.
+        maxweight (int): Largest total weight of entries kept, or None for no limit.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups not found in the cache.
+        evictions (int): Entries dropped to stay within the limits.
+        invalidations (int): Times the cache was emptied because the revision changed.
+    """
+
+    def __init__(self, maxsize: int = 1024, maxweight: Optional[int] = None):
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._revision = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self):
+        # Copies and pickles start empty, with the same limits and statistics.
+        state = dict(self.__dict__)
+        del state["_lock"]
+        state.update(_entries=OrderedDict(), _weight=0, _revision=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _check_revision(self, revision):
+        # Called with the lock held.
+        if revision is not self._revision:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._weight = 0
+            self._revision = revision
+
+    def get(self, key: Hashable, revision: Any = None) -> Any:
+        "The value cached for `key` at `revision`, or None."
+        with self._lock:
+            self._check_revision(revision)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, revision: Any = None, weight: int = 1):
+        """Cache `value` for `key`, evicting old entries to stay within the limits.
+
+        Nothing is stored if `revision` is no longer current (the value was computed
+        from data that has since changed), if caching is disabled, or if the value
+        alone outweighs `maxweight`.
+        """
+        with self._lock:
+            if revision is not self._revision or self.maxsize <= 0:
+                return
+            if self.maxweight is not None and weight > self.maxweight:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._weight -= old[1]
+            self._entries[key] = (value, weight)
+            self._weight += weight
+            while len(self._entries) > self.maxsize or (self.maxweight is not None and self._weight > self.maxweight):
+                _, (_, w) = self._entries.popitem(last=False)
+                self._weight -= w
+                self.evictions += 1
+
+    def clear(self):
+        "Discard all entries, keeping the statistics."
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def stats(self) -> dict:
+        "Current size and weight, limits, counts, and the hit rate (hits over lookups)."
+        with self._lock:
+            total = self.hits + self.misses
+            return {"size": len(self._entries), "maxsize": self.maxsize, "weight": self._weight, "maxweight": self.maxweight,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations, "hit_rate": self.hits / total if total else 0.0}
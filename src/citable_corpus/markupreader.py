@@ -1,6 +1,10 @@
+import re
 from abc import ABC, abstractmethod
 import xml.etree.ElementTree as ET
+from typing import Iterator, Tuple
 from .corpus import CitableCorpus
+from .passage import CitablePassage
+from . import instrument
 
 
 
@@ -22,20 +26,71 @@ class TEIDivAbReader(MarkupReader):
 
     
     def cex(xmlstring, baseurn):
-        parsed = ET.fromstring(xmlstring)
+        with instrument.stage("xml.parse", 1):
+            parsed = ET.fromstring(xmlstring)
         #root = parsed.getroot()
-        flatlines = []
-        divlist = [div for div in parsed.findall('./tei:text/tei:body/tei:div', nsdict)]
-        for d in divlist:
-            u1 = baseurn + d.get('n')
-            sub_abs = d.findall('./tei:ab', nsdict)
-            #flatlines.append(f"Found {len(sub_abs)} ab childredn of div {d.get('n')}")
-            for ab in d.findall('./tei:ab', nsdict):
-                u = u1 + "." + ab.get('n')
-                rawline = u + "|" + ET.tostring(ab, encoding='unicode')
-
-                line = rawline.replace("\n", " ").replace("\r", " ").strip()
-                tidy = ' '.join(line.split())
-                flatlines.append(tidy)
-
-        return "\n".join(flatlines)
\ No newline at end of file
+        with instrument.stage("xml.serialize") as st:
+            flatlines = []
+            divlist = [div for div in parsed.findall('./tei:text/tei:body/tei:div', nsdict)]
+            for d in divlist:
+                u1 = baseurn + d.get('n')
+                for ab in d.findall('./tei:ab', nsdict):
+                    flatlines.append(ab_line(u1 + "." + ab.get('n'), ab))
+            st.items = len(flatlines)
+
+        return "\n".join(flatlines)
+
+    def iterelements(source, baseurn) -> Iterator[Tuple[str, ET.Element]]:
+        "Stream the `tei:ab` elements of a TEI document as pairs of (URN string, element), with whitespace in their text normalized as in `cex`. `source` is a file name or file object. Only one element is held in memory at a time: each is discarded once the next pair is requested."
+        return instrument.timed_iter("xml.iterparse", _iterelements(source, baseurn))
+
+    def iterpassages(source, baseurn) -> Iterator[CitablePassage]:
+        "Stream passages from a TEI document one at a time. `source` is a file name or file object; passages are identical to those of `corpus`, but only one `tei:ab` element is held in memory at a time."
+        for urn, ab in TEIDivAbReader.iterelements(source, baseurn):
+            yield CitablePassage.from_delimited(ab_line(urn, ab), delimiter="|")
+
+
+def _iterelements(source, baseurn):
+    path = [f"{{{nsdict['tei']}}}{t}" for t in ['TEI', 'text', 'body', 'div', 'ab']]
+    stack = []
+    divurn = None
+    pending = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        # The tail of an ab is complete only once the parser reports the next event.
+        if pending is not None:
+            ab, parent = pending
+            yield divurn + "." + ab.get('n'), normalize_ws(ab)
+            parent.remove(ab)
+            pending = None
+        if event == 'start':
+            stack.append(elem)
+            if len(stack) == 4 and [e.tag for e in stack] == path[:4]:
+                divurn = baseurn + elem.get('n')
+        else:
+            stack.pop()
+            if len(stack) == 4 and elem.tag == path[4] and [e.tag for e in stack] == path[:4]:
+                pending = (elem, stack[-1])
+            elif len(stack) in (3, 4):
+                # Finished a div, or something other than an ab inside one: free it.
+                elem.clear()
+    if pending is not None:
+        ab, parent = pending
+        yield divurn + "." + ab.get('n'), normalize_ws(ab)
+
+
+_ws = re.compile(r"\s+")
+
+def normalize_ws(elem):
+    "Collapse each run of whitespace in the text of an element and its descendants to a single space, in place, as `ab_line` does to the serialized element. Returns the element."
+    for e in elem.iter():
+        if e.text:
+            e.text = _ws.sub(" ", e.text)
+        if e.tail and e is not elem:
+            e.tail = _ws.sub(" ", e.tail)
+    return elem
+
+def ab_line(urn, ab):
+    "Format a `tei:ab` element as a line of delimited text, with its markup on a single line and whitespace collapsed."
+    rawline = urn + "|" + ET.tostring(ab, encoding='unicode')
+    line = rawline.replace("\n", " ").replace("\r", " ").strip()
+    return ' '.join(line.split())
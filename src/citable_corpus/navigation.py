@@ -0,0 +1,170 @@
+"""Navigation through the citation hierarchy of a corpus: next and previous, parent, children and siblings.
+
+A CitationIndex is built once from a corpus's passages.  Every citation node
+of a work, whether a passage ("pr.3") or a section containing passages
+("pr"), is recorded with its depth, its ordinal among the nodes of that depth
+and the span of passages it covers, so that each navigation step is a
+dictionary lookup rather than a scan of the corpus:
+
+    index = CitationIndex(corpus.passages)
+    index.next(CtsUrn.from_string("urn:cts:latinLit:stoa1263.stoa001.hc:pr.3"))  # ...:pr.4
+
+`CitableCorpus.next`, `prev`, `parent`, `children`, `siblings` and `context`
+keep an index for the corpus and rebuild it when the passages change.
+"""
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+from .urns import passage_copier, with_passage, work_key
+
+if TYPE_CHECKING:
+    from urn_citation import CtsUrn
+    from .passage import CitablePassage
+
+
+class _WorkCitations:
+    "The citation nodes of one work, in the order the corpus cites them."
+
+    def __init__(self, work: CtsUrn):
+        self.work = work
+        self.copy = passage_copier(work)
+        # Corpus positions of the work's passages.
+        self.positions: List[int] = []
+        # Reference -> [depth, ordinal among nodes of that depth, first and last index into `positions`].
+        self.nodes: Dict[str, List[int]] = {}
+        self.levels: Dict[int, List[str]] = {}
+        # Parent reference (None for the work) -> child references.
+        self.children: Dict[Optional[str], List[str]] = {None: []}
+        # The parent of the last passage added, and the entries in `nodes` of it and its ancestors.
+        self._section = None
+        self._ancestors: List[List[int]] = []
+
+    def add(self, position: int, ref: str):
+        k = len(self.positions)
+        self.positions.append(position)
+        section, dot, _ = ref.rpartition(".")
+        if dot and section == self._section and ref not in self.nodes:
+            # Usually the next passage of the same section: only its own node is new.
+            for entry in self._ancestors:
+                entry[3] = k
+            level = self.levels[len(self._ancestors) + 1]
+            self.nodes[ref] = [len(self._ancestors) + 1, len(level), k, k]
+            level.append(ref)
+            self.children[section].append(ref)
+            self.children[ref] = []
+            return
+        parent = None
+        ancestors = []
+        pieces = ref.split(".")
+        for depth in range(1, len(pieces) + 1):
+            node = ".".join(pieces[:depth])
+            found = self.nodes.get(node)
+            if found is None:
+                level = self.levels.setdefault(depth, [])
+                self.nodes[node] = [depth, len(level), k, k]
+                level.append(node)
+                self.children[parent].append(node)
+                self.children[node] = []
+            else:
+                found[3] = k
+            ancestors.append(self.nodes[node])
+            parent = node
+        self._section = section if dot else None
+        self._ancestors = ancestors[:-1]
+
+
+class CitationIndex:
+    """The citation hierarchy of a list of passages, for navigating it in constant time.
+
+    References are split into levels at periods: "pr.3" is a child of "pr",
+    which is a child of its work.  Nodes of the same depth in a work are
+    ordered by their first passage, so the node after "1.31" is "2.1".  Passages
+    without a passage reference are ignored.
+
+    Lookups raise KeyError for a URN the passages do not cite, and ValueError
+    for a range.
+
+    Attributes:
+        revision (object): The revision token of the passage list the index was built from, if it has one.
+    """
+
+    def __init__(self, passages: Sequence[CitablePassage]):
+        """Index the citation nodes of `passages`."""
+        self.revision = getattr(passages, "revision", None)
+        self._works: Dict[tuple, _WorkCitations] = {}
+        for i, p in enumerate(passages):
+            ref = p.urn.passage
+            if ref is None:
+                continue
+            key = work_key(p.urn)
+            work = self._works.get(key)
+            if work is None:
+                work = self._works[key] = _WorkCitations(with_passage(p.urn, None))
+            work.add(i, ref)
+
+    def _locate(self, urn: CtsUrn) -> Tuple[_WorkCitations, Optional[str]]:
+        # The indexed work citing `urn`, and its reference (None for the work itself).
+        if urn.is_range():
+            raise ValueError(f"Cannot navigate from a range: {urn}")
+        ref = urn.passage
+        wanted = work_key(urn)
+        work = self._works.get(wanted)
+        if work is not None and (ref is None or ref in work.nodes):
+            return work, ref
+        # A URN without version or exemplar matches the first work that cites its reference.
+        for key, work in self._works.items():
+            if key[:4] == wanted[:4] and all(f is None or f == g for f, g in zip(wanted[4:], key[4:])):
+                if ref is None or ref in work.nodes:
+                    return work, ref
+        raise KeyError(f"{urn} is not cited in the corpus")
+
+    def _step(self, urn: CtsUrn, offset: int) -> Optional[CtsUrn]:
+        work, ref = self._locate(urn)
+        if ref is None:
+            return None
+        depth, ordinal, _, _ = work.nodes[ref]
+        level = work.levels[depth]
+        i = ordinal + offset
+        return work.copy(level[i]) if 0 <= i < len(level) else None
+
+    def next(self, urn: CtsUrn) -> Optional[CtsUrn]:
+        "The node after `urn` at the same depth of its work, or None if it is the last."
+        return self._step(urn, 1)
+
+    def prev(self, urn: CtsUrn) -> Optional[CtsUrn]:
+        "The node before `urn` at the same depth of its work, or None if it is the first."
+        return self._step(urn, -1)
+
+    def parent(self, urn: CtsUrn) -> Optional[CtsUrn]:
+        "The node containing `urn`: a section, the work for a top-level node, or None for a work."
+        work, ref = self._locate(urn)
+        if ref is None:
+            return None
+        parent, dot, _ = ref.rpartition(".")
+        return work.copy(parent) if dot else work.work
+
+    def children(self, urn: CtsUrn) -> List[CtsUrn]:
+        "The nodes one level below `urn`, in corpus order; the top-level nodes of a work."
+        work, ref = self._locate(urn)
+        return [work.copy(r) for r in work.children[ref]]
+
+    def siblings(self, urn: CtsUrn) -> List[CtsUrn]:
+        "The other nodes with the same parent as `urn`, in corpus order."
+        work, ref = self._locate(urn)
+        if ref is None:
+            return []
+        parent, dot, _ = ref.rpartition(".")
+        return [work.copy(r) for r in work.children[parent if dot else None] if r != ref]
+
+    def context(self, urn: CtsUrn, before: int = 1, after: int = 1) -> List[int]:
+        """Corpus positions of the passages of `urn`, with up to `before` and `after` passages of the same work around them.
+
+        Raises:
+            KeyError: If the corpus does not cite `urn`.
+            ValueError: If `urn` is a range, or `before` or `after` is negative.
+        """
+        if before < 0 or after < 0:
+            raise ValueError("before and after must not be negative")
+        work, ref = self._locate(urn)
+        if ref is None:
+            return list(work.positions)
+        _, _, first, last = work.nodes[ref]
+        return work.positions[max(0, first - before):last + after + 1]
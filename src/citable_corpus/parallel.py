@@ -0,0 +1,59 @@
+"""Chunked execution of bulk operations on thread or process pools.
+
+Threads share one copy of a corpus, its caches and its indexes, so they cost
+no pickling; on a free-threaded build of Python they also run on separate
+cores.  With the GIL, threads help only where work releases it, and CPU-bound
+bulk operations are better spread over processes.  Each chunk given to a
+thread runs in a copy of the caller's context, so context variables such as
+the active instrumentation carry over to the pool.
+"""
+import contextvars
+import itertools
+import os
+import sys
+from typing import Callable, List, Sequence
+
+
+def gil_enabled() -> bool:
+    "Whether the running interpreter has the global interpreter lock enabled."
+    check = getattr(sys, "_is_gil_enabled", None)
+    return check() if check is not None else True
+
+
+def default_workers() -> int:
+    "A number of workers for bulk operations: one per CPU."
+    return os.cpu_count() or 1
+
+
+def chunks(items: Sequence, workers: int, per_worker: int = 4) -> List[Sequence]:
+    "Split `items` into a few chunks per worker, which balances uneven items without paying a cost per item."
+    size = max(1, -(-len(items) // (workers * per_worker)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def map_chunks(fn: Callable[..., list], items: Sequence, workers: int, *args, processes: bool = False) -> list:
+    """Apply `fn(chunk, *args)`, which returns a list, to chunks of `items` on a pool of `workers`, and concatenate the results in order.
+
+    Args:
+        fn (Callable): Function of a chunk (and `args`) returning a list. With `processes`, it must be picklable.
+        items (Sequence): Items to split into chunks.
+        workers (int): Number of threads or processes.
+        processes (bool): Use a process pool instead of threads. Default is False.
+
+    Returns:
+        list: The concatenated results.
+    """
+    parts = chunks(items, workers)
+    if workers <= 1 or len(parts) <= 1:
+        return list(itertools.chain.from_iterable(fn(part, *args) for part in parts))
+    if processes:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(fn, parts, *(itertools.repeat(a) for a in args))
+            return list(itertools.chain.from_iterable(results))
+    from concurrent.futures import ThreadPoolExecutor
+    # A context can be entered by only one thread at a time, so each chunk gets its own copy.
+    contexts = [contextvars.copy_context() for _ in parts]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda context, part: context.run(fn, part, *args), contexts, parts)
+        return list(itertools.chain.from_iterable(results))
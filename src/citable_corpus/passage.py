@@ -1,6 +1,9 @@
 from pydantic import BaseModel
 from urn_citation import CtsUrn
 
+_fields = frozenset({"urn", "text"})
+
+
 class CitablePassage(BaseModel):
     """A passage of text citable by CtsUrn
     
@@ -11,6 +14,13 @@ class CitablePassage(BaseModel):
     urn: CtsUrn
     text: str
   
+    def __reduce__(self):
+        # Pickled as two strings rather than through pydantic's state of the passage and its URN.
+        # Subclasses may have fields of their own, and are pickled by pydantic.
+        if type(self) is not CitablePassage:
+            return super().__reduce__()
+        return (_unpickle_passage, (str(self.urn), self.text))
+
     def __str__(self):
         return f"{self.urn}: {self.text}"
     
@@ -33,4 +43,17 @@ class CitablePassage(BaseModel):
         urn_str, text = src.split(delimiter, 1)
         urn = CtsUrn.from_string(urn_str.strip())
         return cls(urn=urn, text=text.strip())
-    
+
+
+def unchecked_passage(urn: CtsUrn, text: str) -> CitablePassage:
+    "A CitablePassage of a validated CtsUrn and a string, built without validating them again, for loading many passages from a trusted source."
+    psg = object.__new__(CitablePassage)
+    object.__setattr__(psg, "__dict__", {"urn": urn, "text": text})
+    object.__setattr__(psg, "__pydantic_fields_set__", set(_fields))
+    object.__setattr__(psg, "__pydantic_extra__", None)
+    object.__setattr__(psg, "__pydantic_private__", None)
+    return psg
+
+
+def _unpickle_passage(urn: str, text: str) -> CitablePassage:
+    return unchecked_passage(CtsUrn.from_string(urn), text)
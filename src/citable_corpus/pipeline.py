@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack
+from typing import Dict, Iterable, Iterator, List, Tuple
+from .passage import CitablePassage
+from .markupreader import TEIDivAbReader, ab_line
+from .editionbuilders import as_rules, edition_rewriter, standard_editions, extract_fragment_cached, extract_element_texts
+
+
+def read_tei(source, baseurn: str) -> Iterator[CitablePassage]:
+    "Reader stage: stream passages of XML from a TEI file name or file object with `TEIDivAbReader`."
+    return TEIDivAbReader.iterpassages(source, baseurn)
+
+
+def read_cex(f: str, delimiter: str = "|") -> Iterator[CitablePassage]:
+    "Reader stage: stream passages from the `ctsdata` blocks of a CEX file, reading one line at a time."
+    label = None
+    with open(f, 'r', encoding='utf-8') as cexfile:
+        for line in cexfile:
+            line = line.rstrip("\r\n")
+            if line.startswith('#!'):
+                label = line[2:]
+            elif label == "ctsdata" and line and not line.startswith('//'):
+                yield CitablePassage.from_delimited(line, delimiter)
+
+
+def _edition_passages(p: CitablePassage, rewriters, rulesets) -> Tuple[CitablePassage, ...]:
+    texts = extract_fragment_cached(p.text, rulesets)
+    return tuple(CitablePassage(urn = rewrite(p.urn), text = t) for rewrite, t in zip(rewriters, texts))
+
+
+def editions_stage(passages: Iterable[CitablePassage], editions: Dict = None) -> Iterator[Tuple[CitablePassage, ...]]:
+    """Edition stage for several editions: parse each XML passage once and yield a tuple with its passage in each edition.
+
+    Args:
+        passages (Iterable[CitablePassage]): Passages of XML.
+        editions (Dict): Maps exemplar names to EditionRules or omit lists. Default is diplomatic and normalized.
+    """
+    if editions is None:
+        editions = standard_editions
+    names = list(editions)
+    rewriters = [edition_rewriter(n) for n in names]
+    rulesets = tuple(as_rules(editions[n]) for n in names)
+    for p in passages:
+        yield _edition_passages(p, rewriters, rulesets)
+
+
+def edition_stage(passages: Iterable[CitablePassage], exemplar: str, rules) -> Iterator[CitablePassage]:
+    "Edition stage: transform each XML passage into the edition defined by `rules`, with URNs for `exemplar`."
+    for (psg,) in editions_stage(passages, {exemplar: rules}):
+        yield psg
+
+
+def cex_lines(passages: Iterable[CitablePassage], delimiter: str = "|", include_label = True) -> Iterator[str]:
+    "Format passages as lines of CEX, beginning with a `ctsdata` label line if `include_label` is True."
+    if include_label:
+        yield "#!ctsdata"
+    for p in passages:
+        yield p.cex(delimiter)
+
+
+def write_cex(passages: Iterable[CitablePassage], f, delimiter: str = "|", include_label = True) -> int:
+    """Writer stage: write passages to a CEX file as they arrive.
+
+    Args:
+        passages (Iterable[CitablePassage]): Passages to write.
+        f: File name, or a text file object open for writing.
+        delimiter (str): The delimiter separating the urn and text. Default is '|'.
+        include_label (bool): Whether to begin with the ctsdata label line. Default is True.
+
+    Returns:
+        int: Number of passages written.
+    """
+    with ExitStack() as stack:
+        out = stack.enter_context(open(f, 'w', encoding='utf-8')) if isinstance(f, str) else f
+        if include_label:
+            out.write("#!ctsdata\n")
+        count = 0
+        for p in passages:
+            out.write(p.cex(delimiter) + "\n")
+            count += 1
+        return count
+
+
+def tei_to_cex(source, baseurn: str, outputs: Dict, xml_output = None, delimiter: str = "|") -> int:
+    """Stream a TEI document to one CEX file per edition, side by side, from a single parse.
+
+    Text is extracted from the elements the reader parses, without serializing and
+    re-parsing each passage.  Memory use is bounded by the largest passage, not by
+    the size of the document.
+
+    Args:
+        source: TEI file name or file object.
+        baseurn (str): Base URN for passages in the document.
+        outputs (Dict): Maps exemplar names to output file names. Exemplars named in
+            `standard_editions` use its rules; for others, map the exemplar name to a
+            pair of (file name, EditionRules or omit list).
+        xml_output: Optional file name for the corpus of XML passages.
+        delimiter (str): The delimiter separating the urn and text. Default is '|'.
+
+    Returns:
+        int: Number of passages processed.
+    """
+    names = []
+    rulesets = []
+    files = []
+    for exemplar, target in outputs.items():
+        if isinstance(target, str):
+            target = (target, standard_editions[exemplar])
+        names.append(exemplar)
+        files.append(target[0])
+        rulesets.append(as_rules(target[1]))
+    rulesets = tuple(rulesets)
+    rewriters = [edition_rewriter(n) for n in names]
+    with ExitStack() as stack:
+        writers = [stack.enter_context(open(f, 'w', encoding='utf-8')) for f in files]
+        xmlout = stack.enter_context(open(xml_output, 'w', encoding='utf-8')) if xml_output else None
+        for out in writers + ([xmlout] if xmlout else []):
+            out.write("#!ctsdata\n")
+        count = 0
+        for urnstring, ab in TEIDivAbReader.iterelements(source, baseurn):
+            if xmlout:
+                xmlout.write(ab_line(urnstring, ab).replace("|", delimiter, 1) + "\n")
+            for out, rewrite, t in zip(writers, rewriters, extract_element_texts(ab, rulesets)):
+                out.write(f"{rewrite.rewrite_string(urnstring)}{delimiter}{t}\n")
+            count += 1
+        return count
+
+
+def _tei_to_parts(i: int, source, baseurn: str, outputs: Dict, xml_output: bool, delimiter: str, tmpdir: str) -> int:
+    # Convert one file of a batch to numbered part files in `tmpdir`.
+    parts = {}
+    for j, (exemplar, target) in enumerate(outputs.items()):
+        rules = standard_editions[exemplar] if isinstance(target, str) else target[1]
+        parts[exemplar] = (os.path.join(tmpdir, f"{i}.{j}.cex"), rules)
+    xmlpart = os.path.join(tmpdir, f"{i}.xml.cex") if xml_output else None
+    return tei_to_cex(source, baseurn, parts, xmlpart, delimiter)
+
+
+def _concatenate_parts(target: str, parts: List[str]):
+    with open(target, 'wb') as out:
+        out.write(b"#!ctsdata\n")
+        for part in parts:
+            with open(part, 'rb') as src:
+                src.readline()
+                shutil.copyfileobj(src, out)
+
+
+def tei_files_to_cex(sources: Iterable[Tuple], outputs: Dict, xml_output = None, delimiter: str = "|", workers: int = 1) -> int:
+    """Stream several TEI documents to one CEX file per edition, as `tei_to_cex` does for one.
+
+    Each document is converted to temporary files, on a process pool when
+    `workers` is more than 1, and these are concatenated in the order of `sources`.
+
+    Args:
+        sources (Iterable[Tuple]): Pairs of (TEI file name, base URN).
+        outputs (Dict): Maps exemplar names to output file names, as in `tei_to_cex`.
+        xml_output: Optional file name for the corpus of XML passages.
+        delimiter (str): The delimiter separating the urn and text. Default is '|'.
+        workers (int): Number of worker processes; None uses one per CPU. Default is 1.
+
+    Returns:
+        int: Number of passages processed.
+    """
+    sources = list(sources)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        jobs = [(i, source, baseurn, outputs, bool(xml_output), delimiter, tmpdir) for i, (source, baseurn) in enumerate(sources)]
+        if workers == 1 or len(jobs) < 2:
+            counts = [_tei_to_parts(*job) for job in jobs]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                counts = list(pool.map(_tei_to_parts, *zip(*jobs)))
+        for j, target in enumerate(outputs.values()):
+            _concatenate_parts(target if isinstance(target, str) else target[0], [os.path.join(tmpdir, f"{i}.{j}.cex") for i in range(len(jobs))])
+        if xml_output:
+            _concatenate_parts(xml_output, [os.path.join(tmpdir, f"{i}.xml.cex") for i in range(len(jobs))])
+    return sum(counts)
@@ -0,0 +1,379 @@
+"""A long-running HTTP server answering CTS-style requests for passages of one or more corpora.
+
+Corpora are loaded once and shared by every client.  Each is either a
+`CitableCorpus` or the path of a `CexIndex` file, which is looked up without
+loading the corpus.  Requests follow the CTS API:
+
+    GET /cts?request=GetPassage&urn=urn:cts:latinLit:stoa1263.stoa001.hc:pr.1-pr.5
+    GET /cts?request=GetValidReff&urn=urn:cts:latinLit:stoa1263.stoa001.hc:pr&format=cex
+    GET /cts?request=GetCapabilities
+    GET /health
+    GET /metrics
+
+Add `corpus=NAME` to look in one corpus only; otherwise matches from every
+corpus are returned, in the order the corpora were given.  Responses are JSON,
+or CEX with `format=cex`.  Connections are kept alive (HTTP/1.1), and responses
+are kept in a bounded LRU cache.  Lookups run on a pool of worker threads, so
+the event loop keeps serving cached responses and other connections while
+lookups scan a large corpus, and requests that miss the cache are looked up
+concurrently.
+
+The server binds to 127.0.0.1 by default.  Run it with
+
+    python -m citable_corpus.server --cex hyginus=tests/data/hyginus.cex --port 8080
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from .lru import LRUCache
+
+_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+_content_types = {"json": "application/json; charset=utf-8", "cex": "text/plain; charset=utf-8"}
+cts_requests = ["GetCapabilities", "GetPassage", "GetValidReff"]
+
+
+class _CorpusSource:
+    # A CitableCorpus held in memory.
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self._works = None
+
+    def __len__(self):
+        return len(self.corpus)
+
+    def passages(self, urn: str) -> List[Tuple[str, str]]:
+        from urn_citation import CtsUrn
+        return [(str(p.urn), p.text) for p in self.corpus.retrieve(CtsUrn.from_string(urn))]
+
+    def works(self) -> List[str]:
+        if self._works is None:
+            self._works = list(dict.fromkeys(str(p.urn).rpartition(":")[0] + ":" for p in self.corpus.passages))
+        return self._works
+
+
+class _IndexSource:
+    # A CexIndex file, opened on first use.  The index gives each lookup thread
+    # its own SQLite connection.
+    def __init__(self, path: str):
+        self.path = path
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                from .cexindex import CexIndex
+                self._index = CexIndex(self.path)
+            return self._index
+
+    def __len__(self):
+        return len(self.index)
+
+    def passages(self, urn: str) -> List[Tuple[str, str]]:
+        delimiter = self.index.delimiter
+        return [tuple(line.split(delimiter, 1)) for line in self.index.retrieve(urn)]
+
+    def works(self) -> List[str]:
+        return self.index.works()
+
+    def close(self):
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+
+def _json_body(obj) -> Tuple[str, bytes]:
+    return _content_types["json"], json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _error(status: int, message: str, request: str = None):
+    return (status, *_json_body({"error": message, **({"request": request} if request else {})}))
+
+
+class CorpusServer:
+    """An asyncio HTTP server for one or more corpora.
+
+    Use it as an async context manager, or call `start` and `close`:
+
+        async with CorpusServer({"hyginus": corpus}) as server:
+            host, port = server.address
+            await server.serve_forever()
+
+    Attributes:
+        corpora (Dict[str, object]): Corpus sources by name.
+        host (str): Address to bind. Default is 127.0.0.1.
+        port (int): Port to bind; 0 picks a free port. Default is 0.
+        cache (LRUCache): Cache of encoded responses.
+        keepalive_timeout (float): Seconds an idle connection stays open.
+        workers (int): Number of lookup threads; None for the `ThreadPoolExecutor` default.
+    """
+
+    def __init__(self, corpora: Dict[str, object], host: str = "127.0.0.1", port: int = 0,
+                 cache_size: int = 1024, keepalive_timeout: float = 15.0, delimiter: str = "|", workers: Optional[int] = None):
+        """Serve `corpora`, a dictionary mapping names to CitableCorpus objects or paths of CexIndex files."""
+        if not corpora:
+            raise ValueError("CorpusServer needs at least one corpus")
+        self.corpora = {name: _IndexSource(c) if isinstance(c, str) else _CorpusSource(c) for name, c in corpora.items()}
+        self.host = host
+        self.port = port
+        self.cache = LRUCache(cache_size)
+        self.keepalive_timeout = keepalive_timeout
+        self.delimiter = delimiter
+        self.workers = workers
+        self._server = None
+        self._executor = None
+        self._pending = {}
+        self._writers = set()
+        self._started = None
+        self._metrics = {"connections": 0, "open_connections": 0, "requests": 0, "lookups": 0, "lookup_seconds": 0.0}
+        self._by_request = {}
+        self._by_status = {}
+
+    async def start(self) -> Tuple[str, int]:
+        "Bind and start accepting connections, returning the bound (host, port)."
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="citable-corpus-lookup")
+        self._server = await asyncio.start_server(self._connection, self.host, self.port)
+        self._started = time.monotonic()
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self.address
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.host, self.port
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        "Stop accepting connections, close open ones, shut down the lookup threads and close indexes."
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for source in self.corpora.values():
+            if isinstance(source, _IndexSource):
+                source.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+    def metrics(self) -> dict:
+        "Counts of connections, requests by CTS request and by status, lookups and their time, and cache statistics."
+        uptime = time.monotonic() - self._started if self._started is not None else 0.0
+        return {**self._metrics, "uptime_seconds": uptime, "by_request": dict(self._by_request),
+                "by_status": {str(k): v for k, v in self._by_status.items()}, "cache": self.cache.stats()}
+
+    # HTTP
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._metrics["connections"] += 1
+        self._metrics["open_connections"] += 1
+        self._writers.add(writer)
+        try:
+            while await self._exchange(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._metrics["open_connections"] -= 1
+            self._writers.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _exchange(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        # Read one request and write its response; return whether to keep the connection open.
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+        except asyncio.TimeoutError:
+            return False
+        if not line:
+            return False
+        headers = {}
+        try:
+            while (header := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = header.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            method, target, version = line.decode("latin-1").split()
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            await self._write(writer, *_error(400, "malformed request"), keep_alive=False)
+            return False
+        if length:
+            await reader.readexactly(length)
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+        self._metrics["requests"] += 1
+        if method not in ("GET", "HEAD"):
+            status, ctype, body = _error(405, f"method {method} not allowed")
+        else:
+            try:
+                status, ctype, body = await self._respond(target)
+            except Exception as e:
+                # E.g. a CexIndex whose CEX file changed while the server was running.
+                status, ctype, body = _error(500, f"{type(e).__name__}: {e}")
+        self._by_status[status] = self._by_status.get(status, 0) + 1
+        await self._write(writer, status, ctype, body, keep_alive, head=method == "HEAD")
+        return keep_alive
+
+    async def _write(self, writer, status: int, ctype: str, body: bytes, keep_alive: bool, head: bool = False):
+        writer.write((f"HTTP/1.1 {status} {_reasons[status]}\r\n"
+                      f"Content-Type: {ctype}\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1"))
+        if not head:
+            writer.write(body)
+        await writer.drain()
+
+    # Requests
+
+    async def _respond(self, target: str) -> Tuple[int, str, bytes]:
+        parts = urlsplit(target)
+        if parts.path == "/health":
+            return (200, *_json_body({"status": "ok", "corpora": list(self.corpora)}))
+        if parts.path == "/metrics":
+            return (200, *_json_body(self.metrics()))
+        if parts.path != "/cts":
+            return _error(404, f"no such endpoint: {parts.path}")
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        request = query.get("request")
+        if request not in cts_requests:
+            return _error(400, f"request must be one of {', '.join(cts_requests)}", request)
+        self._by_request[request] = self._by_request.get(request, 0) + 1
+        fmt = query.get("format", "json")
+        if fmt not in _content_types:
+            return _error(400, "format must be json or cex", request)
+        corpus = query.get("corpus")
+        if corpus is not None and corpus not in self.corpora:
+            return _error(404, f"no such corpus: {corpus}", request)
+        urn = query.get("urn")
+        if urn is None and request != "GetCapabilities":
+            return _error(400, f"{request} needs a urn", request)
+
+        key = (request, corpus, urn, fmt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # Requests for the same uncached key wait for a single lookup.
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(self._lookup(key))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _lookup(self, key) -> Tuple[int, str, bytes]:
+        response, seconds = await asyncio.get_running_loop().run_in_executor(self._executor, self._timed_answer, key)
+        self._metrics["lookups"] += 1
+        self._metrics["lookup_seconds"] += seconds
+        if response[0] != 400:
+            self.cache.put(key, response)
+        return response
+
+    def _timed_answer(self, key):
+        # Time the lookup itself, not its wait for a lookup thread.
+        start = time.perf_counter()
+        response = self._answer(*key)
+        return response, time.perf_counter() - start
+
+    def _answer(self, request: str, corpus: Optional[str], urn: Optional[str], fmt: str) -> Tuple[int, str, bytes]:
+        # Runs on a lookup thread.
+        names = [corpus] if corpus is not None else list(self.corpora)
+        if request == "GetCapabilities":
+            corpora = {name: {"passages": len(self.corpora[name]), "works": self.corpora[name].works()} for name in names}
+            if fmt == "cex":
+                lines = [f"{name}{self.delimiter}{work}" for name, c in corpora.items() for work in c["works"]]
+                return 200, _content_types["cex"], ("\n".join(lines) + "\n").encode("utf-8")
+            return (200, *_json_body({"request": request, "corpora": corpora}))
+        try:
+            found = [p for name in names for p in self.corpora[name].passages(urn)]
+        except ValueError as e:
+            return _error(400, str(e), request)
+        if not found:
+            return _error(404, f"no passages match {urn}", request)
+        if request == "GetValidReff":
+            if fmt == "cex":
+                return 200, _content_types["cex"], ("\n".join(u for u, _ in found) + "\n").encode("utf-8")
+            return (200, *_json_body({"request": request, "urn": urn, "reff": [u for u, _ in found]}))
+        if fmt == "cex":
+            lines = ["#!ctsdata"] + [f"{u}{self.delimiter}{t}" for u, t in found]
+            return 200, _content_types["cex"], ("\n".join(lines) + "\n").encode("utf-8")
+        return (200, *_json_body({"request": request, "urn": urn, "passages": [{"urn": u, "text": t} for u, t in found]}))
+
+
+async def _serve(server: CorpusServer):
+    async with server:
+        print(f"Serving {', '.join(server.corpora)} on {server.url}", file=sys.stderr, flush=True)
+        await server.serve_forever()
+
+
+def serve(corpora: Dict[str, object], host: str = "127.0.0.1", port: int = 8080, cache_size: int = 1024, workers: Optional[int] = None):
+    "Run a CorpusServer for `corpora` until interrupted."
+    try:
+        asyncio.run(_serve(CorpusServer(corpora, host, port, cache_size, workers=workers)))
+    except KeyboardInterrupt:
+        pass
+
+
+def _named(arg: str, option: str) -> Tuple[str, str]:
+    name, found, path = arg.partition("=")
+    if not found:
+        raise SystemExit(f"{option} must be NAME=FILE: {arg}")
+    return name, path
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m citable_corpus.server", description="Serve corpora over HTTP with a CTS-style API.")
+    parser.add_argument("--cex", action="append", default=[], metavar="NAME=FILE", help="load the CEX file FILE as corpus NAME; may be repeated")
+    parser.add_argument("--index", action="append", default=[], metavar="NAME=INDEX", help="serve corpus NAME from the CexIndex file INDEX; may be repeated")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind. Default: %(default)s")
+    parser.add_argument("--port", type=int, default=8080, help="port to bind. Default: %(default)s")
+    parser.add_argument("--cache-size", type=int, default=1024, help="responses kept in the cache. Default: %(default)s")
+    parser.add_argument("--workers", type=int, default=None, help="lookup threads. Default: the thread pool default")
+    args = parser.parse_args(argv)
+    if not args.cex and not args.index:
+        parser.error("give at least one --cex or --index")
+
+    corpora = {}
+    if args.cex:
+        from .corpus import CitableCorpus
+        for arg in args.cex:
+            name, path = _named(arg, "--cex")
+            corpora[name] = CitableCorpus.from_cex_file(path)
+    for arg in args.index:
+        name, path = _named(arg, "--index")
+        from .cexindex import CexIndex
+        CexIndex(path).close()   # fail now on a missing or stale index
+        corpora[name] = path
+    serve(corpora, args.host, args.port, args.cache_size, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
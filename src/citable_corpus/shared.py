@@ -0,0 +1,233 @@
+"""A corpus published in shared memory, read by other processes without copying.
+
+`SharedCorpus.publish` packs the URNs and texts of a corpus into one
+`multiprocessing.shared_memory` block: two arrays of offsets followed by the
+UTF-8 bytes of the URNs and of the texts.  Any process can attach to the block
+by name and read passages straight from it.  A SharedCorpus pickles as its
+name alone, so passing one to pool workers copies nothing:
+
+    with SharedCorpus.publish(corpus) as shared:
+        with ProcessPoolExecutor() as pool:
+            results = list(pool.map(work, itertools.repeat(shared, 8), range(8)))
+
+The publishing process owns the block and frees it when it closes the
+SharedCorpus (or leaves the `with` block); attached processes only detach.
+"""
+import itertools
+import struct
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Iterator, List, Optional, Union
+from .cexindex import split_urn
+
+if TYPE_CHECKING:
+    from urn_citation import CtsUrn
+    from .corpus import CitableCorpus
+    from .passage import CitablePassage
+
+_MAGIC = b"CTSCORP1"
+# Magic, number of passages, bytes of URNs, bytes of texts.
+_header = struct.Struct("<8sQQQ")
+
+
+class SharedCorpus:
+    """A read-only corpus stored in a `multiprocessing.shared_memory` block.
+
+    Passages are decoded from the block as they are read; nothing is copied
+    when a process attaches.  Retrieval resolves URN references as
+    `CitableCorpus.retrieve` does, by scanning the URNs: the first lookup
+    splits them into their components once, and later lookups reuse them.
+
+    Attributes:
+        name (str): Name of the shared memory block.
+        owner (bool): Whether this process published the block and frees it on `close`.
+    """
+
+    def __init__(self, name: str, _shm: Optional[shared_memory.SharedMemory] = None):
+        """Attach to the corpus published in the shared memory block `name`.
+
+        Raises:
+            FileNotFoundError: If there is no block of that name.
+            ValueError: If the block does not hold a published corpus.
+        """
+        self.owner = _shm is not None
+        # Attached processes leave the block to its owner's resource tracker.
+        self._shm = _shm if _shm is not None else shared_memory.SharedMemory(name, track=False)
+        self.name = self._shm.name
+        buf = self._shm.buf.toreadonly()
+        magic, n, urn_size, text_size = _header.unpack_from(buf)
+        if magic != _MAGIC:
+            buf.release()
+            self._shm.close()
+            raise ValueError(f"Shared memory block {name} does not hold a corpus")
+        offsets = _header.size + 8 * (n + 1) * 2
+        self._len = n
+        self._urn_offsets = buf[_header.size:_header.size + 8 * (n + 1)].cast("q")
+        self._text_offsets = buf[_header.size + 8 * (n + 1):offsets].cast("q")
+        self._urns = buf[offsets:offsets + urn_size]
+        self._texts = buf[offsets + urn_size:offsets + urn_size + text_size]
+        self._views = [self._urn_offsets, self._text_offsets, self._urns, self._texts, buf]
+        self._keys = None
+
+    @classmethod
+    def publish(cls, corpus: CitableCorpus, name: Optional[str] = None) -> SharedCorpus:
+        """Copy the URNs and texts of `corpus` into a new shared memory block.
+
+        Args:
+            corpus (CitableCorpus): The corpus to publish.
+            name (str): Name for the block. Default is a unique name chosen by the system.
+
+        Returns:
+            SharedCorpus: The published corpus, owning the block.
+        """
+        passages = corpus.passages
+        n = len(passages)
+        # URNs are joined with newlines so that `urns` can decode them all at once.
+        urns = "\n".join(str(p.urn) for p in passages).encode("utf-8")
+        texts = [p.text.encode("utf-8") for p in passages]
+        urn_offsets = [0]
+        for p in passages:
+            urn_offsets.append(urn_offsets[-1] + len(str(p.urn).encode("utf-8")) + 1)
+        text_offsets = [0, *itertools.accumulate(len(t) for t in texts)]
+        text_size = text_offsets[-1]
+        start = _header.size + 8 * (n + 1) * 2
+        shm = shared_memory.SharedMemory(name, create=True, size=max(1, start + len(urns) + text_size))
+        try:
+            buf = shm.buf
+            _header.pack_into(buf, 0, _MAGIC, n, len(urns), text_size)
+            struct.pack_into(f"<{n + 1}q{n + 1}q", buf, _header.size, *urn_offsets, *text_offsets)
+            buf[start:start + len(urns)] = urns
+            buf[start + len(urns):start + len(urns) + text_size] = b"".join(texts)
+            del buf
+            return cls(shm.name, shm)
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+
+    def __reduce__(self):
+        # Pickles (e.g. arguments sent to pool workers) carry only the name.
+        return (SharedCorpus, (self.name,))
+
+    def close(self):
+        "Detach from the block, and free it if this process published it."
+        if self._shm is None:
+            return
+        for view in self._views:
+            view.release()
+        self._keys = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __del__(self):
+        # Unpickled copies in workers are usually dropped rather than closed.
+        try:
+            self.close()
+        except (AttributeError, BufferError):
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __str__(self):
+        return f"Shared corpus {self.name} with {self._len} citable passages."
+
+    def _index(self, i: int) -> int:
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("passage index out of range")
+        return i
+
+    def urn(self, i: int) -> str:
+        "The URN string of the passage at position `i`."
+        i = self._index(i)
+        return str(self._urns[self._urn_offsets[i]:self._urn_offsets[i + 1] - 1], "utf-8")
+
+    def text(self, i: int) -> str:
+        "The text of the passage at position `i`."
+        i = self._index(i)
+        return str(self._texts[self._text_offsets[i]:self._text_offsets[i + 1]], "utf-8")
+
+    def urns(self) -> List[str]:
+        "The URN strings of all passages, in corpus order."
+        return str(self._urns, "utf-8").split("\n") if self._len else []
+
+    def passage(self, i: int) -> CitablePassage:
+        "The passage at position `i`, built from the shared block."
+        from urn_citation import CtsUrn
+        from .passage import CitablePassage
+        return CitablePassage(urn=CtsUrn.from_string(self.urn(i)), text=self.text(i))
+
+    def __getitem__(self, i: int) -> CitablePassage:
+        return self.passage(i)
+
+    def __iter__(self) -> Iterator[CitablePassage]:
+        return (self.passage(i) for i in range(self._len))
+
+    def _split_urns(self) -> List[tuple]:
+        # The text group, work, version, exemplar and passage of every URN, split on first use.
+        keys = self._keys
+        if keys is None:
+            keys = self._keys = [split_urn(u) for u in self.urns()]
+        return keys
+
+    def retrieve_indices(self, ref: Union[CtsUrn, str]) -> List[int]:
+        """Find the positions of the passages matching a CTS URN reference, as `CitableCorpus.retrieve_indices` finds them.
+
+        Args:
+            ref (CtsUrn or str): A passage, a containing passage, a range, or a work (ending in a colon).
+
+        Returns:
+            List[int]: Positions of matching passages, in corpus order.
+        """
+        text_group, work, version, exemplar, passage = split_urn(str(ref))
+        keys = self._split_urns()
+        if passage is None:
+            return [i for i, k in enumerate(keys) if k[1] == work]
+        fields = (text_group, work, version, exemplar)
+        pieces = passage.split("-")
+        if len(pieces) == 2:
+            begin = _first_containing(keys, fields, pieces[0])
+            end = _first_containing(keys, fields, pieces[1])
+            return [] if begin is None or end is None else list(range(begin, end + 1))
+        # A passage contains itself and every passage whose reference extends it after a period.
+        below = passage + "."
+        found = []
+        for i, k in enumerate(keys):
+            r = k[4]
+            if r is not None and (r == passage or r.startswith(below)) and all(f is None or f == g for f, g in zip(fields, k)):
+                found.append(i)
+        return found
+
+    def retrieve(self, ref: Union[CtsUrn, str]) -> List[CitablePassage]:
+        "Retrieve the passages matching a CTS URN reference, in corpus order."
+        return [self.passage(i) for i in self.retrieve_indices(ref)]
+
+    def cex(self, delimiter: str = "|") -> str:
+        "Return the passages as delimited lines, as `CitableCorpus.cex` does."
+        return "\n".join(f"{self.urn(i)}{delimiter}{self.text(i)}" for i in range(self._len))
+
+    def to_corpus(self) -> CitableCorpus:
+        "Copy the passages into a CitableCorpus of this process."
+        from .corpus import CitableCorpus
+        return CitableCorpus(passages=list(self))
+
+
+def _first_containing(keys: List[tuple], fields, passage: str) -> Optional[int]:
+    # Like CitableCorpus.retrieve_range: the first passage whose URN contains `passage`,
+    # so the passage itself or one of its ancestors.  `keys` are split URNs.
+    pieces = passage.split(".")
+    prefixes = {".".join(pieces[:i]) for i in range(1, len(pieces) + 1)}
+    for i, k in enumerate(keys):
+        if k[4] in prefixes and all(g is None or g == f for f, g in zip(fields, k)):
+            return i
+    return None
@@ -0,0 +1,97 @@
+from typing import Callable, Iterable, List, Optional
+from urn_citation import CtsUrn
+
+
+def work_key(urn: CtsUrn) -> tuple:
+    "Tuple identifying the work hierarchy of a CtsUrn, ignoring its passage."
+    return (urn.urn_type, urn.namespace, urn.text_group, urn.work, urn.version, urn.exemplar)
+
+
+def with_passage(work: CtsUrn, passage) -> CtsUrn:
+    """Copy a validated CtsUrn with a different passage component, without re-validating it.
+
+    This sets up the copy the way pydantic's own `model_copy` does, minus its
+    generic update handling, which costs more than the copy itself.
+    """
+    urn = work.__class__.__new__(work.__class__)
+    fields = dict(work.__dict__)
+    fields["passage"] = passage
+    object.__setattr__(urn, "__dict__", fields)
+    object.__setattr__(urn, "__pydantic_fields_set__", work.__pydantic_fields_set__ | {"passage"} if passage is not None else work.__pydantic_fields_set__)
+    object.__setattr__(urn, "__pydantic_extra__", work.__pydantic_extra__)
+    object.__setattr__(urn, "__pydantic_private__", work.__pydantic_private__)
+    return urn
+
+
+def passage_copier(work: CtsUrn) -> Callable[[Optional[str]], CtsUrn]:
+    """A function copying a validated CtsUrn with a given passage component, as `with_passage` does.
+
+    The work's fields are looked up once, so making many copies of one work
+    (e.g. when loading a serialized corpus) costs about half as much.  Passages
+    are not validated: they must come from valid URNs.
+    """
+    cls = work.__class__
+    fields = work.__dict__
+    with_passage_set = work.__pydantic_fields_set__ | {"passage"}
+    extra = work.__pydantic_extra__
+    private = work.__pydantic_private__
+    new = object.__new__
+    setattr_ = object.__setattr__
+
+    def copy(passage: Optional[str]) -> CtsUrn:
+        urn = new(cls)
+        setattr_(urn, "__dict__", {**fields, "passage": passage})
+        setattr_(urn, "__pydantic_fields_set__", set(with_passage_set if passage is not None else work.__pydantic_fields_set__))
+        setattr_(urn, "__pydantic_extra__", extra)
+        setattr_(urn, "__pydantic_private__", private)
+        return urn
+    return copy
+
+
+class WorkRewriter:
+    """Apply a work-level rewrite to CtsUrns, computing it only once for each distinct work.
+
+    Every passage of a work gets the same new work hierarchy, so the rewrite
+    function (e.g. `lambda u: u.set_version("v2")`) is called with the work-level
+    URN (no passage) the first time a work is seen.  The validated result is then
+    copied with each passage's own passage component, which the rewrite leaves unchanged.
+
+    Attributes:
+        rewrite (Callable[[CtsUrn], CtsUrn]): Function rewriting a work-level CtsUrn.
+    """
+
+    def __init__(self, rewrite: Callable[[CtsUrn], CtsUrn]):
+        self.rewrite = rewrite
+        self._works = {}
+        self._strings = {}
+
+    def __call__(self, urn: CtsUrn) -> CtsUrn:
+        key = work_key(urn)
+        work = self._works.get(key)
+        if work is None:
+            work = self.rewrite(urn.drop_passage())
+            self._works[key] = work
+        return with_passage(work, urn.passage)
+
+    def rewrite_string(self, urnstring: str) -> str:
+        "Rewrite a URN given as a string, returning a string; only the work part is parsed, once per distinct work."
+        workstring, _, passage = urnstring.rpartition(":")
+        rewritten = self._strings.get(workstring)
+        if rewritten is None:
+            rewritten = str(self.rewrite(CtsUrn.from_string(workstring + ":")))
+            self._strings[workstring] = rewritten
+        return rewritten + passage
+
+
+def rewrite_works(urns: Iterable[CtsUrn], rewrite: Callable[[CtsUrn], CtsUrn]) -> List[CtsUrn]:
+    """Rewrite the work hierarchy of many CtsUrns, computing the rewrite once per distinct work.
+
+    Args:
+        urns (Iterable[CtsUrn]): The URNs to rewrite.
+        rewrite (Callable[[CtsUrn], CtsUrn]): Function rewriting a work-level CtsUrn.
+
+    Returns:
+        List[CtsUrn]: The rewritten URNs, in order.
+    """
+    rewriter = WorkRewriter(rewrite)
+    return [rewriter(u) for u in urns]
@@ -0,0 +1,149 @@
+"""Views selecting passages of a corpus by position, without copying them.
+
+A CorpusView holds its parent corpus and the positions of the passages it
+selects: a `range` for a contiguous run, such as the result of a range
+retrieval, or a tuple of positions otherwise.  Retrieving, filtering and
+slicing a view make new views over the same parent, so chained queries copy
+only positions, and lists of passages are built only when asked for:
+
+    chapters = corpus.view(CtsUrn.from_string("urn:cts:compnov:bible.genesis.sept_latin:1.1-11.32"))
+    cex = chapters.filter(lambda p: "Noe" in p.text).to_cex()
+"""
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Sequence, Union
+
+if TYPE_CHECKING:
+    from urn_citation import CtsUrn
+    from .corpus import CitableCorpus, _PassageList
+    from .passage import CitablePassage
+
+
+def _compact(indices: Iterable[int]) -> Union[range, tuple]:
+    # Ascending, consecutive positions are kept as a range.
+    if isinstance(indices, range):
+        return indices
+    indices = tuple(indices)
+    if indices and indices[-1] - indices[0] + 1 == len(indices) and indices == tuple(range(indices[0], indices[-1] + 1)):
+        return range(indices[0], indices[-1] + 1)
+    return indices
+
+
+class CorpusView:
+    """A read-only selection of the passages of a corpus, by position.
+
+    A view reads its parent's passage list.  If that list is modified, or the
+    parent is given a new one, the positions no longer mean what they did, and
+    using the view raises RuntimeError.
+
+    Attributes:
+        corpus (CitableCorpus): The parent corpus.
+        indices (range or tuple): Positions in the parent of the selected passages, in view order.
+    """
+
+    def __init__(self, corpus: CitableCorpus, indices: Optional[Iterable[int]] = None):
+        """Select the passages of `corpus` at `indices` (default: all of them).
+
+        Raises:
+            IndexError: If a position is outside the corpus.
+        """
+        passages = corpus._tracked_passages()
+        indices = range(len(passages)) if indices is None else _compact(indices)
+        if len(indices) and (min(indices) < 0 or max(indices) >= len(passages)):
+            raise IndexError("passage position out of range")
+        self.corpus = corpus
+        self.indices = indices
+        self._passages = passages
+        self._revision = passages.revision
+        self._members = None
+
+    def _derive(self, indices: Iterable[int]) -> CorpusView:
+        # A view of the same parent, at positions known to be valid.
+        view = object.__new__(CorpusView)
+        view.corpus = self.corpus
+        view.indices = _compact(indices)
+        view._passages = self._passages
+        view._revision = self._revision
+        view._members = None
+        return view
+
+    def _list(self) -> _PassageList:
+        passages = self._passages
+        if passages.revision is not self._revision or self.corpus.passages is not passages:
+            raise RuntimeError("The corpus has changed since the view was made")
+        return passages
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __str__(self):
+        return f"View of {len(self.indices)} citable passages."
+
+    def __iter__(self) -> Iterator[CitablePassage]:
+        return map(self._list().__getitem__, self.indices)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[CitablePassage, CorpusView]:
+        "The passage at position `i` of the view, or a view of a slice of it."
+        passages = self._list()
+        if isinstance(i, slice):
+            return self._derive(self.indices[i])
+        return passages[self.indices[i]]
+
+    @property
+    def passages(self) -> List[CitablePassage]:
+        "A new list of the selected passages."
+        return list(self)
+
+    def to_corpus(self) -> CitableCorpus:
+        "A new CitableCorpus of the selected passages."
+        from .corpus import CitableCorpus
+        return CitableCorpus(passages=list(self))
+
+    def _within(self, positions: Sequence[int]) -> Sequence[int]:
+        # The positions (in corpus order) that the view selects.
+        indices = self.indices
+        if isinstance(indices, range):
+            if isinstance(positions, range) and indices.step == 1:
+                return range(max(indices.start, positions.start), min(indices.stop, positions.stop))
+            return [i for i in positions if i in indices]
+        if self._members is None:
+            self._members = frozenset(indices)
+        return [i for i in positions if i in self._members]
+
+    def retrieve(self, ref: CtsUrn) -> CorpusView:
+        """The selected passages among those the parent corpus retrieves for `ref`, in corpus order.
+
+        Args:
+            ref (CtsUrn): A passage, containing passage, range or work reference.
+        """
+        self._list()
+        if ref.is_range():
+            return self._derive(self._within(self.corpus.retrieve_range_indices(ref)))
+        return self._derive(self._within(self.corpus.retrieve_indices(ref)))
+
+    def retrieve_range(self, ref: CtsUrn) -> CorpusView:
+        """Like `retrieve`, for a range reference.
+
+        Raises:
+            ValueError: If `ref` is not a range.
+        """
+        self._list()
+        return self._derive(self._within(self.corpus.retrieve_range_indices(ref)))
+
+    def filter(self, predicate: Callable[[CitablePassage], bool]) -> CorpusView:
+        "A view of the selected passages for which `predicate` is true, in view order."
+        passages = self._list()
+        return self._derive([i for i in self.indices if predicate(passages[i])])
+
+    def cex(self, delimiter: str = "|", label_block = False) -> str:
+        "Return the selected passages as delimited lines, as `CitableCorpus.cex` does."
+        data_lines = [f"{p.urn}{delimiter}{p.text}" for p in self]
+        if label_block:
+            return "#!ctsdata\n" + "\n".join(data_lines)
+        return "\n".join(data_lines)
+
+    def to_cex(self, delimiter: str = "|", include_label = True) -> str:
+        "Return the selected passages as a CEX `ctsdata` block, as `CitableCorpus.to_cex` does."
+        from cite_exchange import CexBlock
+        data_lines = [f"{p.urn}{delimiter}{p.text}" for p in self]
+        if include_label:
+            return CexBlock(label="ctsdata", data=data_lines).to_cex()
+        return "\n".join(data_lines)
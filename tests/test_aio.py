@@ -0,0 +1,112 @@
+import unittest
+import asyncio
+import os
+from urllib.error import HTTPError
+from citable_corpus.aio import aiter_cex, fetch_url
+from citable_corpus.corpus import CitableCorpus
+from urn_citation import CtsUrn
+
+
+class LocalCexServer:
+    "Serve a file over HTTP on localhost: whole at /plain, chunked at /chunked, redirected from /moved, and 404 elsewhere."
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.url = "http://127.0.0.1:%d" % self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        target = (await reader.readline()).split()[1].decode()
+        while await reader.readline() not in (b"\r\n", b""):
+            pass
+        if target == "/plain":
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(self.data) + self.data)
+        elif target == "/chunked":
+            writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n")
+            for i in range(0, len(self.data), 1000):
+                chunk = self.data[i:i + 1000]
+                writer.write(b"%x\r\n" % len(chunk) + chunk + b"\r\n")
+            writer.write(b"0\r\n\r\n")
+        elif target == "/moved":
+            writer.write(b"HTTP/1.1 302 Found\r\nLocation: /plain\r\nContent-Length: 0\r\n\r\n")
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+
+class TestAsync(unittest.IsolatedAsyncioTestCase):
+    """Test the async loaders and retrieval."""
+
+    def setUp(self):
+        self.hyginus = os.path.join(os.path.dirname(__file__), "data", "hyginus.cex")
+        self.corpus = CitableCorpus.from_cex_file(self.hyginus)
+
+    async def test_download(self):
+        """Test downloading whole, chunked and redirected responses, and an error status."""
+        async with LocalCexServer(self.hyginus) as server:
+            for path in ["/plain", "/chunked", "/moved"]:
+                self.assertEqual(await fetch_url(server.url + path), server.data)
+            with self.assertRaises(HTTPError) as raised:
+                await fetch_url(server.url + "/missing")
+            self.assertEqual(raised.exception.code, 404)
+
+    def test_no_https_downgrade(self):
+        """Test that redirects from https to http are refused."""
+        from urllib.request import Request
+        from citable_corpus.aio import _RedirectHandler
+        handler = _RedirectHandler()
+        request = Request("https://example.org/corpus.cex")
+        with self.assertRaises(HTTPError):
+            handler.redirect_request(request, None, 302, "Found", {}, "http://example.org/corpus.cex")
+        self.assertEqual(handler.redirect_request(request, None, 302, "Found", {}, "https://example.org/new.cex").full_url,
+                         "https://example.org/new.cex")
+
+    async def test_afrom_cex_download(self):
+        """Test loading a corpus over HTTP without blocking the event loop."""
+        async with LocalCexServer(self.hyginus) as server:
+            corpus = await CitableCorpus.afrom_cex_url(server.url + "/chunked")
+        self.assertEqual(corpus, self.corpus)
+        self.assertEqual(await CitableCorpus.afrom_cex_file(self.hyginus), self.corpus)
+
+    async def test_aiter_cex(self):
+        """Test streaming passages from a file and over HTTP in small batches."""
+        passages = [p async for p in aiter_cex(self.hyginus, batch=100)]
+        self.assertEqual(passages, self.corpus.passages)
+        async with LocalCexServer(self.hyginus) as server:
+            passages = [p async for p in aiter_cex(server.url + "/chunked", batch=100)]
+        self.assertEqual(passages, self.corpus.passages)
+
+    async def test_aretrieve(self):
+        """Test retrieval on an executor, alone and in batches, while other tasks run."""
+        refs = [CtsUrn.from_string(u) for u in ["urn:cts:latinLit:stoa1263.stoa001.hc:pr",
+                                                 "urn:cts:latinLit:stoa1263.stoa001.hc:pr.1-pr.3"]]
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        self.assertEqual(await self.corpus.aretrieve(refs[0]), self.corpus.retrieve(refs[0]))
+        self.assertEqual(await self.corpus.aretrieve_many(refs), [self.corpus.retrieve(r) for r in refs])
+        task.cancel()
+        self.assertGreater(ticks, 0)
+
+    async def test_aiter(self):
+        """Test iterating over a corpus asynchronously."""
+        self.assertEqual([p async for p in self.corpus.aiter(batch=100)], self.corpus.passages)
+
+
+if __name__ == '__main__':
+    unittest.main()
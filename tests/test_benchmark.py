@@ -0,0 +1,158 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from citable_corpus import benchmark
+from citable_corpus.benchmark import (BenchmarkReport, BenchmarkResult, parse_size, synthetic_cex, synthetic_tei, query_refs,
+                                      median_ci, compare, save_baseline, load_baseline)
+from citable_corpus.corpus import CitableCorpus
+from citable_corpus.markupreader import TEIDivAbReader
+
+
+class TestSyntheticCorpora(unittest.TestCase):
+    """Test generating synthetic corpora."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_parse_size(self):
+        """Test size names and plain numbers."""
+        self.assertEqual(parse_size("10k"), 10_000)
+        self.assertEqual(parse_size("1M"), 1_000_000)
+        self.assertEqual(parse_size("250"), 250)
+
+    def test_synthetic_cex(self):
+        """Test that a synthetic CEX file holds the requested number of passages, reproducibly."""
+        f = os.path.join(self.tmpdir, "a.cex")
+        synthetic_cex(f, 30)
+        corpus = CitableCorpus.from_cex_file(f)
+        self.assertEqual(len(corpus), 30)
+        self.assertEqual(str(corpus.passages[12].urn), benchmark.cex_urnbase + "2.1")
+        g = os.path.join(self.tmpdir, "b.cex")
+        synthetic_cex(g, 30)
+        self.assertEqual(CitableCorpus.from_cex_file(g).passages, corpus.passages)
+
+    def test_synthetic_tei(self):
+        """Test that a synthetic TEI file holds the requested number of passages across divs."""
+        f = os.path.join(self.tmpdir, "a.xml")
+        synthetic_tei(f, 40)
+        with open(f, encoding="utf-8") as src:
+            corpus = TEIDivAbReader.corpus(src.read(), benchmark.tei_urnbase)
+        self.assertEqual(len(corpus), 40)
+        self.assertEqual(str(corpus.passages[-1].urn), benchmark.tei_urnbase + "2.9")
+
+    def test_query_refs_found(self):
+        """Test that every query reference matches passages of the synthetic corpus."""
+        f = os.path.join(self.tmpdir, "a.cex")
+        synthetic_cex(f, 100)
+        corpus = CitableCorpus.from_cex_file(f)
+        singles, ranges = query_refs(100, 5)
+        self.assertEqual(len(singles), 5)
+        self.assertTrue(all(len(corpus.retrieve(u)) == 1 for u in singles))
+        self.assertTrue(all(len(corpus.retrieve_range(u)) == 10 for u in ranges))
+
+
+class TestBenchmarkRun(unittest.TestCase):
+    """Test running the benchmark suite."""
+
+    def test_run_and_json_round_trip(self):
+        """Test that a small run measures every operation and survives a JSON round trip."""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            out = os.path.join(tmpdir, "results.json")
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(benchmark.main(["--sizes", "60", "--queries", "3", "--json", out]), 0)
+            report = BenchmarkReport.from_json(out)
+        finally:
+            shutil.rmtree(tmpdir)
+        ops = [r.operation for r in report.results]
+        self.assertIn("CitableCorpus.retrieve", ops)
+        self.assertIn("TEINormalized.edition", ops)
+        self.assertTrue(all(r.size == 60 and r.seconds >= 0 for r in report.results))
+        self.assertIn("python", report.environment)
+        # The process peak is cumulative: it never falls from one operation to the next.
+        peaks = [r.process_peak_rss for r in report.results if r.process_peak_rss is not None]
+        self.assertEqual(peaks, sorted(peaks))
+
+
+
+    def test_tracemalloc_mode(self):
+        """Test that traced runs record peak allocation, and retained memory for loaders."""
+        with tempfile.TemporaryDirectory() as workdir:
+            results = benchmark.run_size(40, workdir, queries=2, trace=True)
+        byop = {r.operation: r for r in results}
+        self.assertTrue(all(r.peak_alloc is not None for r in results))
+        self.assertGreater(byop["CitableCorpus.from_cex_file"].retained, 0)
+        self.assertGreater(byop["TEIDivAbReader.corpus"].peak_alloc, 0)
+        self.assertIsNone(byop["CitableCorpus.retrieve"].retained)
+
+def report(*results):
+    return BenchmarkReport(created="2026-01-01T00:00:00+00:00", environment={}, results=list(results))
+
+
+def result(operation, samples):
+    lo, hi = median_ci(samples)
+    seconds = sorted(samples)[len(samples) // 2]
+    return BenchmarkResult(operation=operation, size=100, items=100, seconds=seconds, throughput=100 / seconds,
+                           samples=samples, ci_low=lo, ci_high=hi)
+
+
+class TestBaselines(unittest.TestCase):
+    """Test saving baselines and comparing runs against them."""
+
+    def test_median_ci(self):
+        """Test that the confidence interval brackets the median."""
+        lo, hi = median_ci([1.0, 1.1, 0.9, 1.05, 0.95])
+        self.assertLessEqual(lo, 1.0)
+        self.assertGreaterEqual(hi, 1.0)
+        self.assertEqual(median_ci([2.0]), (2.0, 2.0))
+
+    def test_compare_flags_regression(self):
+        """Test that a clear slowdown of a tracked operation is a regression."""
+        base = report(result("CitableCorpus.retrieve", [1.0, 1.01, 0.99]), result("TEINormalized.edition", [1.0, 1.01, 0.99]))
+        new = report(result("CitableCorpus.retrieve", [1.5, 1.51, 1.49]), result("TEINormalized.edition", [1.02, 1.0, 1.01]))
+        comparisons = compare(base, new, threshold=0.1)
+        self.assertEqual([c.regressed for c in comparisons], [True, False])
+        self.assertAlmostEqual(comparisons[0].ratio, 1.5)
+        untracked = compare(base, new, threshold=0.1, operations=["TEINormalized.edition"])
+        self.assertFalse(any(c.regressed for c in untracked))
+
+    def test_compare_ignores_noise(self):
+        """Test that a slowdown within overlapping confidence intervals is not a regression."""
+        base = report(result("CitableCorpus.retrieve", [1.0, 0.8, 1.6]))
+        new = report(result("CitableCorpus.retrieve", [1.2, 0.9, 1.5]))
+        self.assertFalse(compare(base, new, threshold=0.1)[0].regressed)
+
+    def test_save_and_load(self):
+        """Test that a saved baseline loads by name or by path."""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            base = report(result("CitableCorpus.retrieve", [1.0]))
+            path = save_baseline(base, "v1", tmpdir)
+            self.assertEqual(load_baseline("v1", tmpdir), base)
+            self.assertEqual(load_baseline(path), base)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_main_exits_non_zero_on_regression(self):
+        """Test the command line exit status when comparing with a much faster baseline."""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            args = ["--sizes", "40", "--queries", "2", "--repeats", "2", "--baseline-dir", tmpdir]
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(benchmark.main(args + ["--save-baseline", "base"]), 0)
+                base = load_baseline("base", tmpdir)
+                fast = [r.model_copy(update={"seconds": 1e-9, "samples": [1e-9], "ci_low": 1e-9, "ci_high": 1e-9}) for r in base.results]
+                save_baseline(base.model_copy(update={"results": fast}), "fast", tmpdir)
+                self.assertEqual(benchmark.main(args + ["--compare", "fast"]), 1)
+                self.assertEqual(benchmark.main(args + ["--compare", "fast", "--threshold", "1e12"]), 0)
+        finally:
+            shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from citable_corpus.cache import IngestionCache
+from citable_corpus.corpus import CitableCorpus
+from citable_corpus.ingest import ingest_tei_files
+
+
+class TestIngestionCache(unittest.TestCase):
+    """Test the on-disk ingestion cache."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tmpdir, "cache")
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "data")
+        self.hyginus = os.path.join(self.test_data_dir, "hyginus.cex")
+        self.tei = os.path.join(self.tmpdir, "sample.xml")
+        self.write_tei("First passage text.")
+        self.urnbase = "urn:cts:latinLit:phi0959.phi006:"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_tei(self, text):
+        with open(self.tei, "w", encoding="utf-8") as f:
+            f.write(f"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>
+<div n="1"><ab n="1">{text}</ab><ab n="2">Second passage text.</ab></div>
+</body></text></TEI>""")
+
+    def test_key_depends_on_content_and_config(self):
+        """Test that keys change with content, reader and configuration."""
+        k = IngestionCache.key(b"abc", "TEIDivAbReader", baseurn="urn:a:")
+        self.assertEqual(k, IngestionCache.key(b"abc", "TEIDivAbReader", baseurn="urn:a:"))
+        self.assertNotEqual(k, IngestionCache.key(b"abd", "TEIDivAbReader", baseurn="urn:a:"))
+        self.assertNotEqual(k, IngestionCache.key(b"abc", "TEIDivAbReader", baseurn="urn:b:"))
+        self.assertNotEqual(k, IngestionCache.key(b"abc", "ctsdata", baseurn="urn:a:"))
+
+    def test_get_miss(self):
+        """Test that an unknown key is a miss."""
+        cache = IngestionCache(self.cachedir)
+        self.assertIsNone(cache.get("nosuchkey"))
+
+    def test_unreadable_entries(self):
+        """Test that truncated, foreign or stale entries are misses and are removed."""
+        import pickle
+        cache = IngestionCache(self.cachedir)
+        corpus = cache.corpus_from_cex_file(self.hyginus)
+        [entry] = cache.entries()
+        with open(entry.path, "rb") as f:
+            data = f.read()
+        for bad in [data[:len(data) // 2], pickle.dumps(["not", "a", "corpus"]), b"\x80\x05c__no_such_module__\nthing\n."]:
+            with open(entry.path, "wb") as f:
+                f.write(bad)
+            self.assertIsNone(cache.get(entry.name[:-len(cache.suffix)]))
+            self.assertEqual(cache.entries(), [])
+            self.assertEqual(cache.corpus_from_cex_file(self.hyginus), corpus)
+
+    def test_cex_round_trip(self):
+        """Test that cached CEX passages equal freshly parsed ones."""
+        cache = IngestionCache(self.cachedir)
+        fresh = CitableCorpus.from_cex_file(self.hyginus)
+        first = cache.corpus_from_cex_file(self.hyginus)
+        self.assertEqual(len(cache.entries()), 1)
+        second = cache.corpus_from_cex_file(self.hyginus)
+        self.assertEqual(fresh.passages, first.passages)
+        self.assertEqual(fresh.passages, second.passages)
+
+    def test_tei_hit_and_invalidation(self):
+        """Test that editing a TEI file or changing the base URN misses the cache."""
+        cache = IngestionCache(self.cachedir)
+        cache.tei_passages(self.tei, self.urnbase)
+        cache.tei_passages(self.tei, self.urnbase)
+        self.assertEqual(len(cache.entries()), 1)
+
+        cache.tei_passages(self.tei, "urn:cts:greekLit:tlg0012.tlg001:")
+        self.assertEqual(len(cache.entries()), 2)
+
+        self.write_tei("Edited passage text.")
+        psgs = cache.tei_passages(self.tei, self.urnbase)
+        self.assertEqual(len(cache.entries()), 3)
+        self.assertIn("Edited", psgs[0].text)
+
+    def test_evict_by_age(self):
+        """Test that entries unused for longer than max_age are evicted."""
+        cache = IngestionCache(self.cachedir, max_age=60)
+        cache.tei_passages(self.tei, self.urnbase)
+        old = time.time() - 120
+        for e in cache.entries():
+            os.utime(e.path, (old, old))
+        self.assertEqual(cache.evict(), 1)
+        self.assertEqual(cache.entries(), [])
+
+    def test_evict_by_size(self):
+        """Test that least recently used entries are evicted to fit max_bytes."""
+        cache = IngestionCache(self.cachedir)
+        cache.tei_passages(self.tei, "urn:cts:latinLit:a.b:")
+        cache.tei_passages(self.tei, "urn:cts:latinLit:c.d:")
+        entries = cache.entries()
+        old = time.time() - 120
+        os.utime(entries[1].path, (old, old))
+        newest = entries[0].path
+        cache.max_bytes = os.path.getsize(newest)
+        self.assertEqual(cache.evict(), 1)
+        self.assertEqual([e.path for e in cache.entries()], [newest])
+
+    def test_clear(self):
+        """Test clearing the cache."""
+        cache = IngestionCache(self.cachedir)
+        cache.corpus_from_cex_file(self.hyginus)
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
+
+    def test_ingest_with_cache(self):
+        """Test that bulk ingestion populates and reuses the cache."""
+        cache = IngestionCache(self.cachedir)
+        sources = [(self.tei, self.urnbase)]
+        first = ingest_tei_files(sources, workers=1, verbose=False, cache=cache)
+        self.assertEqual(len(cache.entries()), 1)
+        second = ingest_tei_files(sources, workers=1, verbose=False, cache=cache)
+        self.assertEqual(first.corpus.passages, second.corpus.passages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import os
+import shutil
+import tempfile
+from citable_corpus.cexindex import CexIndex, StaleIndexError, split_urn
+from citable_corpus.corpus import CitableCorpus
+from urn_citation import CtsUrn
+
+
+class TestCexIndex(unittest.TestCase):
+    """Test looking passages up in a persistent index of a CEX file."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.cexfile = os.path.join(cls.tmpdir, "hyginus.cex")
+        shutil.copy(os.path.join(os.path.dirname(__file__), "data", "hyginus.cex"), cls.cexfile)
+        cls.corpus = CitableCorpus.from_cex_file(cls.cexfile)
+        cls.path = os.path.join(cls.tmpdir, "hyginus.idx")
+        CexIndex.build(cls.cexfile, cls.path, text=True).close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_split_urn(self):
+        """Test splitting URN strings without validating them."""
+        self.assertEqual(split_urn("urn:cts:latinLit:stoa1263.stoa001.hc:1.2"), ("stoa1263", "stoa001", "hc", None, "1.2"))
+        self.assertEqual(split_urn("urn:cts:latinLit:stoa1263:"), ("stoa1263", None, None, None, None))
+        with self.assertRaises(ValueError):
+            split_urn("not a urn")
+
+    def test_matches_corpus_retrieval(self):
+        """Test that lookups find the passages CitableCorpus.retrieve finds."""
+        with CexIndex(self.path) as idx:
+            self.assertEqual(len(idx), len(self.corpus))
+            for ref in ["urn:cts:latinLit:stoa1263.stoa001.hc:pr.3",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:pr",
+                        "urn:cts:latinLit:stoa1263.stoa001:pr.3",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:pr.3-pr.7",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:t.1-pr",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:nosuch.1"]:
+                expected = [p.cex() for p in self.corpus.retrieve(CtsUrn.from_string(ref))]
+                self.assertEqual(idx.retrieve(ref), expected, ref)
+
+    def test_threads(self):
+        """Test sharing one index between threads, each with its own connection, and closing it from another."""
+        import sqlite3
+        import threading
+        refs = [f"urn:cts:latinLit:stoa1263.stoa001.hc:pr.{i}" for i in range(1, 11)] + ["urn:cts:latinLit:stoa1263.stoa001.hc:pr"]
+        idx = CexIndex(self.path)
+        expected = [idx.retrieve(r) for r in refs]
+        self.assertEqual(idx.retrieve_many(refs * 10, workers=4), expected * 10)
+        self.assertGreater(len(idx._connections), 1)
+        closer = threading.Thread(target=idx.close)
+        closer.start()
+        closer.join()
+        self.assertEqual(idx._connections, [])
+        with self.assertRaises(sqlite3.ProgrammingError):
+            idx.retrieve(refs[0])
+
+    def test_search(self):
+        """Test finding passages by their words, ignoring case."""
+        with CexIndex(self.path) as idx:
+            found = idx.lines(idx.search(["IOUE", "venus"]))
+        expected = [p.cex() for p in self.corpus.passages if {"ioue", "venus"} <= set(p.text.lower().replace(",", " ").replace(".", " ").split())]
+        self.assertTrue(found)
+        self.assertEqual(found, expected)
+
+    def test_search_requires_text(self):
+        """Test that an index built without text cannot be searched."""
+        path = os.path.join(self.tmpdir, "notext.idx")
+        with CexIndex.build(self.cexfile, path) as idx:
+            self.assertFalse(idx.has_text)
+            with self.assertRaises(ValueError):
+                idx.search(["ioue"])
+
+    def test_stale_index(self):
+        """Test that an index is rejected once its CEX file changes."""
+        cexfile = os.path.join(self.tmpdir, "stale.cex")
+        path = os.path.join(self.tmpdir, "stale.idx")
+        shutil.copy(self.cexfile, cexfile)
+        CexIndex.build(cexfile, path).close()
+        with open(cexfile, "a", encoding="utf-8") as f:
+            f.write("urn:cts:latinLit:stoa1263.stoa001.hc:999.1|Added.\n")
+        with self.assertRaises(StaleIndexError):
+            CexIndex(path)
+        CexIndex(path, check=False).close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import citable_corpus
+from citable_corpus.cli import main
+from citable_corpus.corpus import CitableCorpus
+from citable_corpus.editionbuilders import TEINormalized
+from citable_corpus.markupreader import TEIDivAbReader
+from urn_citation import CtsUrn
+
+
+def run(*argv):
+    "Run the command in this process, returning its exit status and output."
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+        status = main(list(argv))
+    return status, out.getvalue()
+
+
+class TestCli(unittest.TestCase):
+    """Test the citable-corpus command."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data = os.path.join(os.path.dirname(__file__), "data")
+        self.genesis = os.path.join(self.data, "septuagint_latin_genesis.xml")
+        self.baseurn = "urn:cts:compnov:bible.genesis.sept_latin:"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_convert_index_query(self):
+        """Test converting TEI to an edition, indexing it, and querying the index."""
+        norm = os.path.join(self.tmpdir, "norm.cex")
+        idx = os.path.join(self.tmpdir, "norm.idx")
+        self.assertEqual(run("convert", self.genesis, "--urn", self.baseurn, "--edition", f"normalized={norm}")[0], 0)
+        with open(self.genesis, encoding='utf-8') as f:
+            edition = TEINormalized.edition(TEIDivAbReader.corpus(f.read(), self.baseurn))
+        with open(norm, encoding='utf-8') as f:
+            self.assertEqual(f.read(), edition.to_cex() + "\n")
+
+        self.assertEqual(run("index", norm, "-o", idx, "--text")[0], 0)
+        status, out = run("query", idx, "urn:cts:compnov:bible.genesis.sept_latin.normalized:1.1-1.3")
+        self.assertEqual(status, 0)
+        corpus = CitableCorpus.from_cex_file(norm)
+        expected = corpus.retrieve(CtsUrn.from_string("urn:cts:compnov:bible.genesis.sept_latin.normalized:1.1-1.3"))
+        self.assertEqual(len(expected), 3)
+        self.assertEqual(out.splitlines(), [p.cex() for p in expected])
+        status, out = run("query", idx, "urn:cts:compnov:bible.genesis.sept_latin.normalized:1.1", "--format", "text")
+        self.assertEqual(out, expected[0].text + "\n")
+
+    def test_query_errors(self):
+        """Test the exit status for no matches and for a missing index."""
+        cexfile = os.path.join(self.data, "hyginus.cex")
+        idx = os.path.join(self.tmpdir, "hyginus.idx")
+        run("index", cexfile, "-o", idx)
+        self.assertEqual(run("query", idx, "urn:cts:latinLit:stoa1263.stoa001.hc:nosuch")[0], 1)
+        self.assertEqual(run("query", idx, "--search", "ioue")[0], 2)
+        self.assertEqual(run("query", os.path.join(self.tmpdir, "missing.idx"), "urn:cts:latinLit:stoa1263.stoa001.hc:1")[0], 2)
+
+    def test_query_does_not_load_corpus_libraries(self):
+        """Test that a query in a fresh interpreter imports neither pydantic nor the URN library."""
+        cexfile = os.path.join(self.data, "hyginus.cex")
+        idx = os.path.join(self.tmpdir, "hyginus.idx")
+        run("index", cexfile, "-o", idx)
+        src = os.path.join(os.path.dirname(citable_corpus.__file__), "..")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([src, os.environ.get("PYTHONPATH", "")]))
+        code = (f"import sys\nfrom citable_corpus.cli import main\nmain(['query', {idx!r}, 'urn:cts:latinLit:stoa1263.stoa001.hc:pr.1'])\n"
+                "print(' '.join(sys.modules), file=sys.stderr)")
+        result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        self.assertTrue(result.stdout.startswith("urn:cts:latinLit:stoa1263.stoa001.hc:pr.1|"))
+        loaded = set(result.stderr.split())
+        for name in ["pydantic", "urn_citation", "citable_corpus.corpus"]:
+            self.assertNotIn(name, loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,19 @@
 
 import unittest
+import json
 import os
 from citable_corpus.corpus import CitableCorpus
 from citable_corpus.passage import CitablePassage
 from urn_citation import CtsUrn
 
+class TitledCorpus(CitableCorpus):
+	"A subclass with a field of its own, defined at module level so that it can be pickled."
+	title: str = ""
+
+class NotedPassage(CitablePassage):
+	"A passage subclass with a field of its own."
+	note: str = ""
+
 class TestCitableCorpus(unittest.TestCase):
 	def setUp(self):
 		self.lines = [
@@ -403,5 +412,247 @@ class TestCitableCorpus(unittest.TestCase):
 		self.assertEqual(corpus.cex(), "")
 		self.assertEqual(corpus.cex(label_block=True), "#!ctsdata\n")
 
+	def test_set_version(self):
+		"""Test setting the version of every passage."""
+		corpus = CitableCorpus.from_delimited(self.input_str).set_version("v2")
+		self.assertEqual([str(p.urn) for p in corpus.passages],
+			["urn:cts:latinLit:phi0959.phi006.v2:1.1", "urn:cts:latinLit:phi0959.phi006.v2:1.2"])
+		self.assertEqual(corpus.passages[1].text, "Dolor sit amet.")
+
+	def test_set_exemplar(self):
+		"""Test setting the exemplar of every passage, which requires a version."""
+		corpus = CitableCorpus.from_delimited(self.input_str)
+		with self.assertRaises(ValueError):
+			corpus.set_exemplar("tokens")
+		tokens = corpus.set_version("v2").set_exemplar("tokens")
+		self.assertEqual(tokens.passages[0].urn, CtsUrn.from_string("urn:cts:latinLit:phi0959.phi006.v2.tokens:1.1"))
+
+	def test_rewrite_works_matches_per_passage_rewrite(self):
+		"""Test that rewriting once per work gives the same URNs as rewriting each passage."""
+		hyginus_path = os.path.join(self.test_data_dir, "hyginus.cex")
+		corpus = CitableCorpus.from_cex_file(hyginus_path)
+		rewritten = corpus.rewrite_works(lambda u: u.set_version("v2"))
+		self.assertEqual([p.urn for p in rewritten.passages], [p.urn.set_version("v2") for p in corpus.passages])
+
+	def test_memory_usage(self):
+		"""Test the breakdown of memory used by a corpus."""
+		corpus = CitableCorpus.from_delimited(self.input_str)
+		usage = corpus.memory_usage()
+		self.assertEqual(set(usage), {"urns", "text", "passages", "containers", "indexes", "total"})
+		self.assertEqual(usage["total"], sum(v for k, v in usage.items() if k != "total"))
+		self.assertGreater(usage["text"], len("Lorem ipsum") + len("Dolor sit amet."))
+		shallow = corpus.memory_usage(deep=False)
+		self.assertEqual(shallow["text"], 0)
+		self.assertLess(shallow["total"], usage["total"])
+
+	def test_memory_usage_matches_tracemalloc(self):
+		"""Test that the estimate is close to the memory traced while loading a corpus."""
+		import gc
+		import tracemalloc
+		hyginus_path = os.path.join(self.test_data_dir, "hyginus.cex")
+		tracemalloc.start()
+		try:
+			before = tracemalloc.get_traced_memory()[0]
+			corpus = CitableCorpus.from_cex_file(hyginus_path)
+			gc.collect()
+			traced = tracemalloc.get_traced_memory()[0] - before
+		finally:
+			tracemalloc.stop()
+		self.assertAlmostEqual(corpus.memory_usage()["total"] / traced, 1.0, delta=0.1)
+
+	def test_result_cache(self):
+		"""Test that cached retrieval returns the uncached results and counts hits."""
+		corpus = CitableCorpus.from_cex_file(os.path.join(self.test_data_dir, "hyginus.cex"))
+		refs = [CtsUrn.from_string(u) for u in ["urn:cts:latinLit:stoa1263.stoa001.hc:pr", "urn:cts:latinLit:stoa1263.stoa001.hc:pr.2-pr.5",
+		                                         "urn:cts:latinLit:stoa1263.stoa001.hc:", "urn:cts:latinLit:stoa1263.stoa001.hc:nosuch"]]
+		expected = [corpus.retrieve(r) for r in refs]
+		corpus.enable_cache(maxsize=8)
+		for _ in range(2):
+			self.assertEqual([corpus.retrieve(r) for r in refs], expected)
+		self.assertEqual(corpus.retrieve_range(refs[1]), expected[1])
+		self.assertEqual(corpus.retrieve_range_indices(refs[1]), range(2, 6))
+		self.assertEqual(corpus.retrieve_indices(refs[0]), list(range(1, len(expected[0]) + 1)))
+		with self.assertRaises(ValueError):
+			corpus.retrieve_range(refs[0])
+		info = corpus.cache_info()
+		self.assertEqual((info["misses"], info["hits"], info["size"]), (4, 7, 4))
+		corpus.retrieve(refs[0]).clear()
+		self.assertEqual(corpus.retrieve(refs[0]), expected[0])
+		corpus.disable_cache()
+		self.assertIsNone(corpus.cache_info())
+
+	def test_result_cache_invalidation(self):
+		"""Test that adding, removing, replacing or reassigning passages empties the cache."""
+		corpus = CitableCorpus.from_delimited(self.input_str)
+		corpus.enable_cache()
+		ref = CtsUrn.from_string("urn:cts:latinLit:phi0959.phi006:1")
+		extra = CitablePassage.from_delimited("urn:cts:latinLit:phi0959.phi006:1.3|Consectetur.")
+		self.assertEqual(len(corpus.retrieve(ref)), 2)
+		corpus.passages.append(extra)
+		self.assertEqual(len(corpus.retrieve(ref)), 3)
+		del corpus.passages[0]
+		self.assertEqual(corpus.retrieve(ref)[0].text, "Dolor sit amet.")
+		corpus.passages[0] = extra
+		self.assertEqual([p.text for p in corpus.retrieve(ref)], ["Consectetur.", "Consectetur."])
+		corpus.passages = []
+		self.assertEqual(corpus.retrieve(ref), [])
+		corpus.passages += [extra]
+		self.assertEqual(corpus.retrieve(ref), [extra])
+		self.assertEqual(corpus.cache_info()["invalidations"], 5)
+
+	def test_result_cache_size_limits(self):
+		"""Test that results are evicted to stay within the number and passage limits."""
+		corpus = CitableCorpus.from_cex_file(os.path.join(self.test_data_dir, "hyginus.cex"))
+		corpus.enable_cache(maxsize=2, max_passages=20)
+		for ref in ["pr.1", "pr.2", "pr.3", "pr.4-pr.30"]:
+			corpus.retrieve(CtsUrn.from_string("urn:cts:latinLit:stoa1263.stoa001.hc:" + ref))
+		info = corpus.cache_info()
+		self.assertEqual((info["size"], info["weight"], info["evictions"]), (2, 2, 1))
+
+	def test_result_cache_equality_and_copies(self):
+		"""Test that caching does not affect equality, pickling or copying."""
+		import copy
+		import pickle
+		corpus = CitableCorpus.from_delimited(self.input_str)
+		plain = CitableCorpus.from_delimited(self.input_str)
+		corpus.enable_cache()
+		corpus.retrieve(CtsUrn.from_string("urn:cts:latinLit:phi0959.phi006:1.1"))
+		self.assertEqual(corpus, plain)
+		for other in [pickle.loads(pickle.dumps(corpus)), copy.deepcopy(corpus)]:
+			self.assertEqual(other, corpus)
+			self.assertEqual(other.cache_info()["size"], 0)
+
+	def test_result_cache_threads(self):
+		"""Test sharing a cached corpus between threads."""
+		from concurrent.futures import ThreadPoolExecutor
+		corpus = CitableCorpus.from_cex_file(os.path.join(self.test_data_dir, "hyginus.cex"))
+		refs = [CtsUrn.from_string(f"urn:cts:latinLit:stoa1263.stoa001.hc:pr.{i}") for i in range(1, 11)]
+		expected = [corpus.retrieve(r) for r in refs]
+		corpus.enable_cache(maxsize=5)
+		with ThreadPoolExecutor(4) as pool:
+			results = list(pool.map(corpus.retrieve, refs * 20))
+		self.assertEqual(results, expected * 20)
+		info = corpus.cache_info()
+		self.assertEqual(info["hits"] + info["misses"], 200)
+
+	def test_pickle(self):
+		"""Test that a corpus pickles as columns and is restored equal, with passages of several works and kinds."""
+		import pickle
+		corpus = CitableCorpus.from_cex_file(os.path.join(self.test_data_dir, "hyginus.cex"))
+		corpus.passages.extend(CitableCorpus.from_delimited("\n".join([
+			"urn:cts:latinLit:phi0959.phi006:1.1-1.2|A range",
+			"urn:cts:latinLit:phi0959.phi006:1.3@Lorem|A subreference",
+			"urn:cts:latinLit:phi0959.phi006.v1.tokens:1.4|An exemplar",
+			"urn:cts:latinLit:phi0959:|A text group"])).passages)
+		corpus.passages.append(CitablePassage(urn=CtsUrn.from_string("urn:cts:latinLit:phi0959.phi006:"), text="A work\nwith a newline"))
+		data = pickle.dumps(corpus)
+		restored = pickle.loads(data)
+		self.assertEqual(restored, corpus)
+		self.assertEqual([str(p.urn) for p in restored.passages], [str(p.urn) for p in corpus.passages])
+		self.assertLess(len(data), len(pickle.dumps(corpus.model_dump())))
+		restored.passages.append(corpus.passages[0])
+		self.assertEqual(len(restored.retrieve(corpus.passages[0].urn)), 2)
+		empty = CitableCorpus(passages=[])
+		self.assertEqual(pickle.loads(pickle.dumps(empty)), empty)
+
+	def test_pickle_subclass(self):
+		"""Test that pickling a subclass of CitableCorpus keeps its class and its other fields."""
+		import pickle
+		corpus = TitledCorpus(passages=CitableCorpus.from_delimited(self.input_str).passages, title="Fabulae")
+		restored = pickle.loads(pickle.dumps(corpus))
+		self.assertIs(type(restored), TitledCorpus)
+		self.assertEqual((restored.title, restored.passages), ("Fabulae", corpus.passages))
+
+	def test_subclass_equality(self):
+		"""Test that corpora compare their other fields as well as their passages."""
+		passages = CitableCorpus.from_delimited(self.input_str).passages
+		self.assertNotEqual(TitledCorpus(passages=passages, title="A"), TitledCorpus(passages=passages, title="B"))
+		self.assertEqual(TitledCorpus(passages=passages, title="A"), TitledCorpus(passages=list(passages), title="A"))
+		self.assertNotEqual(TitledCorpus(passages=passages), CitableCorpus(passages=passages))
+
+	def test_pickle_passage_subclass(self):
+		"""Test that a corpus of subclassed passages keeps their class and fields, with or without a citation index."""
+		import pickle
+		passages = CitableCorpus.from_delimited(self.input_str).passages
+		noted = NotedPassage(urn=passages[1].urn, text=passages[1].text, note="hello")
+		for corpus in [CitableCorpus(passages=[passages[0], noted]), TitledCorpus(passages=[passages[0], noted], title="Fabulae")]:
+			corpus.enable_cache()
+			corpus.next(passages[0].urn)
+			restored = pickle.loads(pickle.dumps(corpus))
+			self.assertIs(type(restored), type(corpus))
+			self.assertEqual(restored, corpus)
+			self.assertIs(type(restored.passages[1]), NotedPassage)
+			self.assertEqual(restored.passages[1].note, "hello")
+			self.assertEqual(restored.next(passages[0].urn), passages[1].urn)
+			self.assertEqual(restored.cache_info()["size"], 0)
+
+	def test_json(self):
+		"""Test writing a corpus as JSON and reading it back."""
+		corpus = CitableCorpus.from_cex_file(os.path.join(self.test_data_dir, "hyginus.cex"))
+		corpus.passages.extend(CitableCorpus.from_delimited("\n".join([
+			"urn:cts:latinLit:phi0959.phi006:1.1-1.2|A range",
+			"urn:cts:latinLit:phi0959.phi006:1.3@Lorem|Ünïcödé",
+			"urn:cts:latinLit:phi0959.phi006:|A work"])).passages)
+		s = corpus.to_json()
+		data = json.loads(s)
+		self.assertEqual(data["works"], ["urn:cts:latinLit:stoa1263.stoa001.hc:", "urn:cts:latinLit:phi0959.phi006:"])
+		self.assertEqual((data["refs"][0], data["refs"][-1], data["work"][-1]), (corpus.passages[0].urn.passage, None, 1))
+		self.assertEqual(CitableCorpus.from_json(s), corpus)
+		self.assertEqual(CitableCorpus.from_json(s.encode("utf-8")), corpus)
+		self.assertEqual(CitableCorpus.from_json(s, trusted=True), corpus)
+		self.assertEqual(CitableCorpus.from_json(CitableCorpus(passages=[]).to_json()).passages, [])
+
+	def test_json_errors(self):
+		"""Test that malformed JSON and invalid URNs are rejected."""
+		good = {"works": ["urn:cts:latinLit:phi0959.phi006:"], "work": [0], "refs": ["1.1"], "texts": ["Lorem"]}
+		for bad in [{"works": []}, {**good, "works": ["not a urn"]}, {**good, "works": ["urn:cts:latinLit:phi0959.phi006:1.1"]},
+					{**good, "work": [1]}, {**good, "work": [0, 0]}, {**good, "texts": [None]},
+					{**good, "refs": ["1.1-1.2-1.3"]}, {**good, "refs": ["1.1@"]}, {**good, "refs": ["1..1"]}, {**good, "refs": [1]}]:
+			with self.assertRaises(ValueError, msg=bad):
+				CitableCorpus.from_json(json.dumps(bad))
+		with self.assertRaises(ValueError):
+			CitableCorpus.from_json("{")
+		self.assertEqual(str(CitableCorpus.from_json(json.dumps(good)).passages[0].urn), "urn:cts:latinLit:phi0959.phi006:1.1")
+
+	def test_retrieve_many(self):
+		"""Test retrieving several references on one thread and on several."""
+		corpus = CitableCorpus.from_cex_file(os.path.join(self.test_data_dir, "hyginus.cex"))
+		refs = [CtsUrn.from_string(f"urn:cts:latinLit:stoa1263.stoa001.hc:pr.{i}") for i in range(1, 11)]
+		refs.append(CtsUrn.from_string("urn:cts:latinLit:stoa1263.stoa001.hc:pr.2-pr.5"))
+		expected = [corpus.retrieve(r) for r in refs]
+		self.assertEqual(corpus.retrieve_many(refs), expected)
+		self.assertEqual(corpus.retrieve_many(iter(refs), workers=4), expected)
+		self.assertEqual(corpus.retrieve_many([], workers=4), [])
+
+	def test_search(self):
+		"""Test finding passages by regular expression, serially and on several threads."""
+		import re
+		corpus = CitableCorpus.from_cex_file(os.path.join(self.test_data_dir, "hyginus.cex"))
+		expected = [i for i, p in enumerate(corpus.passages) if re.search(r"\bfilius\b", p.text, re.IGNORECASE)]
+		self.assertTrue(expected)
+		self.assertEqual(corpus.search_indices(r"\bfilius\b", re.IGNORECASE), expected)
+		self.assertEqual(corpus.search_indices(r"\bfilius\b", re.IGNORECASE, workers=3), expected)
+		self.assertEqual(corpus.search(r"\bfilius\b", re.IGNORECASE, workers=3), [corpus.passages[i] for i in expected])
+		self.assertEqual(corpus.search("no such words"), [])
+
+	def test_revision_changes_after_modification(self):
+		"""Test that a passage list gets a new revision once a change is complete, even if it fails."""
+		corpus = CitableCorpus.from_delimited(self.input_str)
+		seen = []
+		revision = corpus.passages.revision
+
+		class Key:
+			def __init__(self, passage):
+				seen.append(corpus.passages.revision)
+				self.text = passage.text
+
+			def __lt__(self, other):
+				raise TypeError("unorderable")
+
+		with self.assertRaises(TypeError):
+			corpus.passages.sort(key=Key)
+		self.assertEqual(seen, [revision, revision])
+		self.assertIsNot(corpus.passages.revision, revision)
+
 if __name__ == "__main__":
 	unittest.main()
\ No newline at end of file
@@ -2,11 +2,26 @@
 import unittest
 import os
 from xml.dom import minidom
+import xml.etree.ElementTree as ET
 from abc import ABC
 from citable_corpus.editionbuilders import (
     EditionBuilder, 
     tidy_ws, 
     extract_text, 
+    extract_texts,
+    extract_element_text,
+    qualified_names,
+    extract_fragments,
+    extraction_cache_info,
+    set_extraction_cache_size,
+    clear_extraction_cache,
+    default_extraction_cache_size,
+    EditionRules,
+    RuleEditionBuilder,
+    apply_rules,
+    LazyEdition,
+    build_editions_from_tei,
+    build_editions,
     TEIDiplomatic, 
     TEINormalized
 )
@@ -395,5 +410,380 @@ class TestEditionComparison(unittest.TestCase):
         self.assertEqual(diplomatic.passages[0].urn.passage, normalized.passages[0].urn.passage)
 
 
+class TestQualifiedNames(unittest.TestCase):
+    """Test compiling omit lists to sets of ElementTree tags."""
+
+    def test_local_names_match_tei_namespace(self):
+        """Test that local names match plain and TEI-namespaced tags."""
+        tags = qualified_names(['expan'])
+        self.assertIn('expan', tags)
+        self.assertIn('{http://www.tei-c.org/ns/1.0}expan', tags)
+
+    def test_qualified_names_kept(self):
+        """Test that names with a namespace are kept as given."""
+        self.assertEqual(qualified_names(['{urn:x}note']), frozenset({'{urn:x}note'}))
+
+
+class TestExtractElementText(unittest.TestCase):
+    """Test the iterative ElementTree text extractor against extract_text."""
+
+    samples = [
+        "<p>Hello world</p>",
+        "<p>Hello <em>world</em> test</p>",
+        "<p>Keep this <expan>omit this</expan> text</p>",
+        "<p>Keep <expan>omit1</expan> this <note>omit2</note> text</p>",
+        "<p>Keep <choice><abbr>keep</abbr><expan>omit this</expan></choice> text</p>",
+        "<p></p>",
+        "<p><expan>omit</expan><note>omit</note></p>",
+        "<p>Text1<em>Text2</em>Text3<strong>Text4</strong>Text5</p>",
+        "<p>A<!-- comment -->B<?pi data?>C</p>",
+        '<ab xmlns="http://www.tei-c.org/ns/1.0">The <choice><abbr>dr.</abbr><expan>doctor</expan></choice> <persName>arrived</persName>.</ab>',
+    ]
+    omitlists = [[], ['expan'], ['abbr'], ['expan', 'note']]
+
+    def test_matches_minidom_extract_text(self):
+        """Test that output matches the minidom extractor."""
+        for xml in self.samples:
+            for omitlist in self.omitlists:
+                expected = extract_text(minidom.parseString(xml).documentElement, [], omitlist)
+                result = extract_element_text(ET.fromstring(xml), qualified_names(omitlist))
+                self.assertEqual(result, expected, f"{xml} omitting {omitlist}")
+
+    def test_deep_nesting(self):
+        """Test that deeply nested XML does not hit the recursion limit."""
+        depth = 5000
+        xml = "<p>" + "<hi>a" * depth + "</hi>" * depth + "</p>"
+        self.assertEqual(extract_element_text(ET.fromstring(xml), frozenset()), "a" * depth)
+
+
+class TestExtractTexts(unittest.TestCase):
+    """Test extracting several editions in one walk."""
+
+    def test_matches_extract_element_text(self):
+        """Test that each edition matches a separate single-edition extraction."""
+        omitsets = [qualified_names(o) for o in TestExtractElementText.omitlists + [['abbr', 'note']]]
+        for xml in TestExtractElementText.samples:
+            elem = ET.fromstring(xml)
+            expected = [extract_element_text(elem, o) for o in omitsets]
+            self.assertEqual(extract_texts(elem, omitsets), expected, xml)
+
+    def test_plain_omitlists(self):
+        """Test that plain lists of element names match namespaced TEI elements, and that minidom nodes still work."""
+        xml = '<ab xmlns="http://www.tei-c.org/ns/1.0">A <choice><abbr>ds</abbr><expan>dominus</expan></choice> B</ab>'
+        self.assertEqual(extract_texts(ET.fromstring(xml), [["expan"], ["abbr"]]), ["A ds B", "A dominus B"])
+        self.assertEqual(extract_texts(minidom.parseString(xml).documentElement, [["expan"], ["abbr"]]), ["A ds B", "A dominus B"])
+
+    def test_no_editions(self):
+        """Test that no omit sets give no texts."""
+        self.assertEqual(extract_texts(ET.fromstring("<p>Text</p>"), []), [])
+
+
+class TestEditionRules(unittest.TestCase):
+    """Test compiling and applying declarative edition rules."""
+
+    xml = ('<ab xmlns="http://www.tei-c.org/ns/1.0">The <choice><abbr>dr.</abbr><expan>doctor</expan></choice> '
+           '<persName>Jo<hi>hn</hi></persName>  saw <gap/> the <choice><sic>teh</sic><corr>the</corr></choice> end.</ab>')
+
+    def apply(self, rules, tidy=False):
+        return EditionRules(rules, tidy).extract(ET.fromstring(self.xml))
+
+    def test_dispatch_table_keys(self):
+        """Test that rules compile to a table keyed by qualified tag."""
+        rules = EditionRules({"expan": "omit", "gap": ("replace", "...")})
+        self.assertEqual(rules.table["{http://www.tei-c.org/ns/1.0}expan"], ("omit", None))
+        self.assertEqual(rules.table["gap"], ("replace", "..."))
+
+    def test_unknown_action(self):
+        """Test that an unknown action raises ValueError."""
+        with self.assertRaises(ValueError):
+            EditionRules({"expan": "drop"})
+
+    def test_no_rules_keeps_everything(self):
+        """Test that an empty rule set keeps all text."""
+        self.assertEqual(self.apply({}), "The dr.doctor John  saw  the tehthe end.")
+
+    def test_omit(self):
+        """Test omitting elements."""
+        self.assertEqual(self.apply({"expan": "omit", "corr": "omit"}), "The dr. John  saw  the teh end.")
+
+    def test_replace(self):
+        """Test replacing elements with a fixed string."""
+        self.assertEqual(self.apply({"gap": ("replace", "[...]"), "persName": ("replace", "NN")}),
+                         "The dr.doctor NN  saw [...] the tehthe end.")
+
+    def test_text_ignores_descendant_rules(self):
+        """Test that a text rule keeps all text inside the element."""
+        self.assertEqual(self.apply({"persName": "text", "hi": "omit"}), "The dr.doctor John  saw  the tehthe end.")
+        self.assertEqual(self.apply({"hi": "omit"}), "The dr.doctor Jo  saw  the tehthe end.")
+
+    def test_choose(self):
+        """Test choosing a branch of choice elements by preference."""
+        self.assertEqual(self.apply({"choice": ("choose", ["expan", "corr"])}), "The doctor John  saw  the the end.")
+        self.assertEqual(self.apply({"choice": ("choose", ["abbr", "sic"])}), "The dr. John  saw  the teh end.")
+
+    def test_choose_preference_order(self):
+        """Test that choose keeps the most preferred child, wherever it comes in the document."""
+        self.assertEqual(self.apply({"choice": ("choose", ["expan", "abbr"])}), "The doctor John  saw  the tehthe end.")
+        self.assertEqual(self.apply({"choice": ("choose", ["corr", "sic", "abbr"])}), "The dr. John  saw  the the end.")
+        first = EditionRules({"choice": ("choose", ["expan", "abbr"])})
+        second = EditionRules({"choice": ("choose", ["abbr", "expan"])})
+        self.assertNotEqual(first, second)
+        self.assertNotEqual(hash(first), hash(second))
+        elem = ET.fromstring(self.xml)
+        self.assertEqual([first.extract(elem), second.extract(elem)], ["The doctor John  saw  the tehthe end.", "The dr. John  saw  the tehthe end."])
+
+    def test_tidy(self):
+        """Test normalizing whitespace."""
+        self.assertEqual(self.apply({"expan": "omit", "corr": "omit"}, tidy=True), "The dr. John saw the teh end.")
+
+    def test_keep_overrides_nothing(self):
+        """Test that an explicit keep rule is the same as no rule."""
+        self.assertEqual(EditionRules({"hi": "keep"}), EditionRules({"hi": "keep"}))
+        self.assertEqual(self.apply({"hi": "keep"}), self.apply({}))
+
+    def test_equality_hash_and_pickle(self):
+        """Test that equal rule sets hash alike and survive pickling."""
+        import pickle
+        a = EditionRules({"choice": ("choose", ["abbr"]), "gap": ("replace", "...")}, tidy=True)
+        b = EditionRules({"gap": ("replace", "..."), "choice": ("choose", ["abbr"])}, tidy=True)
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertNotEqual(a, EditionRules({"gap": ("replace", "...")}, tidy=True))
+        restored = pickle.loads(pickle.dumps(a))
+        self.assertEqual(restored, a)
+        self.assertEqual(restored.table, a.table)
+
+    def test_omit_only_uses_omitset(self):
+        """Test that omit-only rules expose an omit set and agree with the general walk."""
+        rules = EditionRules.from_omitlist(['expan', 'corr'])
+        self.assertEqual(rules.omitset, qualified_names(['expan', 'corr']))
+        self.assertIsNone(EditionRules({"gap": ("replace", "")}).omitset)
+        elem = ET.fromstring(self.xml)
+        self.assertEqual(apply_rules(elem, [rules])[0], extract_element_text(elem, rules.omitset))
+
+    def test_apply_several_rule_sets(self):
+        """Test that one walk with several rule sets matches separate walks."""
+        rulesets = [
+            EditionRules({"choice": ("choose", ["abbr", "sic"])}),
+            EditionRules({"choice": ("choose", ["expan", "corr"]), "gap": ("replace", "[...]")}, tidy=True),
+            EditionRules({"persName": "text", "hi": "omit", "expan": "omit"}),
+            EditionRules({"persName": "omit"}),
+        ]
+        elem = ET.fromstring(self.xml)
+        self.assertEqual(apply_rules(elem, rulesets), [r.extract(elem) for r in rulesets])
+
+
+class TestRuleEditionBuilder(unittest.TestCase):
+    """Test the rule-based edition builder."""
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "data")
+        xml_path = os.path.join(self.test_data_dir, "septuagint_latin_genesis.xml")
+        with open(xml_path, 'r', encoding='utf-8') as f:
+            self.corpus = TEIDivAbReader.corpus(f.read(), "urn:cts:compnov:bible.genesis.sept_latin:")
+
+    def test_is_edition_builder(self):
+        """Test that RuleEditionBuilder is a concrete EditionBuilder."""
+        self.assertIsInstance(RuleEditionBuilder("diplomatic", ['expan']), EditionBuilder)
+
+    def test_standard_rule_sets(self):
+        """Test that TEIDiplomatic and TEINormalized are rule sets on the rule engine."""
+        self.assertEqual(TEIDiplomatic.rules, EditionRules({"expan": "omit"}))
+        self.assertEqual(TEINormalized.rules, EditionRules({"abbr": "omit"}))
+
+    def test_choose_matches_omit(self):
+        """Test that choosing abbreviations gives the diplomatic edition of the Genesis sample."""
+        builder = RuleEditionBuilder("diplomatic", EditionRules({"choice": ("choose", ["abbr"])}))
+        self.assertEqual(builder.edition(self.corpus).passages, TEIDiplomatic.edition(self.corpus).passages)
+
+    def test_tidy_edition(self):
+        """Test building a whitespace-normalized edition."""
+        builder = RuleEditionBuilder("tidy", EditionRules({"abbr": "omit"}, tidy=True))
+        edition = builder.edition(self.corpus)
+        self.assertEqual(edition.passages[0].urn.exemplar, "tidy")
+        for p in edition.passages:
+            self.assertEqual(p.text, tidy_ws(p.text))
+
+
+class TestBuildEditionsFromTei(unittest.TestCase):
+    """Test building editions from the reader's parsed elements."""
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "data")
+        self.xml_path = os.path.join(self.test_data_dir, "septuagint_latin_genesis.xml")
+        self.baseurn = "urn:cts:compnov:bible.genesis.sept_latin:"
+        with open(self.xml_path, 'r', encoding='utf-8') as f:
+            self.src = f.read()
+        self.corpus = TEIDivAbReader.corpus(self.src, self.baseurn)
+
+    def test_matches_serialize_and_reparse(self):
+        """Test that editions from elements match editions from the XML corpus."""
+        direct = build_editions_from_tei(self.xml_path, self.baseurn)
+        expected = build_editions(self.corpus)
+        self.assertEqual(set(direct), {"diplomatic", "normalized"})
+        self.assertEqual(direct["diplomatic"].passages, expected["diplomatic"].passages)
+        self.assertEqual(direct["normalized"].passages, expected["normalized"].passages)
+
+    def test_rules_and_xml_output(self):
+        """Test custom rule sets and the optional XML corpus."""
+        import io
+        reading = EditionRules({"choice": ("choose", ["expan"]), "num": ("replace", "#")}, tidy=True)
+        direct = build_editions_from_tei(io.StringIO(self.src), self.baseurn, {"reading": reading}, include_xml=True)
+        self.assertEqual(direct["xml"].passages, self.corpus.passages)
+        self.assertEqual(direct["reading"].passages, RuleEditionBuilder("reading", reading).edition(self.corpus).passages)
+
+
+class TestLazyEdition(unittest.TestCase):
+    """Test editions computed on demand."""
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "data")
+        xml_path = os.path.join(self.test_data_dir, "septuagint_latin_genesis.xml")
+        with open(xml_path, 'r', encoding='utf-8') as f:
+            self.corpus = TEIDivAbReader.corpus(f.read(), "urn:cts:compnov:bible.genesis.sept_latin:")
+        self.eager = TEIDiplomatic.edition(self.corpus)
+        self.lazy = TEIDiplomatic.lazy_edition(self.corpus)
+
+    def test_creation_computes_nothing(self):
+        """Test that no passage is transformed until requested."""
+        self.assertIsInstance(self.lazy, LazyEdition)
+        self.assertEqual(len(self.lazy), len(self.corpus))
+        self.assertEqual(len(self.lazy._passages), 0)
+
+    def test_retrieve_single_passage(self):
+        """Test retrieving one passage of the edition."""
+        ref = CtsUrn.from_string("urn:cts:compnov:bible.genesis.sept_latin.diplomatic:1.3")
+        self.assertEqual(self.lazy.retrieve(ref), self.eager.retrieve(ref))
+        self.assertEqual(len(self.lazy.retrieve(ref)), 1)
+        self.assertEqual(len(self.lazy._passages), 1)
+
+    def test_retrieve_section_and_range(self):
+        """Test retrieving a section and a range."""
+        section = CtsUrn.from_string("urn:cts:compnov:bible.genesis.sept_latin.diplomatic:2")
+        self.assertEqual(self.lazy.retrieve(section), self.eager.retrieve(section))
+        rng = CtsUrn.from_string("urn:cts:compnov:bible.genesis.sept_latin.diplomatic:1.30-2.3")
+        self.assertEqual(self.lazy.retrieve_range(rng), self.eager.retrieve_range(rng))
+        self.assertGreater(len(self.lazy.retrieve(rng)), 0)
+        with self.assertRaises(ValueError):
+            self.lazy.retrieve_range(section)
+
+    def test_retrieve_without_version(self):
+        """Test that a URN without version or exemplar finds edition passages."""
+        ref = CtsUrn.from_string("urn:cts:compnov:bible.genesis:1.1")
+        self.assertEqual(len(self.lazy.retrieve(ref)), 1)
+        self.assertEqual(self.lazy.retrieve(ref)[0].urn.exemplar, "diplomatic")
+
+    def test_other_exemplar_matches_nothing(self):
+        """Test that URNs for another exemplar are not in the edition."""
+        ref = CtsUrn.from_string("urn:cts:compnov:bible.genesis.sept_latin.normalized:1.1")
+        self.assertEqual(self.lazy.retrieve(ref), [])
+
+    def test_corpus_matches_eager_edition(self):
+        """Test that materializing the view gives the eager edition."""
+        self.assertEqual(self.lazy.corpus().passages, self.eager.passages)
+        normalized = TEINormalized.lazy_edition(self.corpus)
+        self.assertEqual(list(normalized), TEINormalized.edition(self.corpus).passages)
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test memoization of extracted edition texts."""
+
+    def setUp(self):
+        clear_extraction_cache()
+
+    def tearDown(self):
+        set_extraction_cache_size(default_extraction_cache_size)
+
+    def test_repeated_fragments_hit(self):
+        """Test that a repeated fragment is extracted once."""
+        omitsets = [qualified_names(['expan'])]
+        frag = "<ab>The <choice><abbr>dr.</abbr><expan>doctor</expan></choice></ab>"
+        result = extract_fragments([frag, "<ab>Other</ab>", frag], omitsets)
+        self.assertEqual(result, [("The dr.",), ("Other",), ("The dr.",)])
+        info = extraction_cache_info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 2)
+
+    def test_key_includes_omit_sets(self):
+        """Test that the same fragment with different omit sets is not confused."""
+        frag = "<ab><choice><abbr>dr.</abbr><expan>doctor</expan></choice></ab>"
+        self.assertEqual(extract_fragments([frag], [qualified_names(['expan'])]), [("dr.",)])
+        self.assertEqual(extract_fragments([frag], [qualified_names(['abbr'])]), [("doctor",)])
+        self.assertEqual(extraction_cache_info().misses, 2)
+
+    def test_size_is_configurable(self):
+        """Test resizing and disabling the cache."""
+        set_extraction_cache_size(1)
+        omitsets = [frozenset()]
+        extract_fragments(["<a>1</a>", "<a>2</a>", "<a>1</a>"], omitsets)
+        info = extraction_cache_info()
+        self.assertEqual((info.hits, info.misses, info.maxsize, info.currsize), (0, 3, 1, 1))
+
+        set_extraction_cache_size(0)
+        extract_fragments(["<a>1</a>", "<a>1</a>"], omitsets)
+        self.assertEqual(extraction_cache_info().hits, 0)
+
+
+class TestBuildEditions(unittest.TestCase):
+    """Test building several editions from one parse of each passage."""
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "data")
+        xml_path = os.path.join(self.test_data_dir, "septuagint_latin_genesis.xml")
+        with open(xml_path, 'r', encoding='utf-8') as f:
+            self.corpus = TEIDivAbReader.corpus(f.read(), "urn:cts:compnov:bible.genesis.sept_latin:")
+
+    def test_default_editions(self):
+        """Test that the default editions match TEIDiplomatic and TEINormalized."""
+        editions = build_editions(self.corpus)
+        self.assertEqual(set(editions), {"diplomatic", "normalized"})
+        self.assertEqual(editions["diplomatic"].passages, TEIDiplomatic.edition(self.corpus).passages)
+        self.assertEqual(editions["normalized"].passages, TEINormalized.edition(self.corpus).passages)
+
+    def test_matches_minidom_on_genesis(self):
+        """Test that editions of the Genesis sample match the minidom extractor."""
+        editions = build_editions(self.corpus)
+        for name, omitlist in [("diplomatic", ['expan']), ("normalized", ['abbr'])]:
+            expected = [extract_text(minidom.parseString(p.text).documentElement, [], omitlist) for p in self.corpus.passages]
+            self.assertEqual([p.text for p in editions[name].passages], expected)
+
+    def test_parallel_matches_serial(self):
+        """Test that building on a process pool gives the same editions in the same order."""
+        from citable_corpus import editionbuilders
+        saved = editionbuilders.parallel_threshold
+        editionbuilders.parallel_threshold = 1
+        try:
+            parallel = build_editions(self.corpus, workers=3)
+            diplomatic = TEIDiplomatic.edition(self.corpus, workers=2)
+        finally:
+            editionbuilders.parallel_threshold = saved
+        serial = build_editions(self.corpus)
+        self.assertEqual(parallel["diplomatic"].passages, serial["diplomatic"].passages)
+        self.assertEqual(parallel["normalized"].passages, serial["normalized"].passages)
+        self.assertEqual(diplomatic.passages, serial["diplomatic"].passages)
+
+    def test_threads_match_serial(self):
+        """Test that building on a thread pool gives the same editions in the same order."""
+        from citable_corpus import editionbuilders
+        saved = editionbuilders.parallel_threshold
+        editionbuilders.parallel_threshold = 1
+        try:
+            threaded = build_editions(self.corpus, workers=4, threads=True)
+            normalized = TEINormalized.edition(self.corpus, workers=2, threads=True)
+        finally:
+            editionbuilders.parallel_threshold = saved
+        serial = build_editions(self.corpus)
+        self.assertEqual(threaded["diplomatic"].passages, serial["diplomatic"].passages)
+        self.assertEqual(threaded["normalized"].passages, serial["normalized"].passages)
+        self.assertEqual(normalized.passages, serial["normalized"].passages)
+
+    def test_custom_editions(self):
+        """Test building editions from custom omit lists."""
+        editions = build_editions(self.corpus, {"full": [], "plain": ['abbr', 'expan']})
+        self.assertEqual(len(editions["full"]), len(self.corpus))
+        self.assertEqual(editions["full"].passages[0].urn.exemplar, "full")
+        self.assertEqual(editions["plain"].passages[0].urn.exemplar, "plain")
+
+
 if __name__ == '__main__':
     unittest.main()
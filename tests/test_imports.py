@@ -0,0 +1,49 @@
+import unittest
+import os
+import subprocess
+import sys
+import citable_corpus
+from citable_corpus.benchmark import import_time
+
+
+def modules_after(statement):
+    "Names of the modules loaded in a fresh interpreter after running `statement`."
+    src = os.path.join(os.path.dirname(citable_corpus.__file__), "..")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([src, os.environ.get("PYTHONPATH", "")]))
+    code = f"{statement}\nimport sys\nprint(' '.join(sys.modules))"
+    return set(subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout.split())
+
+
+class TestLazyImports(unittest.TestCase):
+    """Test that the package loads its submodules and dependencies on first use."""
+
+    def test_package_import_is_light(self):
+        """Test that importing the package loads neither its submodules nor their dependencies."""
+        loaded = modules_after("import citable_corpus")
+        for name in ["pydantic", "urn_citation", "cite_exchange", "requests", "xml.etree.ElementTree", "citable_corpus.corpus"]:
+            self.assertNotIn(name, loaded)
+
+    def test_corpus_without_xml_or_network(self):
+        """Test that a corpus read from a CEX file needs no XML or HTTP library."""
+        hyginus = os.path.join(os.path.dirname(__file__), "data", "hyginus.cex")
+        loaded = modules_after(f"from citable_corpus import CitableCorpus\nCitableCorpus.from_cex_file({hyginus!r})")
+        self.assertIn("citable_corpus.corpus", loaded)
+        for name in ["requests", "xml.etree.ElementTree", "xml.dom.minidom", "concurrent.futures.process", "asyncio"]:
+            self.assertNotIn(name, loaded)
+
+    def test_exports(self):
+        """Test that every export resolves, and unknown names raise AttributeError."""
+        for name in citable_corpus.__all__:
+            self.assertIsNotNone(getattr(citable_corpus, name))
+        self.assertIn("CitableCorpus", dir(citable_corpus))
+        self.assertIsInstance(citable_corpus.__version__, str)
+        with self.assertRaises(AttributeError):
+            citable_corpus.NoSuchThing
+
+    def test_import_time(self):
+        """Test measuring import time with -X importtime."""
+        self.assertGreater(import_time("import citable_corpus"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
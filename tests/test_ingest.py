@@ -0,0 +1,100 @@
+import unittest
+import os
+import shutil
+import tempfile
+from citable_corpus.ingest import ingest_tei_files, read_tei_file, IngestionResult
+from citable_corpus.corpus import CitableCorpus
+
+
+def tei(divn, abcount):
+    abs = "\n".join(f'<ab n="{i}">Div {divn} passage {i}.</ab>' for i in range(1, abcount + 1))
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <text>
+    <body>
+      <div n="{divn}">
+{abs}
+      </div>
+    </body>
+  </text>
+</TEI>"""
+
+
+class TestIngestTeiFiles(unittest.TestCase):
+    """Test bulk ingestion of TEI files."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "data")
+        self.urnbase = "urn:cts:latinLit:phi0959.phi006:"
+        self.sources = []
+        for n, count in [(1, 3), (2, 2), (3, 4)]:
+            path = os.path.join(self.tmpdir, f"file{n}.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(tei(n, count))
+            self.sources.append((path, self.urnbase))
+        self.broken = os.path.join(self.tmpdir, "broken.xml")
+        with open(self.broken, "w", encoding="utf-8") as f:
+            f.write("<TEI><text>")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_read_tei_file(self):
+        """Test reading one file returns its passages."""
+        psgs = read_tei_file(*self.sources[0])
+        self.assertEqual(len(psgs), 3)
+        self.assertEqual(str(psgs[0].urn), "urn:cts:latinLit:phi0959.phi006:1.1")
+
+    def test_serial_ingestion(self):
+        """Test ingesting in the calling process."""
+        result = ingest_tei_files(self.sources, workers=1, verbose=False)
+        self.assertIsInstance(result, IngestionResult)
+        self.assertIsInstance(result.corpus, CitableCorpus)
+        self.assertEqual(len(result.corpus), 9)
+        self.assertTrue(result.ok())
+
+    def test_parallel_matches_serial_order(self):
+        """Test that a process pool merges passages in input order."""
+        serial = ingest_tei_files(self.sources, workers=1, verbose=False)
+        parallel = ingest_tei_files(self.sources, workers=2, verbose=False)
+        self.assertEqual(
+            [str(p.urn) for p in serial.corpus.passages],
+            [str(p.urn) for p in parallel.corpus.passages])
+        self.assertEqual(str(parallel.corpus.passages[3].urn), "urn:cts:latinLit:phi0959.phi006:2.1")
+
+    def test_input_order_is_respected(self):
+        """Test that reversing the sources reverses the merged order of files."""
+        result = ingest_tei_files(list(reversed(self.sources)), workers=2, verbose=False)
+        self.assertEqual(str(result.corpus.passages[0].urn), "urn:cts:latinLit:phi0959.phi006:3.1")
+
+    def test_set_of_sources_is_sorted(self):
+        """Test that a set of sources gives a deterministic order."""
+        result = ingest_tei_files(set(self.sources), workers=2, verbose=False)
+        self.assertEqual(str(result.corpus.passages[0].urn), "urn:cts:latinLit:phi0959.phi006:1.1")
+
+    def test_errors_do_not_abort_batch(self):
+        """Test that unreadable files are reported and the rest are ingested."""
+        missing = os.path.join(self.tmpdir, "missing.xml")
+        sources = self.sources + [(self.broken, self.urnbase), (missing, self.urnbase)]
+        result = ingest_tei_files(sources, workers=2, verbose=False)
+        self.assertEqual(len(result.corpus), 9)
+        self.assertFalse(result.ok())
+        self.assertEqual([e.path for e in result.errors], [self.broken, missing])
+
+    def test_empty_sources(self):
+        """Test ingesting an empty batch."""
+        result = ingest_tei_files([], verbose=False)
+        self.assertEqual(len(result.corpus), 0)
+        self.assertTrue(result.ok())
+
+    def test_with_real_septuagint_file(self):
+        """Test ingesting the Septuagint Latin Genesis sample."""
+        xml_path = os.path.join(self.test_data_dir, "septuagint_latin_genesis.xml")
+        result = ingest_tei_files([(xml_path, "urn:cts:compnov:bible.genesis.sept_latin:")], verbose=False)
+        self.assertTrue(result.ok())
+        self.assertGreater(len(result.corpus), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import json
+import logging
+import os
+import threading
+from citable_corpus import instrument
+from citable_corpus.instrument import Instrumentation, instrumented, stage, timed_iter
+from citable_corpus.corpus import CitableCorpus
+from citable_corpus.markupreader import TEIDivAbReader
+from citable_corpus.editionbuilders import build_editions, clear_extraction_cache
+from urn_citation import CtsUrn
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test collecting per-stage timings and counts."""
+
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "data")
+        self.hyginus = os.path.join(self.test_data_dir, "hyginus.cex")
+        self.genesis = os.path.join(self.test_data_dir, "septuagint_latin_genesis.xml")
+        self.genesisurn = "urn:cts:compnov:bible.genesis.sept_latin:"
+
+    def test_off_by_default(self):
+        """Test that nothing is collected outside an instrumented block."""
+        self.assertIsNone(instrument.collector())
+        with stage("anything") as st:
+            st.items = 3
+        self.assertEqual(list(timed_iter("x", [1, 2])), [1, 2])
+
+    def test_stage_and_nesting(self):
+        """Test recording stages, and restoring the previous collector on exit."""
+        with instrumented() as outer:
+            with stage("a", 2):
+                pass
+            with instrumented() as inner:
+                with stage("b") as st:
+                    st.items = 5
+            self.assertIs(instrument.collector(), outer)
+            self.assertEqual(list(timed_iter("c", "xyz")), ["x", "y", "z"])
+        self.assertIsNone(instrument.collector())
+        self.assertEqual(outer.to_dict()["a"]["items"], 2)
+        self.assertEqual(outer.to_dict()["c"], {"calls": 1, "items": 3, "seconds": outer.stages["c"].seconds})
+        self.assertNotIn("b", outer.stages)
+        self.assertEqual(inner.stages["b"].items, 5)
+
+    def test_threads(self):
+        """Test that a block records its own thread and its workers, but not other threads."""
+        started, done = threading.Event(), threading.Event()
+
+        def elsewhere():
+            started.wait(5)
+            with stage("other"):
+                pass
+            instrument.count("other", 2)
+            done.set()
+
+        thread = threading.Thread(target=elsewhere)
+        thread.start()
+        corpus = CitableCorpus.from_cex_file(self.hyginus)
+        refs = [p.urn for p in corpus.passages[:40]]
+        with instrumented() as stats:
+            started.set()
+            done.wait(5)
+            corpus.retrieve_many(refs, workers=4)
+        thread.join()
+        self.assertNotIn("other", stats.stages)
+        self.assertEqual(stats.stages["corpus.retrieve"].calls, len(refs))
+
+    def test_cex_loading_stages(self):
+        """Test that loading a CEX file records reading, URN parsing and validation separately."""
+        with instrumented() as stats:
+            corpus = CitableCorpus.from_cex_file(self.hyginus)
+            corpus.retrieve(CtsUrn.from_string("urn:cts:latinLit:stoa1263.stoa001.hc:pr"))
+        totals = stats.to_dict()
+        for name in ["cex.read", "urn.parse", "passage.validate", "corpus.validate"]:
+            self.assertEqual(totals[name]["items"], len(corpus), name)
+        self.assertEqual(totals["corpus.retrieve"]["calls"], 1)
+        self.assertEqual(corpus.passages, CitableCorpus.from_cex_file(self.hyginus).passages)
+
+    def test_edition_stages(self):
+        """Test that reading TEI and building editions records parsing and extraction."""
+        clear_extraction_cache()
+        with open(self.genesis, encoding="utf-8") as f:
+            src = f.read()
+        with instrumented() as stats:
+            xmlcorpus = TEIDivAbReader.corpus(src, self.genesisurn)
+            build_editions(xmlcorpus)
+            list(TEIDivAbReader.iterelements(self.genesis, self.genesisurn))
+        totals = stats.to_dict()
+        self.assertEqual(totals["xml.serialize"]["items"], len(xmlcorpus))
+        self.assertEqual(totals["edition.extract"]["items"], len(xmlcorpus))
+        self.assertEqual(totals["edition.passages"]["items"], 2 * len(xmlcorpus))
+        self.assertEqual(totals["xml.iterparse"]["items"], len(xmlcorpus))
+        # One parse of the whole document, then one per distinct fragment extracted
+        self.assertEqual(totals["xml.parse"]["calls"], 1 + totals["text.extract"]["calls"])
+        self.assertLessEqual(totals["text.extract"]["calls"], len(xmlcorpus))
+
+    def test_export(self):
+        """Test exporting totals as JSON and to a logger."""
+        stats = Instrumentation()
+        stats.record("x", 0.5, 10)
+        self.assertEqual(json.loads(stats.to_json()), {"x": {"calls": 1, "items": 10, "seconds": 0.5}})
+
+        log = logging.getLogger("citable_corpus.test_instrument")
+        with self.assertLogs(log, level="INFO") as captured:
+            with instrumented(log=log):
+                with stage("y", 4):
+                    pass
+        self.assertEqual(len(captured.records), 1)
+        self.assertEqual(captured.records[0].stage, "y")
+        self.assertEqual(captured.records[0].items, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import pickle
+from citable_corpus.lru import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test the thread-safe LRU cache."""
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(len(cache), 2)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+
+    def test_weight_limit(self):
+        """Test eviction by total weight, and that an overweight value is not cached."""
+        cache = LRUCache(10, maxweight=5)
+        cache.put("a", "a", weight=3)
+        cache.put("b", "b", weight=2)
+        cache.put("c", "c", weight=6)
+        self.assertEqual(cache.stats()["weight"], 5)
+        cache.put("d", "d", weight=1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "b")
+
+    def test_revision(self):
+        """Test that a new revision empties the cache, and that results computed at an old revision are dropped."""
+        old, new = object(), object()
+        cache = LRUCache()
+        cache.get("a", old)
+        cache.put("a", 1, old)
+        self.assertEqual(cache.get("a", old), 1)
+        self.assertIsNone(cache.get("a", new))
+        cache.put("a", 1, old)
+        self.assertIsNone(cache.get("a", new))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_disabled(self):
+        """Test that a cache of size 0 keeps nothing."""
+        cache = LRUCache(0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_pickle(self):
+        """Test that a pickled cache keeps its limits but not its entries."""
+        cache = LRUCache(3, maxweight=10)
+        cache.put("a", 1)
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((copy.maxsize, copy.maxweight, len(copy)), (3, 10, 0))
+        copy.put("b", 2)
+        self.assertEqual(copy.get("b"), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,9 @@
 import unittest
 import os
 from abc import ABC
-from citable_corpus.markupreader import MarkupReader, TEIDivAbReader
+import io
+import xml.etree.ElementTree as ET
+from citable_corpus.markupreader import MarkupReader, TEIDivAbReader, normalize_ws, ab_line
 from citable_corpus.corpus import CitableCorpus
 
 
@@ -263,6 +265,46 @@ class TestTEIDivAbReader(unittest.TestCase):
             self.assertEqual(str(corpus.passages[i].urn), urn_str)
             self.assertIn(text, corpus.passages[i].text)
 
+    def test_iterelements(self):
+        """Test streaming ab elements with their URNs."""
+        pairs = [(u, ab.get('n')) for u, ab in TEIDivAbReader.iterelements(io.StringIO(self.multi_div_xml), self.urnbase)]
+        self.assertEqual(pairs, [
+            ("urn:cts:latinLit:phi0959.phi006:1.1", "1"),
+            ("urn:cts:latinLit:phi0959.phi006:1.2", "2"),
+            ("urn:cts:latinLit:phi0959.phi006:2.1", "1"),
+            ("urn:cts:latinLit:phi0959.phi006:2.2", "2")])
+
+    def test_iterelements_normalizes_whitespace(self):
+        """Test that streamed elements have whitespace collapsed as in cex()."""
+        urn, ab = next(TEIDivAbReader.iterelements(io.StringIO(self.formatted_xml), self.urnbase))
+        self.assertEqual(ab.text, "Text with newlines and multiple spaces.")
+
+    def test_iterpassages_matches_corpus(self):
+        """Test that streamed passages match corpus()."""
+        for xml in [self.simple_xml, self.multi_div_xml, self.formatted_xml]:
+            streamed = list(TEIDivAbReader.iterpassages(io.StringIO(xml), self.urnbase))
+            self.assertEqual(streamed, TEIDivAbReader.corpus(xml, self.urnbase).passages)
+
+
+class TestNormalizeWs(unittest.TestCase):
+    """Test whitespace normalization of elements."""
+
+    def test_text_and_tails(self):
+        """Test that text and tails of descendants are collapsed, but not the element's own tail."""
+        elem = ET.fromstring("<ab>a \n\t b<hi>  c  </hi>\n d</ab>")
+        elem.tail = "  \n"
+        normalize_ws(elem)
+        self.assertEqual(elem.text, "a b")
+        self.assertEqual(elem[0].text, " c ")
+        self.assertEqual(elem[0].tail, " d")
+        self.assertEqual(elem.tail, "  \n")
+
+    def test_ab_line_unchanged(self):
+        """Test that normalizing first does not change the serialized line."""
+        elem = ET.fromstring("<ab n='1'>a \n\t b<hi>  c  </hi>\n d</ab>")
+        line = ab_line("urn:cts:latinLit:phi0959.phi006:1.1", elem)
+        self.assertEqual(ab_line("urn:cts:latinLit:phi0959.phi006:1.1", normalize_ws(elem)), line)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import os
+from citable_corpus.corpus import CitableCorpus
+from citable_corpus.navigation import CitationIndex
+from citable_corpus.passage import CitablePassage
+from urn_citation import CtsUrn
+
+
+def urn(ref, work="urn:cts:latinLit:stoa1263.stoa001.hc:"):
+    return CtsUrn.from_string(f"{work}{ref}")
+
+
+def refs(urns):
+    return [u.passage for u in urns]
+
+
+class TestNavigation(unittest.TestCase):
+    """Test navigating the citation hierarchy of a corpus."""
+
+    def setUp(self):
+        self.corpus = CitableCorpus.from_cex_file(os.path.join(os.path.dirname(__file__), "data", "hyginus.cex"))
+
+    def test_next_prev(self):
+        """Test stepping through passages and sections in corpus order."""
+        self.assertEqual(self.corpus.next(urn("pr.3")), urn("pr.4"))
+        self.assertEqual(self.corpus.prev(urn("pr.3")), urn("pr.2"))
+        self.assertEqual(self.corpus.next(urn("pr.41")), urn("1pr.title"))
+        self.assertEqual(self.corpus.prev(urn("pr.1")), urn("t.1"))
+        self.assertEqual(self.corpus.next(urn("t")), urn("pr"))
+        self.assertEqual(self.corpus.next(urn("pr")), urn("1pr"))
+        self.assertIsNone(self.corpus.prev(urn("t.1")))
+        self.assertIsNone(self.corpus.next(self.corpus.passages[-1].urn))
+        self.assertIsNone(self.corpus.next(urn("")))
+        # Paging through every passage visits them in corpus order.
+        current, seen = self.corpus.passages[0].urn, []
+        while current is not None:
+            seen.append(current)
+            current = self.corpus.next(current)
+        self.assertEqual(seen, [p.urn for p in self.corpus.passages])
+
+    def test_hierarchy(self):
+        """Test parents, children and siblings of passages, sections and works."""
+        self.assertEqual(self.corpus.parent(urn("pr.3")), urn("pr"))
+        self.assertEqual(self.corpus.parent(urn("pr")), urn(""))
+        self.assertIsNone(self.corpus.parent(urn("")))
+        self.assertEqual(refs(self.corpus.children(urn("pr"))), [f"pr.{i}" for i in range(1, 42)])
+        self.assertEqual(refs(self.corpus.children(urn("")))[:4], ["t", "pr", "1pr", "2pr"])
+        self.assertEqual(self.corpus.children(urn("pr.3")), [])
+        self.assertEqual(refs(self.corpus.siblings(urn("pr.3"))), [f"pr.{i}" for i in range(1, 42) if i != 3])
+        self.assertEqual(self.corpus.siblings(urn("t")), [c for c in self.corpus.children(urn("")) if c != urn("t")])
+        self.assertEqual(self.corpus.siblings(urn("")), [])
+
+    def test_context(self):
+        """Test passages around a passage or section, within its work."""
+        self.assertEqual(self.corpus.context(urn("pr.3")), self.corpus.retrieve(urn("pr.2-pr.4")))
+        self.assertEqual(self.corpus.context(urn("pr.3"), before=0, after=2), self.corpus.retrieve(urn("pr.3-pr.5")))
+        self.assertEqual(self.corpus.context(urn("t.1"), before=5, after=0), self.corpus.retrieve(urn("t.1")))
+        self.assertEqual(self.corpus.context(urn("pr"), before=1, after=0), self.corpus.retrieve(urn("t.1-pr.41")))
+        self.assertEqual(self.corpus.context(urn("")), self.corpus.passages)
+        with self.assertRaises(ValueError):
+            self.corpus.context(urn("pr.3"), before=-1)
+
+    def test_lookups(self):
+        """Test references without version, and references the corpus does not cite."""
+        self.assertEqual(self.corpus.next(urn("pr.3", "urn:cts:latinLit:stoa1263.stoa001:")), urn("pr.4"))
+        for ref in ["nosuch.1", "pr.99"]:
+            with self.assertRaises(KeyError):
+                self.corpus.next(urn(ref))
+        with self.assertRaises(KeyError):
+            self.corpus.children(urn("pr", "urn:cts:latinLit:stoa1263.stoa002.hc:"))
+        with self.assertRaises(ValueError):
+            self.corpus.parent(urn("pr.3-pr.5"))
+
+    def test_works(self):
+        """Test that navigation stays within each work of a corpus."""
+        other = "urn:cts:latinLit:stoa1263.stoa001.other:"
+        corpus = CitableCorpus(passages=[CitablePassage(urn=urn(r), text=r) for r in ["1.1", "1.2", "2.1"]] +
+                               [CitablePassage(urn=urn(r, other), text=r) for r in ["1.1", "1.2"]])
+        self.assertEqual(corpus.next(urn("1.2")), urn("2.1"))
+        self.assertIsNone(corpus.next(urn("2.1")))
+        self.assertIsNone(corpus.prev(urn("1.1", other)))
+        self.assertEqual(corpus.context(urn("1.1", other), before=2), corpus.passages[3:5])
+        self.assertEqual(CitationIndex(corpus.passages).children(urn("1", other)), [urn("1.1", other), urn("1.2", other)])
+
+    def test_changes(self):
+        """Test that the index follows changes to the passages."""
+        index = self.corpus._citations()
+        self.assertIs(self.corpus._citations(), index)
+        self.corpus.passages.insert(1, CitablePassage(urn=urn("pr.0"), text="Inserted"))
+        self.assertEqual(self.corpus.next(urn("pr.0")), urn("pr.1"))
+        self.assertEqual(self.corpus.prev(urn("pr.1")), urn("pr.0"))
+        self.corpus.passages = self.corpus.passages[:3]
+        self.assertIsNone(self.corpus.next(urn("pr.1")))
+
+
+if __name__ == '__main__':
+    unittest.main()
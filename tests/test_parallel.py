@@ -0,0 +1,41 @@
+import unittest
+import sys
+import threading
+from citable_corpus.parallel import chunks, gil_enabled, map_chunks
+
+
+class TestParallel(unittest.TestCase):
+    """Test chunked execution on thread and process pools."""
+
+    def test_gil_enabled(self):
+        """Test reporting whether the interpreter has a GIL."""
+        expected = sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True
+        self.assertIs(gil_enabled(), expected)
+
+    def test_chunks(self):
+        """Test splitting items into a few chunks per worker, in order."""
+        parts = chunks(list(range(100)), 4)
+        self.assertEqual(len(parts), 15)
+        self.assertEqual(sum(parts, []), list(range(100)))
+        self.assertEqual(chunks(range(3), 8), [range(0, 1), range(1, 2), range(2, 3)])
+        self.assertEqual(chunks([], 4), [])
+
+    def test_map_chunks(self):
+        """Test that results come back in order, serially, on threads and on processes."""
+        items = list(range(1000))
+        expected = [i * 2 for i in items]
+        double = lambda chunk, factor: [i * factor for i in chunk]
+        self.assertEqual(map_chunks(double, items, 1, 2), expected)
+        self.assertEqual(map_chunks(double, items, 4, 2), expected)
+        self.assertEqual(map_chunks(list, items, 2, processes=True), items)
+        self.assertEqual(map_chunks(double, [], 4, 2), [])
+
+    def test_map_chunks_threads(self):
+        """Test that chunks run on pool threads when there are several workers."""
+        names = map_chunks(lambda chunk: [threading.current_thread().name for _ in chunk], range(100), 4)
+        self.assertEqual(len(names), 100)
+        self.assertNotIn(threading.current_thread().name, names)
+
+
+if __name__ == '__main__':
+    unittest.main()
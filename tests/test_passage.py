@@ -4,6 +4,11 @@ from urn_citation import CtsUrn
 from citable_corpus import CitablePassage
 
 
+class NotedPassage(CitablePassage):
+    "A subclass with a field of its own, defined at module level so that it can be pickled."
+    note: str = ""
+
+
 class TestCitablePassage(unittest.TestCase):
     def setUp(self):
         self.urn_str = "urn:cts:latinLit:phi0959.phi006:1.1"
@@ -55,5 +60,29 @@ class TestCitablePassage(unittest.TestCase):
         passage = CitablePassage(urn=self.urn, text=self.text)
         self.assertEqual(passage.cex(delimiter="---"), f"{self.urn_str}---{self.text}")
 
+    def test_pickle(self):
+        """Test that a pickled passage is restored equal, as its URN string and text."""
+        import pickle
+        passage = CitablePassage(urn=CtsUrn.from_string("urn:cts:latinLit:phi0959.phi006:1.1@ipsum-1.2"), text=self.text)
+        data = pickle.dumps(passage)
+        self.assertEqual(pickle.loads(data), passage)
+        self.assertNotIn(b"pydantic", data)
+
+    def test_pickle_subclass(self):
+        """Test that pickling a subclass of CitablePassage keeps its class and its other fields."""
+        import pickle
+        passage = NotedPassage(urn=self.urn, text=self.text, note="hello")
+        restored = pickle.loads(pickle.dumps(passage))
+        self.assertIs(type(restored), NotedPassage)
+        self.assertEqual(restored, passage)
+        self.assertEqual(restored.note, "hello")
+
+    def test_unchecked_passage(self):
+        """Test that a passage built without validation equals a validated one."""
+        from citable_corpus.passage import unchecked_passage
+        passage = unchecked_passage(self.urn, self.text)
+        self.assertEqual(passage, CitablePassage(urn=self.urn, text=self.text))
+        self.assertEqual(passage.model_dump(), {"urn": self.urn.model_dump(), "text": self.text})
+
 if __name__ == "__main__":
     unittest.main()
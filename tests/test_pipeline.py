@@ -0,0 +1,96 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from citable_corpus.pipeline import read_tei, read_cex, edition_stage, editions_stage, cex_lines, write_cex, tei_to_cex, tei_files_to_cex
+from citable_corpus.markupreader import TEIDivAbReader
+from citable_corpus.editionbuilders import TEIDiplomatic, TEINormalized, EditionRules, RuleEditionBuilder, diplomatic_rules
+from citable_corpus.corpus import CitableCorpus
+
+
+class TestPipeline(unittest.TestCase):
+    """Test streaming pipeline stages."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), "data")
+        self.genesis = os.path.join(self.test_data_dir, "septuagint_latin_genesis.xml")
+        self.hyginus = os.path.join(self.test_data_dir, "hyginus.cex")
+        self.baseurn = "urn:cts:compnov:bible.genesis.sept_latin:"
+        with open(self.genesis, 'r', encoding='utf-8') as f:
+            self.xmlcorpus = TEIDivAbReader.corpus(f.read(), self.baseurn)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read(self, name):
+        with open(os.path.join(self.tmpdir, name), encoding='utf-8') as f:
+            return f.read()
+
+    def test_read_tei_matches_corpus(self):
+        """Test that streaming a TEI file gives the passages of TEIDivAbReader.corpus."""
+        self.assertEqual(list(read_tei(self.genesis, self.baseurn)), self.xmlcorpus.passages)
+
+    def test_read_tei_file_object(self):
+        """Test streaming from a file object, including text after an ab."""
+        xml = """<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><p>header</p></teiHeader><text><body>
+<div n="1"><ab n="1">One <choice><abbr>a</abbr><expan>b</expan></choice></ab> tail <note>x</note><ab n="2">Two</ab></div>
+<div n="2"><ab n="1">Three</ab></div></body></text></TEI>"""
+        streamed = list(read_tei(io.StringIO(xml), self.baseurn))
+        self.assertEqual(streamed, TEIDivAbReader.corpus(xml, self.baseurn).passages)
+        self.assertEqual([str(p.urn) for p in streamed][-1], self.baseurn + "2.1")
+
+    def test_read_cex_matches_from_cex_file(self):
+        """Test that streaming a CEX file gives the passages of from_cex_file."""
+        self.assertEqual(list(read_cex(self.hyginus)), CitableCorpus.from_cex_file(self.hyginus).passages)
+
+    def test_edition_stage(self):
+        """Test the edition stage against TEIDiplomatic."""
+        streamed = list(edition_stage(read_tei(self.genesis, self.baseurn), "diplomatic", diplomatic_rules))
+        self.assertEqual(streamed, TEIDiplomatic.edition(self.xmlcorpus).passages)
+
+    def test_editions_stage(self):
+        """Test that the editions stage yields one passage per edition."""
+        first = next(editions_stage(iter(self.xmlcorpus.passages)))
+        self.assertEqual([p.urn.exemplar for p in first], ["diplomatic", "normalized"])
+
+    def test_cex_lines_and_write_cex(self):
+        """Test writing passages as CEX."""
+        out = io.StringIO()
+        count = write_cex(iter(self.xmlcorpus.passages), out)
+        self.assertEqual(count, len(self.xmlcorpus))
+        self.assertEqual(out.getvalue(), self.xmlcorpus.to_cex() + "\n")
+        self.assertEqual("\n".join(cex_lines(self.xmlcorpus.passages, include_label=False)), self.xmlcorpus.cex())
+
+    def test_tei_to_cex(self):
+        """Test writing several editions and the XML corpus from one parse."""
+        reading = EditionRules({"choice": ("choose", ["expan"])}, tidy=True)
+        outputs = {
+            "diplomatic": os.path.join(self.tmpdir, "dipl.cex"),
+            "normalized": os.path.join(self.tmpdir, "norm.cex"),
+            "reading": (os.path.join(self.tmpdir, "reading.cex"), reading),
+        }
+        count = tei_to_cex(self.genesis, self.baseurn, outputs, xml_output=os.path.join(self.tmpdir, "xml.cex"))
+        self.assertEqual(count, len(self.xmlcorpus))
+        self.assertEqual(self.read("dipl.cex"), TEIDiplomatic.edition(self.xmlcorpus).to_cex() + "\n")
+        self.assertEqual(self.read("norm.cex"), TEINormalized.edition(self.xmlcorpus).to_cex() + "\n")
+        self.assertEqual(self.read("reading.cex"), RuleEditionBuilder("reading", reading).edition(self.xmlcorpus).to_cex() + "\n")
+        self.assertEqual(self.read("xml.cex"), self.xmlcorpus.to_cex() + "\n")
+
+    def test_tei_files_to_cex(self):
+        """Test converting several files into one CEX file per edition, serially and on a process pool."""
+        other = "urn:cts:compnov:bible.genesis.copy:"
+        expected = TEINormalized.edition(self.xmlcorpus).to_cex() + "\n" + \
+            TEINormalized.edition(TEIDivAbReader.corpus(open(self.genesis, encoding='utf-8').read(), other)).to_cex(include_label=False) + "\n"
+        for workers in [1, 2]:
+            outputs = {"normalized": os.path.join(self.tmpdir, f"norm{workers}.cex")}
+            xml = os.path.join(self.tmpdir, f"xml{workers}.cex")
+            count = tei_files_to_cex([(self.genesis, self.baseurn), (self.genesis, other)], outputs, xml_output=xml, workers=workers)
+            self.assertEqual(count, 2 * len(self.xmlcorpus))
+            self.assertEqual(self.read(f"norm{workers}.cex"), expected)
+            self.assertEqual(self.read(f"xml{workers}.cex").count("#!ctsdata"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
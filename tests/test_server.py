@@ -0,0 +1,177 @@
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from urllib.parse import quote
+from citable_corpus.cexindex import CexIndex
+from citable_corpus.corpus import CitableCorpus
+from citable_corpus.server import CorpusServer
+from urn_citation import CtsUrn
+
+
+class Client:
+    "A minimal HTTP/1.1 client keeping one connection open."
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    async def __aenter__(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def get(self, target, method="GET", close=False):
+        connection = "Connection: close\r\n" if close else ""
+        self.writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n{connection}\r\n".encode())
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        body = b"" if method == "HEAD" else await self.reader.readexactly(int(headers["content-length"]))
+        return status, headers, body
+
+
+def cts(request, urn=None, **params):
+    query = f"request={request}" + (f"&urn={quote(urn)}" if urn else "")
+    return "/cts?" + query + "".join(f"&{k}={v}" for k, v in params.items())
+
+
+class TestCorpusServer(unittest.IsolatedAsyncioTestCase):
+    """Test the CTS-style HTTP server."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.cexfile = os.path.join(os.path.dirname(__file__), "data", "hyginus.cex")
+        cls.corpus = CitableCorpus.from_cex_file(cls.cexfile)
+        cls.index = os.path.join(cls.tmpdir, "hyginus.idx")
+        CexIndex.build(cls.cexfile, cls.index).close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    async def asyncSetUp(self):
+        self.server = CorpusServer({"hyginus": self.corpus}, cache_size=8)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    def expected(self, urn):
+        return [{"urn": str(p.urn), "text": p.text} for p in self.corpus.retrieve(CtsUrn.from_string(urn))]
+
+    async def test_get_passage(self):
+        """Test passage, containing-passage and range requests answered as JSON and CEX on one connection."""
+        async with Client(*self.server.address) as client:
+            for urn in ["urn:cts:latinLit:stoa1263.stoa001.hc:pr.3",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:pr",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:pr.3-pr.7"]:
+                status, headers, body = await client.get(cts("GetPassage", urn))
+                self.assertEqual(status, 200)
+                self.assertEqual(headers["connection"], "keep-alive")
+                self.assertEqual(json.loads(body)["passages"], self.expected(urn))
+            status, headers, body = await client.get(cts("GetPassage", "urn:cts:latinLit:stoa1263.stoa001.hc:pr.3-pr.7", format="cex"))
+            self.assertTrue(headers["content-type"].startswith("text/plain"))
+            self.assertEqual(body.decode(), CitableCorpus(passages=self.corpus.passages[3:8]).to_cex() + "\n")
+        self.assertEqual(self.server.metrics()["connections"], 1)
+
+    async def test_get_valid_reff(self):
+        """Test listing the URNs of matching passages."""
+        urn = "urn:cts:latinLit:stoa1263.stoa001.hc:pr"
+        async with Client(*self.server.address) as client:
+            status, _, body = await client.get(cts("GetValidReff", urn))
+            self.assertEqual(json.loads(body)["reff"], [p["urn"] for p in self.expected(urn)])
+            status, _, body = await client.get(cts("GetValidReff", urn, format="cex"))
+            self.assertEqual(body.decode().splitlines(), [p["urn"] for p in self.expected(urn)])
+
+    async def test_errors(self):
+        """Test the status of bad, unmatched and unknown requests."""
+        async with Client(*self.server.address) as client:
+            self.assertEqual((await client.get(cts("GetPassage", "not a urn")))[0], 400)
+            self.assertEqual((await client.get(cts("GetPassage")))[0], 400)
+            self.assertEqual((await client.get(cts("GetNothing", "urn:cts:latinLit:stoa1263.stoa001.hc:1")))[0], 400)
+            self.assertEqual((await client.get(cts("GetPassage", "urn:cts:latinLit:stoa1263.stoa001.hc:nosuch")))[0], 404)
+            self.assertEqual((await client.get(cts("GetPassage", "urn:cts:latinLit:stoa1263.stoa001.hc:pr.1", corpus="other")))[0], 404)
+            self.assertEqual((await client.get("/nowhere"))[0], 404)
+            self.assertEqual((await client.get("/health", method="POST"))[0], 405)
+            status, headers, body = await client.get("/health", close=True)
+            self.assertEqual(headers["connection"], "close")
+            self.assertEqual(json.loads(body)["status"], "ok")
+            self.assertEqual(await client.reader.read(), b"")
+
+    async def test_cache_and_metrics(self):
+        """Test that repeated requests are answered from the cache and counted in the metrics."""
+        urn = "urn:cts:latinLit:stoa1263.stoa001.hc:pr.1"
+        async with Client(*self.server.address) as client:
+            first = await client.get(cts("GetPassage", urn))
+            second = await client.get(cts("GetPassage", urn))
+            self.assertEqual(first, second)
+            status, _, body = await client.get(cts("GetPassage", urn), method="HEAD")
+            self.assertEqual((status, body), (200, b""))
+            metrics = json.loads((await client.get("/metrics"))[2])
+        self.assertEqual(metrics["lookups"], 1)
+        self.assertEqual(metrics["cache"]["hits"], 2)
+        self.assertEqual(metrics["by_request"], {"GetPassage": 3})
+        self.assertEqual(metrics["by_status"], {"200": 3})
+
+    async def test_concurrent_clients(self):
+        """Test many clients at once, with identical uncached requests sharing one lookup."""
+        urn = "urn:cts:latinLit:stoa1263.stoa001.hc:pr"
+
+        async def fetch():
+            async with Client(*self.server.address) as client:
+                return await client.get(cts("GetPassage", urn))
+
+        responses = await asyncio.gather(*(fetch() for _ in range(20)))
+        self.assertTrue(all(r == responses[0] for r in responses))
+        self.assertEqual(json.loads(responses[0][2])["passages"], self.expected(urn))
+        self.assertEqual(self.server.metrics()["lookups"], 1)
+
+    async def test_concurrent_lookups(self):
+        """Test that requests missing the cache are looked up at the same time, on separate threads."""
+        import threading
+        barrier = threading.Barrier(2, timeout=5)
+        source = self.server.corpora["hyginus"]
+        passages = source.passages
+
+        def waiting(urn):
+            # Each lookup waits for the other: this passes only if both run at once.
+            barrier.wait()
+            return passages(urn)
+
+        source.passages = waiting
+
+        async def fetch(urn):
+            async with Client(*self.server.address) as client:
+                return await client.get(cts("GetPassage", urn))
+
+        refs = ["urn:cts:latinLit:stoa1263.stoa001.hc:pr.1", "urn:cts:latinLit:stoa1263.stoa001.hc:pr.2"]
+        responses = await asyncio.gather(*(fetch(urn) for urn in refs))
+        self.assertEqual([r[0] for r in responses], [200, 200])
+        self.assertEqual([json.loads(r[2])["passages"] for r in responses], [self.expected(urn) for urn in refs])
+
+    async def test_index_and_capabilities(self):
+        """Test serving a corpus and an index together, and listing them."""
+        async with CorpusServer({"memory": self.corpus, "indexed": self.index}) as server:
+            async with Client(*server.address) as client:
+                urn = "urn:cts:latinLit:stoa1263.stoa001.hc:pr.2-pr.4"
+                body = json.loads((await client.get(cts("GetPassage", urn, corpus="indexed")))[2])
+                self.assertEqual(body["passages"], self.expected(urn))
+                body = json.loads((await client.get(cts("GetPassage", urn)))[2])
+                self.assertEqual(body["passages"], self.expected(urn) * 2)
+                body = json.loads((await client.get(cts("GetCapabilities")))[2])
+                self.assertEqual(body["corpora"]["indexed"], {"passages": len(self.corpus), "works": ["urn:cts:latinLit:stoa1263.stoa001.hc:"]})
+                self.assertEqual(body["corpora"]["memory"], body["corpora"]["indexed"])
+
+
+if __name__ == '__main__':
+    unittest.main()
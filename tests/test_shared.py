@@ -0,0 +1,79 @@
+import unittest
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from citable_corpus.corpus import CitableCorpus
+from citable_corpus.shared import SharedCorpus
+from urn_citation import CtsUrn
+
+
+class TestSharedCorpus(unittest.TestCase):
+    """Test publishing a corpus in shared memory and reading it from other processes."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = CitableCorpus.from_cex_file(os.path.join(os.path.dirname(__file__), "data", "hyginus.cex"))
+
+    def test_attach(self):
+        """Test that an attached view reads the same passages as the corpus."""
+        with self.corpus.share() as shared:
+            self.assertTrue(shared.owner)
+            with SharedCorpus(shared.name) as view:
+                self.assertFalse(view.owner)
+                self.assertEqual(len(view), len(self.corpus))
+                self.assertEqual(view.urns(), [str(p.urn) for p in self.corpus.passages])
+                self.assertEqual((view.urn(-1), view.text(3)), (str(self.corpus.passages[-1].urn), self.corpus.passages[3].text))
+                self.assertEqual(view[5], self.corpus.passages[5])
+                self.assertEqual(view.to_corpus(), self.corpus)
+                self.assertEqual(view.cex(), self.corpus.cex())
+                with self.assertRaises(IndexError):
+                    view.text(len(self.corpus))
+
+    def test_retrieve(self):
+        """Test that lookups find the passages CitableCorpus.retrieve finds."""
+        with SharedCorpus.publish(self.corpus) as shared:
+            for ref in ["urn:cts:latinLit:stoa1263.stoa001.hc:pr.3",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:pr",
+                        "urn:cts:latinLit:stoa1263.stoa001:pr.3",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:pr.3-pr.7",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:t.1-pr",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:",
+                        "urn:cts:latinLit:stoa1263.stoa001.hc:nosuch.1"]:
+                urn = CtsUrn.from_string(ref)
+                self.assertEqual(shared.retrieve_indices(urn), self.corpus.retrieve_indices(urn), ref)
+                self.assertEqual(shared.retrieve(ref), self.corpus.retrieve(urn), ref)
+            # The URNs are split once, on the first lookup.
+            self.assertIs(shared._split_urns(), shared._split_urns())
+
+    def test_workers(self):
+        """Test that workers receive only the name of the block and read the passages from it."""
+        ref = "urn:cts:latinLit:stoa1263.stoa001.hc:pr"
+        with self.corpus.share() as shared:
+            self.assertLess(len(pickle.dumps(shared)), 200)
+            with ProcessPoolExecutor(2) as pool:
+                cex = pool.submit(SharedCorpus.cex, shared)
+                found = pool.submit(SharedCorpus.retrieve, shared, ref)
+                self.assertEqual(cex.result(), self.corpus.cex())
+                self.assertEqual(found.result(), self.corpus.retrieve(CtsUrn.from_string(ref)))
+
+    def test_close(self):
+        """Test that the publisher frees the block, and that other blocks are rejected."""
+        from multiprocessing import shared_memory
+        shared = SharedCorpus.publish(CitableCorpus(passages=[]))
+        name = shared.name
+        self.assertEqual((len(shared), shared.urns(), shared.cex()), (0, [], ""))
+        shared.close()
+        shared.close()
+        with self.assertRaises(FileNotFoundError):
+            SharedCorpus(name)
+        other = shared_memory.SharedMemory(create=True, size=64)
+        try:
+            with self.assertRaises(ValueError):
+                SharedCorpus(other.name)
+        finally:
+            other.close()
+            other.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()
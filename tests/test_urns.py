@@ -0,0 +1,76 @@
+import unittest
+from urn_citation import CtsUrn
+from citable_corpus.urns import WorkRewriter, passage_copier, rewrite_works, work_key
+from citable_corpus.editionbuilders import edition_rewriter, set_edition_exemplar
+
+
+class TestWorkRewriter(unittest.TestCase):
+    """Test rewriting URNs once per distinct work."""
+
+    def setUp(self):
+        self.urns = [CtsUrn.from_string(s) for s in [
+            "urn:cts:latinLit:phi0959.phi006:1.1",
+            "urn:cts:latinLit:phi0959.phi006:1.2",
+            "urn:cts:latinLit:phi0959.phi007.v1:1.1",
+            "urn:cts:latinLit:phi0959.phi006:2.1",
+            "urn:cts:latinLit:phi0959.phi006:",
+        ]]
+
+    def test_work_key_ignores_passage(self):
+        """Test that URNs of the same work share a key."""
+        self.assertEqual(work_key(self.urns[0]), work_key(self.urns[1]))
+        self.assertNotEqual(work_key(self.urns[0]), work_key(self.urns[2]))
+
+    def test_rewrite_called_once_per_work(self):
+        """Test that the rewrite function sees each work only once."""
+        calls = []
+        def rewrite(u):
+            calls.append(u)
+            return u.set_version("v2")
+        rewrite_works(self.urns, rewrite)
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(u.passage is None for u in calls))
+
+    def test_matches_per_urn_rewrite(self):
+        """Test that results equal rewriting each URN on its own."""
+        result = rewrite_works(self.urns, lambda u: u.set_version("v2"))
+        self.assertEqual(result, [u.set_version("v2") for u in self.urns])
+        self.assertEqual(str(result[3]), "urn:cts:latinLit:phi0959.phi006.v2:2.1")
+        self.assertIsNone(result[4].passage)
+
+    def test_rewrite_string(self):
+        """Test rewriting URN strings without parsing each one."""
+        calls = []
+        def rewrite(u):
+            calls.append(u)
+            return set_edition_exemplar(u, "normalized")
+        rewriter = WorkRewriter(rewrite)
+        result = [rewriter.rewrite_string(str(u)) for u in self.urns]
+        self.assertEqual(result, [str(set_edition_exemplar(u, "normalized")) for u in self.urns])
+        self.assertEqual(len(calls), 2)
+
+    def test_edition_rewriter(self):
+        """Test that edition_rewriter agrees with set_edition_exemplar."""
+        rewrite = edition_rewriter("normalized")
+        self.assertEqual([rewrite(u) for u in self.urns], [set_edition_exemplar(u, "normalized") for u in self.urns])
+
+    def test_passage_copier(self):
+        """Test that copies equal the parsed URNs and are independent of each other."""
+        copy = passage_copier(self.urns[4])
+        for s in ["urn:cts:latinLit:phi0959.phi006:1.1", "urn:cts:latinLit:phi0959.phi006:1.1-1.3", "urn:cts:latinLit:phi0959.phi006:"]:
+            expected = CtsUrn.from_string(s)
+            self.assertEqual(copy(expected.passage), expected)
+            self.assertEqual(str(copy(expected.passage)), s)
+        first, second = copy("1.1"), copy("1.2")
+        self.assertIsNot(first.__pydantic_fields_set__, second.__pydantic_fields_set__)
+        self.assertEqual(self.urns[4].passage, None)
+
+    def test_rewrite_errors_propagate(self):
+        """Test that an invalid rewrite raises as it would for a single URN."""
+        rewriter = WorkRewriter(lambda u: u.set_exemplar("tokens"))
+        with self.assertRaises(ValueError):
+            rewriter(self.urns[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
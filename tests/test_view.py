@@ -0,0 +1,88 @@
+import unittest
+import os
+from citable_corpus.corpus import CitableCorpus
+from citable_corpus.view import CorpusView
+from urn_citation import CtsUrn
+
+
+def urn(ref):
+    return CtsUrn.from_string(f"urn:cts:latinLit:stoa1263.stoa001.hc:{ref}")
+
+
+class TestCorpusView(unittest.TestCase):
+    """Test views selecting passages of a corpus by position."""
+
+    def setUp(self):
+        self.corpus = CitableCorpus.from_cex_file(os.path.join(os.path.dirname(__file__), "data", "hyginus.cex"))
+
+    def test_view_matches_retrieval(self):
+        """Test that views of references hold the passages retrieval returns, as ranges when they are contiguous."""
+        for ref in ["pr.3", "pr", "pr.3-pr.7", "t.1-pr", "", "nosuch.1"]:
+            view = self.corpus.view(urn(ref))
+            self.assertEqual(view.passages, self.corpus.retrieve(urn(ref)), ref)
+            self.assertEqual(len(view), len(view.passages))
+        self.assertIsInstance(self.corpus.view(urn("pr")).indices, range)
+        self.assertEqual(self.corpus.view().passages, self.corpus.passages)
+
+    def test_chained_queries(self):
+        """Test that retrieving, filtering and slicing views gives new views of the same corpus."""
+        preface = self.corpus.view(urn("pr"))
+        some = preface.retrieve(urn("pr.3-pr.20"))
+        self.assertEqual(some.indices, range(3, 21))
+        self.assertEqual(some.passages, self.corpus.retrieve(urn("pr.3-pr.20")))
+        chosen = some.filter(lambda p: "Terra" in p.text or "Ioue" in p.text)
+        self.assertIsInstance(chosen.indices, tuple)
+        self.assertTrue(chosen.passages)
+        self.assertEqual([str(p.urn).rpartition(":")[2] for p in chosen], ["pr.3", "pr.4", "pr.7", "pr.19", "pr.20"])
+        self.assertEqual(chosen.retrieve(urn("pr.5-pr.9")).passages, [p for p in chosen if p in self.corpus.retrieve(urn("pr.5-pr.9"))])
+        self.assertEqual(chosen.retrieve(urn("pr")).passages, chosen.passages)
+        self.assertEqual(len(chosen.retrieve(urn("t.1"))), 0)
+        self.assertEqual(some[1:4].passages, some.passages[1:4])
+        self.assertEqual(chosen[::-1].passages, chosen.passages[::-1])
+        self.assertEqual((some[0], some[-1]), (some.passages[0], some.passages[-1]))
+        self.assertIs(chosen.corpus, self.corpus)
+        with self.assertRaises(ValueError):
+            some.retrieve_range(urn("pr.4"))
+
+    def test_export(self):
+        """Test that views export as corpora of their passages do."""
+        view = self.corpus.view(urn("pr.3-pr.7")).filter(lambda p: "et" in p.text)
+        corpus = view.to_corpus()
+        self.assertEqual(corpus.passages, view.passages)
+        self.assertEqual(view.cex(), corpus.cex())
+        self.assertEqual(view.cex("#", label_block=True), corpus.cex("#", label_block=True))
+        self.assertEqual(view.to_cex(), corpus.to_cex())
+        self.assertEqual(view.to_cex(include_label=False), corpus.to_cex(include_label=False))
+
+    def test_positions(self):
+        """Test views made from positions, and positions outside the corpus."""
+        view = CorpusView(self.corpus, [5, 2, 9])
+        self.assertEqual(view.passages, [self.corpus.passages[i] for i in [5, 2, 9]])
+        self.assertEqual(CorpusView(self.corpus, [2, 3, 4]).indices, range(2, 5))
+        self.assertEqual(len(CorpusView(self.corpus, [])), 0)
+        for bad in [[-1], [len(self.corpus)]]:
+            with self.assertRaises(IndexError):
+                CorpusView(self.corpus, bad)
+
+    def test_stale_view(self):
+        """Test that a view cannot be used once its corpus's passages change."""
+        view = self.corpus.view(urn("pr"))
+        self.corpus.passages.insert(0, self.corpus.passages[-1])
+        with self.assertRaises(RuntimeError):
+            list(view)
+        view = self.corpus.view(urn("pr"))
+        self.corpus.passages = list(self.corpus.passages)
+        with self.assertRaises(RuntimeError):
+            view.retrieve(urn("pr.1"))
+
+    def test_cached_corpus(self):
+        """Test views of a corpus caching its results."""
+        self.corpus.enable_cache()
+        first = self.corpus.view(urn("pr"))
+        second = self.corpus.view(urn("pr"))
+        self.assertEqual(first.passages, second.passages)
+        self.assertEqual(self.corpus.cache_info()["hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()